@@ -1 +1,117 @@
+"""
+Admin authentication for operational endpoints, and signed share tokens
+A single shared token (ADMIN_TOKEN) guards profiling and diagnostics.
+Share tokens carry a result's archetypes and session id under an HMAC
+keyed by SECRET_KEY, so a shared results page renders without a lookup.
+"""
 
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import uuid
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import Headers
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Without SECRET_KEY every process signs with its own random key: its tokens
+# only verify in that process, and the rest fall back to the session id lookup.
+# The placeholder from .env.example counts as unset.
+PLACEHOLDER_KEYS = {"your-secret-key-here"}
+SECRET_KEY = os.getenv("SECRET_KEY", "").strip()
+if SECRET_KEY in PLACEHOLDER_KEYS:
+    SECRET_KEY = ""
+_SHARE_KEY = hmac.new(SECRET_KEY.encode() or secrets.token_bytes(32), b"share-token", hashlib.sha256).digest()
+
+# Fly.io sets FLY_APP_NAME on every machine; anywhere else is development
+DEPLOYED = bool(os.getenv("FLY_APP_NAME"))
+
+# Layout: version, primary index, secondary index (255 = none), session UUID, truncated HMAC
+SHARE_TOKEN_VERSION = 1
+NO_SECONDARY = 0xFF
+SIGNATURE_BYTES = 12
+SHARE_TOKEN_BYTES = 3 + 16 + SIGNATURE_BYTES
+
+
+def check_secret_key():
+    """Refuse to start a deployment without a real SECRET_KEY; warn loudly in development"""
+    if SECRET_KEY:
+        return
+    message = ("SECRET_KEY is unset or a placeholder, so each process signs share tokens with its own "
+               "random key. Set one with: flyctl secrets set SECRET_KEY=$(python -c "
+               "'import secrets; print(secrets.token_urlsafe(32))')")
+    if DEPLOYED:
+        raise RuntimeError(message)
+    print(f"Warning: {message}")
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Constant-time comparison against the configured admin token"""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def admin_token_from_headers(headers: Headers) -> Optional[str]:
+    """Read the admin token from X-Admin-Token or a Bearer Authorization header"""
+    token = headers.get("x-admin-token")
+    if token:
+        return token
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return None
+
+
+def is_admin(headers: Headers) -> bool:
+    """True when the request carries a valid admin token"""
+    return is_admin_token(admin_token_from_headers(headers))
+
+
+def require_admin(request: Request):
+    """FastAPI dependency rejecting requests without the admin token"""
+    if not is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+
+class ShareToken(NamedTuple):
+    session_id: str
+    primary: int
+    secondary: Optional[int]
+    # False when the signature does not match (other key, older quiz version, tampering):
+    # only session_id may then be used, and only to look the result up
+    verified: bool
+
+
+def _share_signature(body: bytes, quiz_version: str) -> bytes:
+    return hmac.new(_SHARE_KEY, body + quiz_version.encode(), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def share_token(session_id: str, primary: int, secondary: Optional[int], quiz_version: str) -> str:
+    """Compact URL-safe token for a result; primary and secondary are archetype indexes in quiz order"""
+    body = bytes((SHARE_TOKEN_VERSION, primary, NO_SECONDARY if secondary is None else secondary))
+    body += uuid.UUID(session_id).bytes
+    token = body + _share_signature(body, quiz_version)
+    return base64.urlsafe_b64encode(token).rstrip(b"=").decode()
+
+
+def read_share_token(token: str, quiz_version: str) -> Optional[ShareToken]:
+    """Decode a share token; None when it is not one"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != SHARE_TOKEN_BYTES or raw[0] != SHARE_TOKEN_VERSION:
+        return None
+    body, signature = raw[:-SIGNATURE_BYTES], raw[-SIGNATURE_BYTES:]
+    return ShareToken(
+        session_id=str(uuid.UUID(bytes=body[3:19])),
+        primary=body[1],
+        secondary=None if body[2] == NO_SECONDARY else body[2],
+        verified=hmac.compare_digest(signature, _share_signature(body, quiz_version)),
+    )
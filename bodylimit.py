@@ -0,0 +1,59 @@
+"""
+Request body size limits
+Rejects oversized request bodies with 413 before any JSON parsing: up front
+from Content-Length, or as soon as a chunked body passes the route's limit.
+"""
+
+import os
+from typing import Dict
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+DEFAULT_MAX_BYTES = int(os.getenv("BODY_LIMIT_DEFAULT", "65536"))
+
+# Per-route caps; a full quiz submission is well under 2 KB
+ROUTE_MAX_BYTES = {
+    "/api/submit": int(os.getenv("BODY_LIMIT_SUBMIT", "8192")),
+    "/api/analytics": int(os.getenv("BODY_LIMIT_ANALYTICS", "16384")),
+    "/api/score/batch": int(os.getenv("BODY_LIMIT_SCORE_BATCH", str(8 * 1024 * 1024))),
+}
+
+BODYLESS_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class BodyLimitMiddleware:
+    """Pure ASGI middleware enforcing ROUTE_MAX_BYTES on request bodies"""
+
+    def __init__(self, app, limits: Dict[str, int] = ROUTE_MAX_BYTES, default: int = DEFAULT_MAX_BYTES):
+        self.app = app
+        self.limits = limits
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in BODYLESS_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"], self.default)
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            # Bodies without a usable Content-Length are counted as they arrive
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
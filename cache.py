@@ -0,0 +1,64 @@
+"""
+In-memory caches shared by the request handlers
+Bounded LRU with optional TTL; hits and misses are reported to /metrics
+"""
+
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional
+
+import metrics
+
+_MISSING = object()
+
+# Every cache by name, for /health/ready
+CACHES: Dict[str, "LRUCache"] = {}
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with an optional per-entry TTL"""
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = metrics.cache(name)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.stats.miss()
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= monotonic():
+                del self._data[key]
+                self.stats.miss()
+                return default
+            self._data.move_to_end(key)
+            self.stats.hit()
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
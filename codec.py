@@ -0,0 +1,203 @@
+"""
+Compact binary encoding of stored responses and scores
+Fixed-width records laid out from the quiz definition, a fraction of the
+size of the JSON columns they replace:
+
+    responses_bin  version byte, then per question (quiz order) a primary
+                   code (0 unanswered, else 1 + answer index) and a bitmask
+                   of additional choices (bit i = answer index i)
+    scores_bin     version byte, secondary archetype index (255 = none),
+                   then a little-endian int16 score per archetype
+
+The order of additional choices is not kept; each is worth the same points
+and the decided archetypes are stored alongside.
+
+    python codec.py report             # JSON vs binary bytes per row
+    python codec.py backfill           # encode older rows, then VACUUM
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+CODEC_VERSION = 1
+NO_SECONDARY = 0xFF
+BACKFILL_CHUNK = 500
+
+
+class Codec:
+    """Encoder/decoder for one quiz definition's layout"""
+
+    def __init__(self, quiz: Dict[str, Any]):
+        self.questions = [str(question["id"]) for question in quiz["questions"]]
+        self.answers = [list(question["answers"]) for question in quiz["questions"]]
+        self.archetypes = list(quiz["archetypes"])
+        if any(len(answers) > 8 for answers in self.answers) or len(self.archetypes) >= NO_SECONDARY:
+            raise ValueError("quiz does not fit the binary layout (max 8 answers per question)")
+        self.response_size = 1 + 2 * len(self.questions)
+        self.scores_size = 2 + 2 * len(self.archetypes)
+        self._question_index = {question_id: i for i, question_id in enumerate(self.questions)}
+        self._answer_index = [{letter: i for i, letter in enumerate(answers)} for answers in self.answers]
+        self._archetype_index = {key: i for i, key in enumerate(self.archetypes)}
+
+    def encode_responses(self, responses: Dict[str, Any], strict: bool = True) -> bytes:
+        """Responses ({id: letter} or {id: {primary, secondary}}) as bytes; strict rejects unknown answers"""
+        record = bytearray(self.response_size)
+        record[0] = CODEC_VERSION
+        for question_id, answer in responses.items():
+            i = self._question_index.get(str(question_id))
+            if isinstance(answer, dict):
+                primary, secondary = answer.get("primary"), answer.get("secondary") or []
+            else:
+                primary, secondary = answer, []
+            if i is None or not isinstance(secondary, list):
+                if strict:
+                    raise ValueError(f"cannot encode question {question_id}")
+                continue
+
+            index = self._answer_index[i]
+            for choice in [primary, *secondary]:
+                if strict and (not isinstance(choice, str) or choice not in index):
+                    raise ValueError(f"cannot encode answer {choice!r} for question {question_id}")
+            if isinstance(primary, str) and primary in index:
+                record[1 + 2 * i] = index[primary] + 1
+            for choice in secondary:
+                if isinstance(choice, str) and choice in index:
+                    record[2 + 2 * i] |= 1 << index[choice]
+        return bytes(record)
+
+    def decode_responses(self, record: bytes) -> Dict[str, Dict[str, Any]]:
+        """Canonical responses (see models.QuizSubmission.canonical_responses); additional choices in answer order"""
+        self._check(record, self.response_size)
+        responses = {}
+        for i, question_id in enumerate(self.questions):
+            primary, mask = record[1 + 2 * i], record[2 + 2 * i]
+            if primary:
+                responses[question_id] = {
+                    "primary": self.answers[i][primary - 1],
+                    "secondary": [letter for bit, letter in enumerate(self.answers[i]) if mask >> bit & 1],
+                }
+        return responses
+
+    def encode_scores(self, scores: Dict[str, int], secondary: Optional[str]) -> bytes:
+        values = np.zeros(len(self.archetypes), dtype="<i2")
+        for key, score in scores.items():
+            if key not in self._archetype_index or not -32768 <= score <= 32767:
+                raise ValueError(f"cannot encode score {key}={score}")
+            values[self._archetype_index[key]] = score
+        if secondary is not None and secondary not in self._archetype_index:
+            raise ValueError(f"cannot encode secondary archetype {secondary!r}")
+        secondary_index = NO_SECONDARY if secondary is None else self._archetype_index[secondary]
+        return bytes((CODEC_VERSION, secondary_index)) + values.tobytes()
+
+    def decode_scores(self, record: bytes) -> Dict[str, Any]:
+        """{"scores": {archetype: points}, "secondary_archetype": key or None}, as stored in all_scores"""
+        self._check(record, self.scores_size)
+        values = np.frombuffer(record, dtype="<i2", offset=2).tolist()
+        return {
+            "scores": {key: score for key, score in zip(self.archetypes, values) if score},
+            "secondary_archetype": None if record[1] == NO_SECONDARY else self.archetypes[record[1]],
+        }
+
+    @staticmethod
+    def _check(record: bytes, size: int):
+        if len(record) != size or record[0] != CODEC_VERSION:
+            raise ValueError("unsupported binary record")
+
+
+def _choices(answer) -> Tuple[Any, list]:
+    if isinstance(answer, dict):
+        return answer.get("primary"), sorted(answer.get("secondary") or [])
+    return answer, []
+
+
+def parse_scores(scores_json: str) -> Dict[str, Any]:
+    """A JSON all_scores column in the shape decode_scores returns"""
+    stored = json.loads(scores_json) if scores_json else {}
+    # Early rows stored the bare {archetype: points} dict, without a secondary archetype
+    if isinstance(stored, dict) and stored and "scores" not in stored and "secondary_archetype" not in stored:
+        return {"scores": stored, "secondary_archetype": None}
+    return stored
+
+
+def convert_row(codec: Codec, responses_json: str, scores_json: str) -> Tuple[bytes, Optional[bytes], str, str]:
+    """Binary columns for a JSON-era row, plus what to keep of its JSON ('' once the binary says the same)"""
+    responses = json.loads(responses_json) if responses_json else {}
+    stored = parse_scores(scores_json)
+
+    try:
+        responses_bin = codec.encode_responses(responses)
+        decoded = codec.decode_responses(responses_bin)
+        same = decoded.keys() == {str(question_id) for question_id in responses} and all(
+            _choices(answer) == _choices(decoded[str(question_id)]) for question_id, answer in responses.items())
+    except (ValueError, TypeError):
+        responses_bin, same = codec.encode_responses(responses, strict=False), False
+
+    try:
+        scores = {key: score for key, score in stored.get("scores", {}).items() if score}
+        if not all(isinstance(score, int) for score in scores.values()):
+            raise TypeError("non-integer score")
+        scores_bin = codec.encode_scores(scores, stored.get("secondary_archetype"))
+        keep_scores = ""
+    except (ValueError, TypeError, AttributeError):
+        scores_bin, keep_scores = None, scores_json
+    return responses_bin, scores_bin, "" if same else responses_json, keep_scores
+
+
+async def backfill(repo, codec: Codec, chunk_size: int = BACKFILL_CHUNK, vacuum: bool = True) -> Dict[str, int]:
+    """Encode every row still without binary columns, in id order and short transactions"""
+    before = await repo.storage_bytes()
+    converted = kept = 0
+    after_id = 0
+    while True:
+        rows = await repo.results_to_encode(after_id, chunk_size)
+        if not rows:
+            break
+        updates = []
+        for row_id, responses_json, scores_json in rows:
+            responses_bin, scores_bin, keep_responses, keep_scores = convert_row(codec, responses_json, scores_json)
+            kept += bool(keep_responses or keep_scores)
+            updates.append((row_id, responses_bin, scores_bin, keep_responses, keep_scores))
+        await repo.store_encoded(updates)
+        converted += len(updates)
+        after_id = rows[-1][0]
+    if vacuum and converted:
+        await repo.reclaim_space()
+    return {"converted": converted, "kept_json": kept,
+            "bytes_before": before, "bytes_after": await repo.storage_bytes()}
+
+
+async def _main(args):
+    import database
+    from quiz_data import QUIZ_DATA
+
+    repo = database.create_repository()
+    codec = Codec(QUIZ_DATA)
+    await repo.init()
+    try:
+        if args.command == "backfill":
+            outcome = await backfill(repo, codec, args.chunk_size, vacuum=not args.no_vacuum)
+            change = outcome["bytes_after"] - outcome["bytes_before"]
+            print(f"Encoded {outcome['converted']} rows ({outcome['kept_json']} kept some JSON they could not "
+                  f"round-trip); storage {outcome['bytes_before']:,} -> {outcome['bytes_after']:,} bytes "
+                  f"({change / max(outcome['bytes_before'], 1):+.1%})")
+        usage = await repo.encoding_stats()
+        per_row = usage["binary_bytes"] / usage["encoded"] if usage["encoded"] else codec.response_size + codec.scores_size
+        json_rows = usage["rows"] - usage["encoded"]
+        print(f"{usage['rows']} results, {usage['encoded']} binary-encoded ({per_row:.0f} bytes/row)")
+        if json_rows:
+            print(f"{json_rows} rows still JSON-only: {usage['json_bytes'] / json_rows:.0f} bytes/row of JSON text")
+        print(f"Storage: {await repo.storage_bytes():,} bytes")
+    finally:
+        await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary encoding of stored responses and scores")
+    parser.add_argument("command", choices=("report", "backfill"))
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK)
+    parser.add_argument("--no-vacuum", action="store_true", help="skip reclaiming space after the backfill")
+    asyncio.run(_main(parser.parse_args()))
@@ -1 +1,1282 @@
+"""
+Database access layer for the AI Archetype Quiz
+- Instrumented SQLite connections: per-statement timing, row counts,
+  a bounded slow-query log and EXPLAIN QUERY PLAN capture for offenders
+- The storage interface route handlers depend on (Repository), with a
+  SQLite implementation and a pooled PostgreSQL implementation
+"""
 
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, wraps
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+import shards
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_LOG_SIZE = int(os.getenv("SLOW_LOG_SIZE", "100"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class StatementStats:
+    """Aggregate timings for one normalized statement"""
+
+    __slots__ = ("calls", "total_seconds", "max_seconds", "rows", "slow_calls")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+
+
+_stats: Dict[str, StatementStats] = {}
+_plans: Dict[str, List[str]] = {}
+_samples: Dict[str, Tuple[str, tuple]] = {}
+_slow_log: deque = deque(maxlen=SLOW_LOG_SIZE)
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=512)
+def normalize(sql: str) -> str:
+    """Collapse whitespace and replace literals so equivalent statements aggregate together"""
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _statement(normalized: str) -> StatementStats:
+    stats = _stats.get(normalized)
+    if stats is None:
+        with _lock:
+            stats = _stats.setdefault(normalized, StatementStats())
+    return stats
+
+
+def _capture_plan(conn: sqlite3.Connection, sql: str, parameters) -> List[str]:
+    try:
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        return [row[3] for row in rows]
+    except sqlite3.Error as e:
+        return [f"plan unavailable: {e}"]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execution and fetches and counts the rows they touch"""
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql, parameters, explainable=True)
+        started = perf_counter()
+        super().execute(sql, parameters)
+        self._finish(perf_counter() - started, max(self.rowcount, 0), call=True)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        # Plans for batches are not meaningful, so batches never reach the slow log
+        self._begin(sql, (), explainable=False)
+        started = perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._finish(perf_counter() - started, max(self.rowcount, 0), call=True)
+        return self
+
+    def fetchone(self):
+        started = perf_counter()
+        row = super().fetchone()
+        self._after_fetch(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._after_fetch(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = perf_counter()
+        rows = super().fetchall()
+        self._after_fetch(started, len(rows))
+        return rows
+
+    def _begin(self, sql: str, parameters, explainable: bool):
+        self._sql = sql
+        self._parameters = parameters
+        self._normalized = normalize(sql)
+        self._explainable = explainable
+        self._elapsed = 0.0
+        self._rows = 0
+        self._slow_entry = None
+
+    def _after_fetch(self, started: float, rows: int):
+        if getattr(self, "_normalized", None) is not None:
+            self._finish(perf_counter() - started, rows, call=False)
+
+    def _finish(self, elapsed: float, rows: int, call: bool):
+        stats = _statement(self._normalized)
+        if call:
+            stats.calls += 1
+            if self._explainable and self._normalized not in _samples:
+                # Keep one concrete example per statement for on-demand plans
+                _samples[self._normalized] = (self._sql, self._parameters)
+        stats.total_seconds += elapsed
+        stats.rows += rows
+        self._elapsed += elapsed
+        self._rows += rows
+        if self._elapsed > stats.max_seconds:
+            stats.max_seconds = self._elapsed
+
+        entry = self._slow_entry
+        if entry is not None:
+            # Already logged; keep the entry current as rows are fetched
+            entry["duration_ms"] = round(self._elapsed * 1000, 3)
+            entry["rows"] = self._rows
+        elif self._explainable and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            stats.slow_calls += 1
+            plan = _plans.get(self._normalized)
+            if plan is None:
+                plan = _plans[self._normalized] = _capture_plan(self.connection, self._sql, self._parameters)
+            self._slow_entry = {
+                "statement": self._normalized,
+                "duration_ms": round(self._elapsed * 1000, 3),
+                "rows": self._rows,
+                "plan": plan,
+                "at": datetime.now().isoformat(),
+            }
+            _slow_log.append(self._slow_entry)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose shortcut execute methods go through InstrumentedCursor"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(path, **kwargs) -> sqlite3.Connection:
+    """Open an instrumented SQLite connection"""
+    return sqlite3.connect(path, factory=InstrumentedConnection, **kwargs)
+
+
+def query_stats() -> List[Dict]:
+    """Per-statement aggregates, most expensive first"""
+    report = []
+    for statement, stats in list(_stats.items()):
+        report.append({
+            "statement": statement,
+            "calls": stats.calls,
+            "total_ms": round(stats.total_seconds * 1000, 3),
+            "mean_ms": round(stats.total_seconds * 1000 / stats.calls, 3) if stats.calls else 0.0,
+            "max_ms": round(stats.max_seconds * 1000, 3),
+            "rows": stats.rows,
+            "slow_calls": stats.slow_calls,
+            "plan": _plans.get(statement),
+        })
+    report.sort(key=lambda entry: entry["total_ms"], reverse=True)
+    return report
+
+
+def slow_queries() -> List[Dict]:
+    """Most recent slow statements, newest first"""
+    return list(reversed(_slow_log))
+
+
+def explain_all(conn: sqlite3.Connection):
+    """Capture plans for every seen statement that does not have one yet"""
+    for statement, (sql, parameters) in list(_samples.items()):
+        if statement not in _plans:
+            _plans[statement] = _capture_plan(conn, sql, parameters)
+
+
+def reset_stats():
+    """Forget all collected statement stats, plans and slow-log entries"""
+    with _lock:
+        _stats.clear()
+        _plans.clear()
+        _samples.clear()
+        _slow_log.clear()
+
+
+# ---------------------------------------------------------------------------
+# Storage interface
+# ---------------------------------------------------------------------------
+
+DB_PATH = Path(os.getenv("DB_PATH", "data/quiz.db"))
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+
+class StorageUnavailable(Exception):
+    """The backing store could not be reached"""
+
+
+class DuplicateSubmission(Exception):
+    """A result with the same idempotency key (or session id) already exists"""
+
+
+class Repository(ABC):
+    """Everything the route handlers need from storage
+
+    Rows are plain dicts. Timestamps are returned as 'YYYY-MM-DD HH:MM:SS'
+    UTC strings and JSON columns as JSON text, whatever the backend.
+    """
+
+    name = "base"
+
+    async def init(self):
+        """Create or migrate the schema"""
+
+    async def close(self):
+        """Release connections"""
+
+    @abstractmethod
+    async def save_result(self, row: Dict[str, Any]):
+        """Durably store a scored result; raises DuplicateSubmission on key conflicts"""
+
+    @abstractmethod
+    async def log_event(self, row: Dict[str, Any]):
+        """Store an analytics event (best effort)"""
+
+    @abstractmethod
+    async def get_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Result row for a shared results page"""
+
+    @abstractmethod
+    async def find_result_by_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """Result row previously stored under an Idempotency-Key"""
+
+    @abstractmethod
+    async def ping(self):
+        """One trivial round trip to the database (readiness probe); raises when it is unreachable"""
+
+    @abstractmethod
+    async def results_breakdown(self) -> List[Tuple]:
+        """One scan of results, grouped by (archetype, name, role, day within the last 30 days)
+
+        Each row is (primary_archetype, archetype_name, role_demographic, day,
+        count, count in the last 7 days, sum of completion_time, count of
+        completion_time); day is None for submissions older than 30 days.
+        """
+
+    @abstractmethod
+    async def event_counts(self, days: int = 7) -> Dict[str, int]:
+        """Analytics events per type over the last few days, most common first"""
+
+    async def explain_statements(self):
+        """Capture query plans for diagnostics, where the backend supports it"""
+
+    @abstractmethod
+    async def results_to_encode(self, after_id: int, limit: int) -> List[Tuple[int, str, str]]:
+        """(id, responses, all_scores) of rows without binary columns yet, in id order"""
+
+    @abstractmethod
+    async def store_encoded(self, rows: List[Tuple[int, bytes, Optional[bytes], str, str]]):
+        """Set (id, responses_bin, scores_bin, responses, all_scores) in one transaction"""
+
+    @abstractmethod
+    async def encoding_stats(self) -> Dict[str, int]:
+        """Row counts and bytes held as JSON text and as binary records"""
+
+    @abstractmethod
+    async def storage_bytes(self) -> int:
+        """On-disk size of the results data"""
+
+    @abstractmethod
+    async def reclaim_space(self):
+        """Return space freed by rewritten rows (VACUUM)"""
+
+    @abstractmethod
+    async def results_without_items(self, after_id: int, limit: int) -> List[Tuple[int, str, Optional[bytes]]]:
+        """(id, responses, responses_bin) of results with no response_items rows, in id order"""
+
+    @abstractmethod
+    async def store_items(self, items: List[Tuple[int, int, str, int, int]]):
+        """Insert (result_id, question_id, choice, weight, is_primary) rows, skipping existing ones"""
+
+    @abstractmethod
+    async def answer_counts(self, question_id: Optional[int] = None) -> List[Tuple]:
+        """(question_id, choice, count, first choice count, points) per answer, for one or every question"""
+
+    @abstractmethod
+    async def funnel_checkpoint(self) -> Dict[str, int]:
+        """Last analytics event id folded into the funnel, per event source"""
+
+    @abstractmethod
+    async def analytics_after(self, checkpoint: Dict[str, int], limit: int) -> List[Tuple]:
+        """Up to limit events past the checkpoint, oldest first
+
+        Each row is (source, id, event_type, session_id, event_data,
+        ip_address, user_agent, created_at).
+        """
+
+    @abstractmethod
+    async def funnel_sessions(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored state of the given funnel sessions"""
+
+    @abstractmethod
+    async def idle_funnel_sessions(self, before: str, limit: int) -> Dict[str, Dict[str, Any]]:
+        """Up to limit funnel sessions last seen before the given time"""
+
+    @abstractmethod
+    async def save_funnel(self, changes: Dict[str, Any]):
+        """Apply one funnel.Batch (sessions, rollup increments, checkpoint) in one transaction"""
+
+    @abstractmethod
+    async def funnel_rollup(self) -> Dict[str, Any]:
+        """Funnel rollup tables: stages, per-question rows, dwell histogram rows and open sessions"""
+
+
+def _observe(site: str, started: float):
+    metrics.observe_sql(site, perf_counter() - started)
+
+
+def _threaded(method):
+    """Make a blocking sqlite3 method a coroutine run in the default executor, off the event loop"""
+    @wraps(method)
+    async def run(self, *args, **kwargs):
+        return await asyncio.to_thread(method, self, *args, **kwargs)
+    return run
+
+
+# Write statements - run in-process, or by the dedicated writer (writer.py)
+BLOB_COLUMNS = ("responses_bin", "scores_bin")
+
+
+def insert_items(conn: sqlite3.Connection, items: List[Tuple]):
+    """Insert (result_id, question_id, choice, weight, is_primary) response items (caller commits)"""
+    conn.executemany('''
+        INSERT OR IGNORE INTO response_items (result_id, question_id, choice, weight, is_primary)
+        VALUES (?, ?, ?, ?, ?)
+    ''', items)
+
+
+def insert_result(conn: sqlite3.Connection, row: Dict):
+    """Insert one scored quiz result and its response items (caller commits)"""
+    # Binary columns arrive as hex when relayed through writer.py's JSON protocol
+    row = {**row, **{column: bytes.fromhex(row[column]) for column in BLOB_COLUMNS if isinstance(row.get(column), str)}}
+    cursor = conn.execute('''
+        INSERT INTO results
+        (session_id, primary_archetype, archetype_name, all_scores, responses, responses_bin, scores_bin,
+         role_demographic, completion_time, user_agent, ip_address, idempotency_key)
+        VALUES (:session_id, :primary_archetype, :archetype_name, :all_scores, :responses, :responses_bin, :scores_bin,
+                :role_demographic, :completion_time, :user_agent, :ip_address, :idempotency_key)
+    ''', {"responses_bin": None, "scores_bin": None, **row})
+    insert_items(conn, [(cursor.lastrowid, *item) for item in row.get("items", ())])
+
+
+def update_encoded(conn: sqlite3.Connection, rows: List[List]):
+    """Set (id, responses_bin, scores_bin, responses, all_scores) on existing results (caller commits)"""
+    conn.executemany('''
+        UPDATE results SET responses_bin = ?, scores_bin = ?, responses = ?, all_scores = ?
+        WHERE id = ?
+    ''', [(*(bytes.fromhex(value) if isinstance(value, str) else value for value in (responses_bin, scores_bin)),
+           responses, all_scores, row_id)
+          for row_id, responses_bin, scores_bin, responses, all_scores in rows])
+
+
+def insert_event(conn: sqlite3.Connection, row: Dict):
+    """Insert one analytics event into this month's shard (caller commits)"""
+    schema = shards.attach_current(conn)
+    conn.execute(f'''
+        INSERT INTO {schema}.analytics (event_type, session_id, event_data, ip_address, user_agent)
+        VALUES (:event_type, :session_id, :event_data, :ip_address, :user_agent)
+    ''', row)
+
+
+# Funnel state and rollups (see funnel.py); the same DDL works on SQLite and PostgreSQL
+FUNNEL_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS funnel_checkpoints (
+        source TEXT PRIMARY KEY,
+        last_id BIGINT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS funnel_sessions (
+        session_key TEXT PRIMARY KEY,
+        started_at TEXT,
+        last_event_at TEXT NOT NULL,
+        furthest INTEGER NOT NULL,
+        reached BIGINT NOT NULL,
+        last_answer_at TEXT,
+        finished INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_funnel_sessions_last_event ON funnel_sessions(last_event_at)',
+    '''
+    CREATE TABLE IF NOT EXISTS funnel_stages (
+        stage TEXT PRIMARY KEY,
+        sessions BIGINT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS funnel_questions (
+        question_number INTEGER PRIMARY KEY,
+        reached BIGINT NOT NULL,
+        dropped BIGINT NOT NULL,
+        dwell_count BIGINT NOT NULL,
+        dwell_seconds DOUBLE PRECISION NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS funnel_dwell (
+        question_number INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        sessions BIGINT NOT NULL,
+        PRIMARY KEY (question_number, bucket)
+    )
+    ''',
+)
+
+# Daily event counts kept by retention.py for archived raw events
+ROLLUP_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_daily (
+        day TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        events INTEGER NOT NULL,
+        PRIMARY KEY (day, event_type)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_archived (
+        month TEXT PRIMARY KEY,
+        events INTEGER NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+)
+
+SESSION_FIELDS = ("started_at", "last_event_at", "furthest", "reached", "last_answer_at", "finished")
+
+
+def _funnel_session_rows(rows) -> Dict[str, Dict[str, Any]]:
+    return {row[0]: dict(zip(SESSION_FIELDS, row[1:])) for row in rows}
+
+
+def funnel_rows(changes: Dict[str, Any]) -> Dict[str, List]:
+    """A funnel.Batch's changes as lists of rows, which also survive writer.py's JSON protocol"""
+    return {
+        "closed": list(changes["closed"]),
+        "sessions": [[key, *(state[field] for field in SESSION_FIELDS)] for key, state in changes["sessions"].items()],
+        "stages": [list(item) for item in changes["stages"].items()],
+        "questions": [[number, *values] for number, values in changes["questions"].items()],
+        "dwell": [[number, bucket, sessions] for (number, bucket), sessions in changes["dwell"].items()],
+        "checkpoint": [list(item) for item in changes["checkpoint"].items()],
+    }
+
+
+def apply_funnel(conn: sqlite3.Connection, rows: Dict[str, List]):
+    """Apply funnel_rows() (caller commits)"""
+    conn.executemany('DELETE FROM funnel_sessions WHERE session_key = ?', [(key,) for key in rows["closed"]])
+    conn.executemany(f'''
+        INSERT OR REPLACE INTO funnel_sessions (session_key, {", ".join(SESSION_FIELDS)})
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows["sessions"])
+    conn.executemany('''
+        INSERT INTO funnel_stages (stage, sessions) VALUES (?, ?)
+        ON CONFLICT(stage) DO UPDATE SET sessions = sessions + excluded.sessions
+    ''', rows["stages"])
+    conn.executemany('''
+        INSERT INTO funnel_questions (question_number, reached, dropped, dwell_count, dwell_seconds)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(question_number) DO UPDATE SET
+            reached = reached + excluded.reached, dropped = dropped + excluded.dropped,
+            dwell_count = dwell_count + excluded.dwell_count,
+            dwell_seconds = dwell_seconds + excluded.dwell_seconds
+    ''', rows["questions"])
+    conn.executemany('''
+        INSERT INTO funnel_dwell (question_number, bucket, sessions) VALUES (?, ?, ?)
+        ON CONFLICT(question_number, bucket) DO UPDATE SET sessions = sessions + excluded.sessions
+    ''', rows["dwell"])
+    conn.executemany('INSERT OR REPLACE INTO funnel_checkpoints (source, last_id) VALUES (?, ?)', rows["checkpoint"])
+
+
+def _funnel_rollup(stages, questions, dwell, open_sessions) -> Dict[str, Any]:
+    return {"stages": dict(stages), "questions": [tuple(row) for row in questions],
+            "dwell": [tuple(row) for row in dwell], "open_sessions": open_sessions}
+
+
+WRITES = {
+    "result": insert_result,
+    "event": insert_event,
+    "items": insert_items,
+    "encoded": update_encoded,
+    "funnel": apply_funnel,
+}
+
+
+class SQLiteRepository(Repository):
+    """SQLite file storage; writes go through writer.py when a socket is configured"""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path = DB_PATH, writer_socket: str = ""):
+        self.path = Path(path)
+        self.writer = None
+        if writer_socket:
+            from writer import WriterClient
+            self.writer = WriterClient(writer_socket)
+
+    def connect(self) -> sqlite3.Connection:
+        return connect(self.path)
+
+    @_threaded
+    def init(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connect()
+        
+        try:
+            # WAL lets readers in every worker run alongside the single writer
+            conn.execute('PRAGMA journal_mode=WAL')
+            
+            # Results table - base schema first
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT UNIQUE NOT NULL,
+                    primary_archetype TEXT NOT NULL,
+                    archetype_name TEXT NOT NULL,
+                    all_scores TEXT NOT NULL,
+                    responses TEXT NOT NULL,
+                    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    completion_time REAL,
+                    user_agent TEXT,
+                    ip_address TEXT
+                )
+            ''')
+            
+            # Check if role_demographic column exists, if not add it
+            cursor = conn.execute("PRAGMA table_info(results)")
+            columns = [column[1] for column in cursor.fetchall()]
+            
+            if 'role_demographic' not in columns:
+                print("Adding role_demographic column...")
+                conn.execute('ALTER TABLE results ADD COLUMN role_demographic TEXT')
+            
+            if 'idempotency_key' not in columns:
+                print("Adding idempotency_key column...")
+                conn.execute('ALTER TABLE results ADD COLUMN idempotency_key TEXT')
+            
+            # Compact encodings of responses and all_scores (see codec.py)
+            for column in BLOB_COLUMNS:
+                if column not in columns:
+                    print(f"Adding {column} column...")
+                    conn.execute(f'ALTER TABLE results ADD COLUMN {column} BLOB')
+            
+            # Create indexes - now safe to create the role index since column exists
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_archetype ON results(primary_archetype)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_completed ON results(completed_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_results_role ON results(role_demographic)')
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_results_idempotency ON results(idempotency_key)')
+            
+            # One row per chosen answer, for SQL-side item analytics (see items.py)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_items (
+                    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+                    question_id INTEGER NOT NULL,
+                    choice TEXT NOT NULL,
+                    weight INTEGER NOT NULL,
+                    is_primary INTEGER NOT NULL,
+                    PRIMARY KEY (result_id, question_id, choice)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_response_items_answer
+                ON response_items(question_id, choice, is_primary, weight)
+            ''')
+            for statement in FUNNEL_SCHEMA + ROLLUP_SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            
+            # Analytics events live in monthly shard files (see shards.py)
+            shards.migrate_legacy(conn)
+            shards.seal_due()
+            shards.migrate_event_columns()
+            print("Database initialized successfully")
+            
+        except Exception as e:
+            print(f"Database initialization error: {e}")
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    async def save_result(self, row: Dict[str, Any]):
+        started = perf_counter()
+        try:
+            if self.writer:
+                await self.writer.write("result", {
+                    **row, **{column: row[column].hex() for column in BLOB_COLUMNS if row.get(column) is not None}
+                })
+            else:
+                await asyncio.to_thread(self._write, insert_result, row)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateSubmission(str(e))
+        _observe("submit_insert", started)
+
+    async def log_event(self, row: Dict[str, Any]):
+        if self.writer:
+            self.writer.send("event", row)
+            return
+        started = perf_counter()
+        await asyncio.to_thread(self._write, insert_event, row)
+        _observe("analytics_insert", started)
+
+    def _write(self, insert, row):
+        conn = self.connect()
+        try:
+            insert(conn, row)
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def _write_through(self, op: str, row):
+        """Apply one of WRITES in its own transaction, via the writer process when there is one"""
+        if self.writer:
+            await self.writer.write(op, row)
+        else:
+            await asyncio.to_thread(self._write, WRITES[op], row)
+
+    @_threaded
+    def get_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            row = conn.execute('''
+                SELECT primary_archetype, archetype_name, all_scores, scores_bin, completed_at, completion_time,
+                       role_demographic
+                FROM results WHERE session_id = ?
+            ''', (session_id,)).fetchone()
+        finally:
+            conn.close()
+        _observe("results_lookup", started)
+        if not row:
+            return None
+        return dict(zip(("primary_archetype", "archetype_name", "all_scores", "scores_bin", "completed_at",
+                         "completion_time", "role_demographic"), row))
+
+    @_threaded
+    def find_result_by_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self.connect()
+        try:
+            row = conn.execute('''
+                SELECT session_id, primary_archetype, archetype_name, all_scores, scores_bin, role_demographic,
+                       completion_time
+                FROM results WHERE idempotency_key = ?
+            ''', (key,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return dict(zip(("session_id", "primary_archetype", "archetype_name", "all_scores", "scores_bin",
+                         "role_demographic", "completion_time"), row))
+
+    @_threaded
+    def ping(self):
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            # Reads the schema and one page, whatever the table size
+            conn.execute('SELECT 1 FROM results LIMIT 1').fetchall()
+        finally:
+            conn.close()
+        _observe("health_check", started)
+
+    @_threaded
+    def results_breakdown(self) -> List[Tuple]:
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            rows = conn.execute('''
+                SELECT primary_archetype, archetype_name, role_demographic,
+                       CASE WHEN completed_at > datetime('now', '-30 days') THEN DATE(completed_at) END AS day,
+                       COUNT(*),
+                       SUM(CASE WHEN completed_at > datetime('now', '-7 days') THEN 1 ELSE 0 END),
+                       SUM(completion_time),
+                       COUNT(completion_time)
+                FROM results
+                GROUP BY primary_archetype, archetype_name, role_demographic, day
+            ''').fetchall()
+        finally:
+            conn.close()
+        _observe("stats_results", started)
+        return rows
+
+    @_threaded
+    def event_counts(self, days: int = 7) -> Dict[str, int]:
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            # Only the shards overlapping the window
+            shards.attach_window(conn, since=datetime.now(timezone.utc) - timedelta(days=days))
+            # Events retention has archived only survive as daily counts (whole days)
+            events = dict(conn.execute('''
+                SELECT event_type, SUM(count) AS count FROM (
+                    SELECT event_type, COUNT(*) AS count
+                    FROM analytics 
+                    WHERE created_at > datetime('now', ?)
+                    GROUP BY event_type
+                    UNION ALL
+                    SELECT event_type, SUM(events)
+                    FROM main.analytics_daily
+                    WHERE day >= DATE('now', ?)
+                    GROUP BY event_type
+                )
+                GROUP BY event_type
+                ORDER BY count DESC
+            ''', (f"-{days} days", f"-{days} days")).fetchall())
+        finally:
+            conn.close()
+        _observe("stats_events", started)
+        return events
+
+    @_threaded
+    def explain_statements(self):
+        conn = self.connect()
+        try:
+            explain_all(conn)
+        finally:
+            conn.close()
+
+    @_threaded
+    def results_to_encode(self, after_id: int, limit: int) -> List[Tuple[int, str, str]]:
+        conn = self.connect()
+        try:
+            return conn.execute('''
+                SELECT id, responses, all_scores FROM results
+                WHERE responses_bin IS NULL AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (after_id, limit)).fetchall()
+        finally:
+            conn.close()
+
+    async def store_encoded(self, rows: List[Tuple[int, bytes, Optional[bytes], str, str]]):
+        await self._write_through("encoded", [
+            [row_id, responses_bin.hex(), scores_bin.hex() if scores_bin is not None else None, responses, all_scores]
+            for row_id, responses_bin, scores_bin, responses, all_scores in rows
+        ])
+
+    @_threaded
+    def encoding_stats(self) -> Dict[str, int]:
+        conn = self.connect()
+        try:
+            row = conn.execute('''
+                SELECT COUNT(*), COUNT(responses_bin),
+                       COALESCE(SUM(LENGTH(CAST(responses AS BLOB)) + LENGTH(CAST(all_scores AS BLOB))), 0),
+                       COALESCE(SUM(LENGTH(responses_bin) + COALESCE(LENGTH(scores_bin), 0)), 0)
+                FROM results
+            ''').fetchone()
+        finally:
+            conn.close()
+        return dict(zip(("rows", "encoded", "json_bytes", "binary_bytes"), row))
+
+    @_threaded
+    def storage_bytes(self) -> int:
+        conn = self.connect()
+        try:
+            pages = conn.execute('PRAGMA page_count').fetchone()[0]
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        finally:
+            conn.close()
+        return pages * page_size
+
+    @_threaded
+    def reclaim_space(self):
+        conn = self.connect()
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+    @_threaded
+    def results_without_items(self, after_id: int, limit: int) -> List[Tuple[int, str, Optional[bytes]]]:
+        conn = self.connect()
+        try:
+            return conn.execute('''
+                SELECT id, responses, responses_bin FROM results
+                WHERE id > ? AND NOT EXISTS (SELECT 1 FROM response_items WHERE result_id = results.id)
+                ORDER BY id LIMIT ?
+            ''', (after_id, limit)).fetchall()
+        finally:
+            conn.close()
+
+    async def store_items(self, items: List[Tuple[int, int, str, int, int]]):
+        await self._write_through("items", [list(item) for item in items])
+
+    @_threaded
+    def answer_counts(self, question_id: Optional[int] = None) -> List[Tuple]:
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            # Covered by idx_response_items_answer; one question is a range of it
+            where, parameters = ('WHERE question_id = ?', (question_id,)) if question_id is not None else ('', ())
+            rows = conn.execute(f'''
+                SELECT question_id, choice, COUNT(*), SUM(is_primary), SUM(weight)
+                FROM response_items {where}
+                GROUP BY question_id, choice
+            ''', parameters).fetchall()
+        finally:
+            conn.close()
+        _observe("stats_answers", started)
+        return rows
+
+    @_threaded
+    def funnel_checkpoint(self) -> Dict[str, int]:
+        conn = self.connect()
+        try:
+            return dict(conn.execute('SELECT source, last_id FROM funnel_checkpoints').fetchall())
+        finally:
+            conn.close()
+
+    @_threaded
+    def analytics_after(self, checkpoint: Dict[str, int], limit: int) -> List[Tuple]:
+        # Sources are monthly shards. Sealed months older than the newest
+        # checkpoint are finished; open ones are re-checked for late writes.
+        newest = max(checkpoint, default="")
+        events = []
+        conn = self.connect()
+        try:
+            for month in shards.list_months():
+                if month < newest and shards.is_sealed(month):
+                    continue
+                schema = "funnel_" + month.replace("-", "_")
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shards.shard_path(month).resolve()),))
+                try:
+                    rows = conn.execute(f'''
+                        SELECT id, event_type, session_id, event_data, ip_address, user_agent, created_at
+                        FROM {schema}.analytics WHERE id > ? ORDER BY id LIMIT ?
+                    ''', (checkpoint.get(month, 0), limit - len(events))).fetchall()
+                finally:
+                    conn.execute(f"DETACH DATABASE {schema}")
+                events.extend((month, *row) for row in rows)
+                if len(events) >= limit:
+                    break
+        finally:
+            conn.close()
+        return events
+
+    @_threaded
+    def funnel_sessions(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        sessions = {}
+        conn = self.connect()
+        try:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                sessions.update(_funnel_session_rows(conn.execute(f'''
+                    SELECT session_key, {", ".join(SESSION_FIELDS)} FROM funnel_sessions
+                    WHERE session_key IN ({", ".join("?" * len(chunk))})
+                ''', chunk).fetchall()))
+        finally:
+            conn.close()
+        return sessions
+
+    @_threaded
+    def idle_funnel_sessions(self, before: str, limit: int) -> Dict[str, Dict[str, Any]]:
+        conn = self.connect()
+        try:
+            return _funnel_session_rows(conn.execute(f'''
+                SELECT session_key, {", ".join(SESSION_FIELDS)} FROM funnel_sessions
+                WHERE last_event_at < ? ORDER BY last_event_at LIMIT ?
+            ''', (before, limit)).fetchall())
+        finally:
+            conn.close()
+
+    async def save_funnel(self, changes: Dict[str, Any]):
+        await self._write_through("funnel", funnel_rows(changes))
+
+    @_threaded
+    def funnel_rollup(self) -> Dict[str, Any]:
+        started = perf_counter()
+        conn = self.connect()
+        try:
+            rollup = _funnel_rollup(
+                conn.execute('SELECT stage, sessions FROM funnel_stages').fetchall(),
+                conn.execute('''
+                    SELECT question_number, reached, dropped, dwell_count, dwell_seconds
+                    FROM funnel_questions ORDER BY question_number
+                ''').fetchall(),
+                conn.execute('SELECT question_number, bucket, sessions FROM funnel_dwell').fetchall(),
+                conn.execute('SELECT COUNT(*) FROM funnel_sessions WHERE started_at IS NOT NULL').fetchone()[0],
+            )
+        finally:
+            conn.close()
+        _observe("stats_funnel", started)
+        return rollup
+
+
+class PostgresRepository(Repository):
+    """PostgreSQL storage over an asyncpg connection pool"""
+
+    name = "postgres"
+
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS results (
+            id BIGSERIAL PRIMARY KEY,
+            session_id TEXT UNIQUE NOT NULL,
+            primary_archetype TEXT NOT NULL,
+            archetype_name TEXT NOT NULL,
+            all_scores TEXT NOT NULL,
+            responses TEXT NOT NULL,
+            completed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            completion_time DOUBLE PRECISION,
+            user_agent TEXT,
+            ip_address TEXT,
+            role_demographic TEXT,
+            idempotency_key TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id BIGSERIAL PRIMARY KEY,
+            event_type TEXT NOT NULL,
+            session_id TEXT,
+            event_data TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+        )
+        ''',
+        'ALTER TABLE results ADD COLUMN IF NOT EXISTS responses_bin BYTEA',
+        'ALTER TABLE results ADD COLUMN IF NOT EXISTS scores_bin BYTEA',
+        '''
+        CREATE TABLE IF NOT EXISTS response_items (
+            result_id BIGINT NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+            question_id SMALLINT NOT NULL,
+            choice TEXT NOT NULL,
+            weight SMALLINT NOT NULL,
+            is_primary SMALLINT NOT NULL,
+            PRIMARY KEY (result_id, question_id, choice)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_response_items_answer ON response_items(question_id, choice, is_primary, weight)',
+        'CREATE INDEX IF NOT EXISTS idx_results_archetype ON results(primary_archetype)',
+        'CREATE INDEX IF NOT EXISTS idx_results_completed ON results(completed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_results_role ON results(role_demographic)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_results_idempotency ON results(idempotency_key)',
+        'CREATE INDEX IF NOT EXISTS idx_analytics_event ON analytics(event_type)',
+        'CREATE INDEX IF NOT EXISTS idx_analytics_created ON analytics(created_at)',
+        # Hot event_data keys as stored generated columns (see shards.EVENT_FIELDS). The
+        # helpers return NULL for malformed JSON or values of the wrong type, so an odd
+        # client payload can never make the insert fail.
+        '''
+        CREATE OR REPLACE FUNCTION analytics_text(data TEXT, field TEXT) RETURNS TEXT
+        LANGUAGE plpgsql IMMUTABLE AS $$
+        BEGIN
+            RETURN data::jsonb ->> field;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END $$
+        ''',
+        '''
+        CREATE OR REPLACE FUNCTION analytics_integer(data TEXT, field TEXT) RETURNS INTEGER
+        LANGUAGE plpgsql IMMUTABLE AS $$
+        BEGIN
+            RETURN (data::jsonb ->> field)::integer;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END $$
+        ''',
+        '''
+        CREATE OR REPLACE FUNCTION analytics_number(data TEXT, field TEXT) RETURNS DOUBLE PRECISION
+        LANGUAGE plpgsql IMMUTABLE AS $$
+        BEGIN
+            RETURN (data::jsonb ->> field)::double precision;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END $$
+        ''',
+        "ALTER TABLE analytics ADD COLUMN IF NOT EXISTS archetype TEXT "
+        "GENERATED ALWAYS AS (analytics_text(event_data, 'archetype')) STORED",
+        "ALTER TABLE analytics ADD COLUMN IF NOT EXISTS role TEXT "
+        "GENERATED ALWAYS AS (analytics_text(event_data, 'role')) STORED",
+        "ALTER TABLE analytics ADD COLUMN IF NOT EXISTS page TEXT "
+        "GENERATED ALWAYS AS (analytics_text(event_data, 'page')) STORED",
+        "ALTER TABLE analytics ADD COLUMN IF NOT EXISTS question_number INTEGER "
+        "GENERATED ALWAYS AS (analytics_integer(event_data, 'question_number')) STORED",
+        "ALTER TABLE analytics ADD COLUMN IF NOT EXISTS completion_time DOUBLE PRECISION "
+        "GENERATED ALWAYS AS (analytics_number(event_data, 'completion_time')) STORED",
+        *(f'CREATE INDEX IF NOT EXISTS idx_analytics_{name} ON analytics({name}) WHERE {name} IS NOT NULL'
+          for name, _, _ in shards.EVENT_FIELDS),
+        *FUNNEL_SCHEMA,
+    )
+
+    INSERT_ITEM = '''
+        INSERT INTO response_items (result_id, question_id, choice, weight, is_primary)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT DO NOTHING
+    '''
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def init(self):
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but asyncpg is not installed")
+        try:
+            self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        except (OSError, asyncpg.PostgresError) as e:
+            raise StorageUnavailable(f"PostgreSQL unavailable: {e}")
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Serialize schema setup across workers starting together
+                await conn.execute("SELECT pg_advisory_xact_lock(hashtext('quiz_schema'))")
+                for statement in self.SCHEMA:
+                    await conn.execute(statement)
+        print("Database initialized successfully (PostgreSQL)")
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+
+    @staticmethod
+    def _timestamp(value) -> Optional[str]:
+        return value.strftime("%Y-%m-%d %H:%M:%S") if value is not None else None
+
+    async def save_result(self, row: Dict[str, Any]):
+        import asyncpg
+        started = perf_counter()
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    result_id = await conn.fetchval('''
+                        INSERT INTO results
+                        (session_id, primary_archetype, archetype_name, all_scores, responses, responses_bin,
+                         scores_bin, role_demographic, completion_time, user_agent, ip_address, idempotency_key)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+                        RETURNING id
+                    ''', row["session_id"], row["primary_archetype"], row["archetype_name"], row["all_scores"],
+                        row["responses"], row.get("responses_bin"), row.get("scores_bin"), row["role_demographic"],
+                        row["completion_time"], row["user_agent"], row["ip_address"], row["idempotency_key"])
+                    if row.get("items"):
+                        await conn.executemany(self.INSERT_ITEM, [(result_id, *item) for item in row["items"]])
+        except asyncpg.UniqueViolationError as e:
+            raise DuplicateSubmission(str(e))
+        except OSError as e:
+            raise StorageUnavailable(str(e))
+        _observe("submit_insert", started)
+
+    async def log_event(self, row: Dict[str, Any]):
+        started = perf_counter()
+        await self.pool.execute('''
+            INSERT INTO analytics (event_type, session_id, event_data, ip_address, user_agent)
+            VALUES ($1, $2, $3, $4, $5)
+        ''', row["event_type"], row["session_id"], row["event_data"], row["ip_address"], row["user_agent"])
+        _observe("analytics_insert", started)
+
+    async def get_result(self, session_id: str) -> Optional[Dict[str, Any]]:
+        started = perf_counter()
+        record = await self.pool.fetchrow('''
+            SELECT primary_archetype, archetype_name, all_scores, scores_bin, completed_at, completion_time,
+                   role_demographic
+            FROM results WHERE session_id = $1
+        ''', session_id)
+        _observe("results_lookup", started)
+        if record is None:
+            return None
+        row = dict(record)
+        row["completed_at"] = self._timestamp(row["completed_at"])
+        return row
+
+    async def find_result_by_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        record = await self.pool.fetchrow('''
+            SELECT session_id, primary_archetype, archetype_name, all_scores, scores_bin, role_demographic,
+                   completion_time
+            FROM results WHERE idempotency_key = $1
+        ''', key)
+        return dict(record) if record is not None else None
+
+    async def ping(self):
+        started = perf_counter()
+        await self.pool.fetchval('SELECT 1')
+        _observe("health_check", started)
+
+    async def results_breakdown(self) -> List[Tuple]:
+        started = perf_counter()
+        rows = [tuple(record) for record in await self.pool.fetch('''
+            SELECT primary_archetype, archetype_name, role_demographic,
+                   CASE WHEN completed_at > (now() AT TIME ZONE 'utc') - interval '30 days'
+                        THEN to_char(completed_at, 'YYYY-MM-DD') END AS day,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE completed_at > (now() AT TIME ZONE 'utc') - interval '7 days'),
+                   SUM(completion_time),
+                   COUNT(completion_time)
+            FROM results
+            GROUP BY primary_archetype, archetype_name, role_demographic, day
+        ''')]
+        _observe("stats_results", started)
+        return rows
+
+    async def event_counts(self, days: int = 7) -> Dict[str, int]:
+        started = perf_counter()
+        events = {record[0]: record[1] for record in await self.pool.fetch('''
+            SELECT event_type, COUNT(*) AS count
+            FROM analytics
+            WHERE created_at > (now() AT TIME ZONE 'utc') - make_interval(days => $1)
+            GROUP BY event_type
+            ORDER BY count DESC
+        ''', days)}
+        _observe("stats_events", started)
+        return events
+
+    async def results_to_encode(self, after_id: int, limit: int) -> List[Tuple[int, str, str]]:
+        return [tuple(record) for record in await self.pool.fetch('''
+            SELECT id, responses, all_scores FROM results
+            WHERE responses_bin IS NULL AND id > $1
+            ORDER BY id LIMIT $2
+        ''', after_id, limit)]
+
+    async def store_encoded(self, rows: List[Tuple[int, bytes, Optional[bytes], str, str]]):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany('''
+                    UPDATE results SET responses_bin = $2, scores_bin = $3, responses = $4, all_scores = $5
+                    WHERE id = $1
+                ''', rows)
+
+    async def encoding_stats(self) -> Dict[str, int]:
+        record = await self.pool.fetchrow('''
+            SELECT COUNT(*), COUNT(responses_bin),
+                   COALESCE(SUM(octet_length(responses) + octet_length(all_scores)), 0),
+                   COALESCE(SUM(octet_length(responses_bin) + COALESCE(octet_length(scores_bin), 0)), 0)
+            FROM results
+        ''')
+        return dict(zip(("rows", "encoded", "json_bytes", "binary_bytes"), record))
+
+    async def storage_bytes(self) -> int:
+        return await self.pool.fetchval("SELECT pg_total_relation_size('results')")
+
+    async def reclaim_space(self):
+        # Plain VACUUM makes the space reusable without locking out readers and writers
+        await self.pool.execute('VACUUM ANALYZE results')
+
+    async def results_without_items(self, after_id: int, limit: int) -> List[Tuple[int, str, Optional[bytes]]]:
+        return [tuple(record) for record in await self.pool.fetch('''
+            SELECT id, responses, responses_bin FROM results
+            WHERE id > $1 AND NOT EXISTS (SELECT 1 FROM response_items WHERE result_id = results.id)
+            ORDER BY id LIMIT $2
+        ''', after_id, limit)]
+
+    async def store_items(self, items: List[Tuple[int, int, str, int, int]]):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(self.INSERT_ITEM, items)
+
+    async def answer_counts(self, question_id: Optional[int] = None) -> List[Tuple]:
+        started = perf_counter()
+        where, parameters = ('WHERE question_id = $1', (question_id,)) if question_id is not None else ('', ())
+        rows = [tuple(record) for record in await self.pool.fetch(f'''
+            SELECT question_id, choice, COUNT(*), SUM(is_primary), SUM(weight)
+            FROM response_items {where}
+            GROUP BY question_id, choice
+        ''', *parameters)]
+        _observe("stats_answers", started)
+        return rows
+
+    async def funnel_checkpoint(self) -> Dict[str, int]:
+        return {record[0]: record[1] for record in await self.pool.fetch(
+            'SELECT source, last_id FROM funnel_checkpoints')}
+
+    async def analytics_after(self, checkpoint: Dict[str, int], limit: int) -> List[Tuple]:
+        # Ids are handed out before commit; leaving the last few seconds for
+        # the next run keeps a slow transaction's event from being skipped
+        return [("analytics", record[0], record[1], record[2], record[3], record[4], record[5],
+                 self._timestamp(record[6]))
+                for record in await self.pool.fetch('''
+            SELECT id, event_type, session_id, event_data, ip_address, user_agent, created_at
+            FROM analytics
+            WHERE id > $1 AND created_at < (now() AT TIME ZONE 'utc') - interval '5 seconds'
+            ORDER BY id LIMIT $2
+        ''', checkpoint.get("analytics", 0), limit)]
+
+    async def funnel_sessions(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        return _funnel_session_rows(await self.pool.fetch(f'''
+            SELECT session_key, {", ".join(SESSION_FIELDS)} FROM funnel_sessions
+            WHERE session_key = ANY($1::text[])
+        ''', keys))
+
+    async def idle_funnel_sessions(self, before: str, limit: int) -> Dict[str, Dict[str, Any]]:
+        return _funnel_session_rows(await self.pool.fetch(f'''
+            SELECT session_key, {", ".join(SESSION_FIELDS)} FROM funnel_sessions
+            WHERE last_event_at < $1 ORDER BY last_event_at LIMIT $2
+        ''', before, limit))
+
+    async def save_funnel(self, changes: Dict[str, Any]):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute('DELETE FROM funnel_sessions WHERE session_key = ANY($1::text[])',
+                                   changes["closed"])
+                await conn.executemany(f'''
+                    INSERT INTO funnel_sessions (session_key, {", ".join(SESSION_FIELDS)})
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    ON CONFLICT (session_key) DO UPDATE SET
+                        {", ".join(f"{field} = excluded.{field}" for field in SESSION_FIELDS)}
+                ''', [(key, *(state[field] for field in SESSION_FIELDS))
+                      for key, state in changes["sessions"].items()])
+                await conn.executemany('''
+                    INSERT INTO funnel_stages (stage, sessions) VALUES ($1, $2)
+                    ON CONFLICT (stage) DO UPDATE SET sessions = funnel_stages.sessions + excluded.sessions
+                ''', list(changes["stages"].items()))
+                await conn.executemany('''
+                    INSERT INTO funnel_questions (question_number, reached, dropped, dwell_count, dwell_seconds)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (question_number) DO UPDATE SET
+                        reached = funnel_questions.reached + excluded.reached,
+                        dropped = funnel_questions.dropped + excluded.dropped,
+                        dwell_count = funnel_questions.dwell_count + excluded.dwell_count,
+                        dwell_seconds = funnel_questions.dwell_seconds + excluded.dwell_seconds
+                ''', [(number, *values) for number, values in changes["questions"].items()])
+                await conn.executemany('''
+                    INSERT INTO funnel_dwell (question_number, bucket, sessions) VALUES ($1, $2, $3)
+                    ON CONFLICT (question_number, bucket) DO UPDATE SET
+                        sessions = funnel_dwell.sessions + excluded.sessions
+                ''', [(number, bucket, sessions) for (number, bucket), sessions in changes["dwell"].items()])
+                await conn.executemany('''
+                    INSERT INTO funnel_checkpoints (source, last_id) VALUES ($1, $2)
+                    ON CONFLICT (source) DO UPDATE SET last_id = excluded.last_id
+                ''', list(changes["checkpoint"].items()))
+
+    async def funnel_rollup(self) -> Dict[str, Any]:
+        started = perf_counter()
+        async with self.pool.acquire() as conn:
+            rollup = _funnel_rollup(
+                await conn.fetch('SELECT stage, sessions FROM funnel_stages'),
+                await conn.fetch('''
+                    SELECT question_number, reached, dropped, dwell_count, dwell_seconds
+                    FROM funnel_questions ORDER BY question_number
+                '''),
+                await conn.fetch('SELECT question_number, bucket, sessions FROM funnel_dwell'),
+                await conn.fetchval('SELECT COUNT(*) FROM funnel_sessions WHERE started_at IS NOT NULL'),
+            )
+        _observe("stats_funnel", started)
+        return rollup
+
+
+def create_repository() -> Repository:
+    """Pick the backend from the environment: DATABASE_URL (PostgreSQL) or the SQLite file"""
+    if DATABASE_URL.startswith(("postgres://", "postgresql://")):
+        return PostgresRepository(DATABASE_URL, max_size=int(os.getenv("DATABASE_POOL_SIZE", "10")))
+    return SQLiteRepository(DB_PATH, writer_socket=os.getenv("WRITER_SOCKET", ""))
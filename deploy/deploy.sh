@@ -116,7 +116,7 @@ if [[ $? -eq 0 ]]; then
     APP_URL="https://$APP_NAME.fly.dev"
     
     # Check health endpoint
-    if curl -f -s "$APP_URL/health" > /dev/null; then
+    if python deploy/health_check.py --url "$APP_URL" --probes 5 --interval 1 --max-failures 1; then
         print_success "Health check passed"
     else
         print_warning "Health check failed - app may still be starting"
@@ -134,7 +134,7 @@ if [[ $? -eq 0 ]]; then
     echo "🎉 Deployment Complete!"
     echo "=================================="
     echo "App URL: $APP_URL"
-    echo "Health Check: $APP_URL/health"
+    echo "Health Check: $APP_URL/health/ready"
     echo "Quiz Stats: $APP_URL/summary"
     echo ""
     echo "📊 Monitoring Commands:"
@@ -1 +1,106 @@
+"""
+Health probe for the AI Archetype Quiz
+Sends N requests to a health endpoint and reports failures and latency
+percentiles. Exits non-zero when more probes fail than allowed, so it also
+serves as the container HEALTHCHECK (the slim image has no curl).
 
+    python deploy/health_check.py                                  # one readiness probe
+    python deploy/health_check.py --path /health/live --quiet      # Docker HEALTHCHECK
+    python deploy/health_check.py --url https://aiarchetypes.acceleratinghumans.com -n 200 --interval 0.1
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def probe(url: str, timeout: float) -> Tuple[bool, float, str]:
+    """(healthy, seconds, detail) for one GET"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status == 200, time.perf_counter() - started, str(response.status)
+    except urllib.error.HTTPError as e:
+        return False, time.perf_counter() - started, str(e.code)
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, "reason", e)
+        return False, time.perf_counter() - started, str(reason)
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(math.ceil(p / 100 * len(ordered)), 1) - 1]
+
+
+def summarize(results: List[Tuple[bool, float, str]]) -> Dict:
+    latencies = sorted(seconds * 1000 for _, seconds, _ in results)
+    failures: Dict[str, int] = {}
+    for ok, _, detail in results:
+        if not ok:
+            failures[detail] = failures.get(detail, 0) + 1
+    return {
+        "probes": len(results),
+        "failed": sum(failures.values()),
+        "failures": failures,
+        "latency_ms": {
+            "min": round(latencies[0], 2),
+            **{f"p{p}": round(percentile(latencies, p), 2) for p in PERCENTILES},
+            "max": round(latencies[-1], 2),
+            "mean": round(sum(latencies) / len(latencies), 2),
+        },
+    }
+
+
+def run(url: str, count: int, interval: float, timeout: float, quiet: bool) -> Dict:
+    results = []
+    for i in range(count):
+        if i and interval:
+            time.sleep(interval)
+        result = probe(url, timeout)
+        results.append(result)
+        if not quiet and count > 1 and not result[0]:
+            print(f"probe {i + 1}: failed ({result[2]}) after {result[1] * 1000:.1f} ms", file=sys.stderr)
+    return summarize(results)
+
+
+def print_report(url: str, summary: Dict):
+    latency = summary["latency_ms"]
+    print(f"{url}: {summary['probes'] - summary['failed']}/{summary['probes']} healthy")
+    print("latency ms  " + "  ".join(f"{name} {value:.1f}" for name, value in latency.items()))
+    for detail, count in summary["failures"].items():
+        print(f"  {count} x {detail}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Probe a health endpoint and report latency percentiles")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the app")
+    parser.add_argument("--path", default="/health/ready", help="/health/ready, /health/live or /health")
+    parser.add_argument("-n", "--probes", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between probes")
+    parser.add_argument("--timeout", type=float, default=3.0, help="seconds per probe")
+    parser.add_argument("--max-failures", type=int, default=0, help="exit non-zero above this many failures")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--quiet", action="store_true", help="print nothing; only the exit code")
+    args = parser.parse_args(argv)
+    if args.probes < 1:
+        parser.error("--probes must be at least 1")
+
+    url = args.url.rstrip("/") + args.path
+    summary = run(url, args.probes, args.interval, args.timeout, args.quiet)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    elif not args.quiet:
+        print_report(url, summary)
+    return 1 if summary["failed"] > args.max_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
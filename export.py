@@ -0,0 +1,98 @@
+"""
+Export analytics events as NDJSON or CSV
+Reads archived months from data/archive/ and live months from the shards,
+oldest first, so exports cover events before and after retention ran.
+
+    python export.py --since 2025-01-01 --until 2025-03-31 > events.ndjson
+    python export.py --format csv > events.csv
+    python export.py --event-type answer_selected --question 4
+
+Filters on live months are index lookups on the promoted event_data
+columns (shards.EVENT_FIELDS); archived rows are filtered as they are read.
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from typing import Any, Dict, Iterator, Optional
+
+import retention
+import shards
+
+
+# Filterable columns; all but event_type are also event_data keys
+FILTERS = ("event_type",) + tuple(name for name, _, _ in shards.EVENT_FIELDS)
+
+
+def _live_events(month: str, filters: Dict[str, Any]) -> Iterator[Dict]:
+    path = shards.shard_path(month)
+    if not path.exists():
+        return
+    conn = sqlite3.connect(f"file:{path.resolve()}?mode=ro", uri=True)
+    try:
+        where = " AND ".join(f"{column} = ?" for column in filters) or "1"
+        for row in conn.execute(f"SELECT {shards.COLUMNS} FROM analytics WHERE {where} ORDER BY id",
+                                tuple(filters.values())):
+            yield dict(zip(retention.FIELDS, row))
+    finally:
+        conn.close()
+
+
+def _matches(event: Dict, filters: Dict[str, Any]) -> bool:
+    if not filters:
+        return True
+    try:
+        data = json.loads(event["event_data"]) if event["event_data"] else {}
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    return all((event[column] if column == "event_type" else data.get(column)) == value
+               for column, value in filters.items())
+
+
+def iter_events(since: Optional[str] = None, until: Optional[str] = None,
+                filters: Optional[Dict[str, Any]] = None) -> Iterator[Dict]:
+    """Every stored event with since <= created_at < until ('YYYY-MM-DD[ HH:MM:SS]' UTC)
+
+    filters maps FILTERS columns to the value they must equal.
+    """
+    filters = filters or {}
+    months = sorted(set(retention.archived_months()) | set(shards.list_months()))
+    for month in months:
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        # Archived rows of a month are all older than the ones still in its shard
+        archived = (event for event in retention.read_archive(month) if _matches(event, filters))
+        for source in (archived, _live_events(month, filters)):
+            for event in source:
+                created_at = event["created_at"] or ""
+                if (since and created_at < since) or (until and created_at >= until):
+                    continue
+                yield event
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export analytics events (archived and live)")
+    parser.add_argument("--since", help="inclusive, YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS' UTC")
+    parser.add_argument("--until", help="exclusive, same format as --since")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--event-type")
+    parser.add_argument("--archetype")
+    parser.add_argument("--role")
+    parser.add_argument("--page")
+    parser.add_argument("--question", type=int, dest="question_number")
+    parser.add_argument("--completion-time", type=float, dest="completion_time")
+    args = parser.parse_args()
+
+    filters = {column: getattr(args, column) for column in FILTERS if getattr(args, column) is not None}
+    events = iter_events(args.since, args.until, filters)
+    if args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=retention.FIELDS)
+        writer.writeheader()
+        writer.writerows(events)
+    else:
+        for event in events:
+            sys.stdout.write(json.dumps(event, separators=(",", ":")) + "\n")
@@ -0,0 +1,251 @@
+"""
+Incremental quiz funnel
+Consumes analytics events past a checkpoint, keeps per-session state
+(funnel_sessions) and folds it into rollups: sessions per stage
+(funnel_stages), per-question reach, drop-off and dwell time
+(funnel_questions) and dwell-time histograms (funnel_dwell). A run reads
+only events it has not seen, plus the sessions those events touch, so its
+cost follows the number of new events.
+
+    python funnel.py                   # process new events once
+    python funnel.py --idle-minutes 60
+
+Sessions are keyed by the attempt id the quiz page sends with each event
+(the submission's Idempotency-Key). Older events without one are grouped
+per visitor (IP address and user agent), and each quiz_started opens a new
+session. A session with no events for the idle time is closed. Unless it
+was submitted, it counts as abandoned at the furthest question it reached.
+Dwell time on a question runs from the previous answer (or the start) to
+its first answer.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+FUNNEL_CHUNK = int(os.getenv("FUNNEL_CHUNK", "5000"))
+IDLE_MINUTES = int(os.getenv("FUNNEL_IDLE_MINUTES", "30"))
+
+# Upper bounds (seconds) of the dwell histogram buckets; one more bucket holds the rest
+DWELL_BUCKETS = (2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+STAGES = ("started", "submitted", "completed", "abandoned")
+TRACKED = ("quiz_started", "answer_selected", "quiz_submitted", "quiz_completed")
+FINISHED = {"quiz_submitted": ("submitted", 1), "quiz_completed": ("completed", 2)}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.strptime(value[:19], TIME_FORMAT)
+
+
+def event_data(text: Optional[str]) -> Dict[str, Any]:
+    try:
+        data = json.loads(text) if text else {}
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def session_key(data: Dict[str, Any], ip_address: Optional[str], user_agent: Optional[str]) -> str:
+    attempt = data.get("attempt")
+    if isinstance(attempt, str) and attempt:
+        return "a:" + attempt[:64]
+    return "v:" + hashlib.sha1(f"{ip_address}\n{user_agent}".encode()).hexdigest()[:20]
+
+
+def new_session(at: Optional[str], started: bool) -> Dict[str, Any]:
+    return {"started_at": at if started else None, "last_event_at": at, "furthest": 0, "reached": 0,
+            "last_answer_at": at if started else None, "finished": 0}
+
+
+class Batch:
+    """Session and rollup changes from one chunk of events, saved in one transaction"""
+
+    def __init__(self, question_count: int, sessions: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.question_count = question_count
+        self.sessions = sessions or {}
+        self.dirty = set()
+        self.closed = set()
+        self.checkpoint: Dict[str, int] = {}
+        self.stages = Counter()
+        # question number -> [reached, dropped, dwell count, dwell seconds]; 0 is "before any answer"
+        self.questions: Dict[int, List] = {}
+        self.dwell = Counter()
+
+    def _question(self, number: int) -> List:
+        return self.questions.setdefault(number, [0, 0, 0, 0.0])
+
+    def close(self, key: str):
+        state = self.sessions.pop(key)
+        self.dirty.discard(key)
+        self.closed.add(key)
+        if state["started_at"] and not state["finished"]:
+            self.stages["abandoned"] += 1
+            self._question(state["furthest"])[1] += 1
+
+    def apply(self, event: Tuple):
+        source, event_id, event_type, _, data_json, ip_address, user_agent, created_at = event
+        self.checkpoint[source] = event_id
+        if event_type not in TRACKED or not created_at:
+            return
+        data = event_data(data_json)
+        key = session_key(data, ip_address, user_agent)
+
+        if event_type == "quiz_started":
+            if key in self.sessions:
+                self.close(key)
+            self.sessions[key] = new_session(created_at, started=True)
+            self.stages["started"] += 1
+            self.dirty.add(key)
+            return
+
+        # Sessions whose start is not in the log (lost event, or before analytics began)
+        # are followed but left out of the rollups, so every rate shares one denominator
+        state = self.sessions.setdefault(key, new_session(created_at, started=False))
+        state["last_event_at"] = max(state["last_event_at"] or created_at, created_at)
+        self.dirty.add(key)
+        counted = state["started_at"] is not None
+
+        if event_type == "answer_selected":
+            number = data.get("question_number", data.get("question_id"))
+            if not isinstance(number, int) or not 1 <= number <= self.question_count:
+                return
+            if not state["reached"] & (1 << number):
+                state["reached"] |= 1 << number
+                state["furthest"] = max(state["furthest"], number)
+                if counted:
+                    question = self._question(number)
+                    question[0] += 1
+                    seconds = max((_parse_time(created_at) - _parse_time(state["last_answer_at"])).total_seconds(), 0)
+                    question[2] += 1
+                    question[3] += seconds
+                    self.dwell[(number, bisect_left(DWELL_BUCKETS, seconds))] += 1
+            state["last_answer_at"] = created_at
+        else:
+            stage, flag = FINISHED[event_type]
+            if not state["finished"] & flag:
+                state["finished"] |= flag
+                if counted:
+                    self.stages[stage] += 1
+
+    def close_idle(self, cutoff: str, stored: Dict[str, Dict[str, Any]]) -> int:
+        """Close sessions last seen before cutoff: in-memory ones, then stored ones not already handled"""
+        idle = [key for key, state in self.sessions.items() if state["last_event_at"] < cutoff]
+        for key, state in stored.items():
+            if key not in self.sessions and key not in self.closed:
+                self.sessions[key] = state
+                idle.append(key)
+        for key in idle:
+            self.close(key)
+        return len(idle)
+
+    def changes(self) -> Dict[str, Any]:
+        return {
+            "checkpoint": self.checkpoint,
+            "sessions": {key: self.sessions[key] for key in self.dirty},
+            "closed": sorted(self.closed),
+            "stages": dict(self.stages),
+            "questions": {number: tuple(values) for number, values in self.questions.items()},
+            "dwell": dict(self.dwell),
+        }
+
+
+async def run(repo, quiz: Dict[str, Any], chunk_size: int = FUNNEL_CHUNK,
+              idle_minutes: int = IDLE_MINUTES) -> Dict[str, int]:
+    """Process every event past the checkpoint, then close sessions that have gone quiet"""
+    idle = timedelta(minutes=idle_minutes)
+    question_count = len(quiz["questions"])
+    checkpoint = await repo.funnel_checkpoint()
+    processed = closed = 0
+
+    while True:
+        events = await repo.analytics_after(checkpoint, chunk_size)
+        if not events:
+            break
+        keys = {session_key(event_data(event[4]), event[5], event[6]) for event in events if event[2] in TRACKED}
+        batch = Batch(question_count, await repo.funnel_sessions(sorted(keys)))
+        for event in events:
+            batch.apply(event)
+
+        # Events arrive in time order, so anything quiet for `idle` before the newest one is over
+        newest = max((event[7] for event in events if event[7]), default=None)
+        if newest:
+            cutoff = (_parse_time(newest) - idle).strftime(TIME_FORMAT)
+            closed += batch.close_idle(cutoff, await repo.idle_funnel_sessions(cutoff, chunk_size))
+        await repo.save_funnel(batch.changes())
+        checkpoint.update(batch.checkpoint)
+        processed += len(events)
+
+    # Caught up: close what has gone quiet by the clock
+    cutoff = (datetime.now(timezone.utc) - idle).strftime(TIME_FORMAT)
+    while True:
+        batch = Batch(question_count)
+        count = batch.close_idle(cutoff, await repo.idle_funnel_sessions(cutoff, chunk_size))
+        if not count:
+            break
+        await repo.save_funnel(batch.changes())
+        closed += count
+    return {"events": processed, "closed": closed}
+
+
+def report(rollup: Dict[str, Any], quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """Funnel rollups as served by /api/stats/funnel"""
+    stages = {stage: rollup["stages"].get(stage, 0) for stage in STAGES}
+    rows = {row[0]: row[1:] for row in rollup["questions"]}
+    histograms: Dict[int, List[int]] = {}
+    for number, bucket, sessions in rollup["dwell"]:
+        histograms.setdefault(number, [0] * (len(DWELL_BUCKETS) + 1))[bucket] = sessions
+
+    questions = []
+    for number, question in enumerate(quiz["questions"], start=1):
+        reached, dropped, dwell_count, dwell_seconds = rows.get(number, (0, 0, 0, 0.0))
+        histogram = histograms.get(number, [0] * (len(DWELL_BUCKETS) + 1))
+        questions.append({
+            "question_number": number,
+            "question_id": question["id"],
+            "reached": reached,
+            "reach_rate": round(reached * 100.0 / stages["started"], 1) if stages["started"] else 0.0,
+            "dropped": dropped,
+            "drop_rate": round(dropped * 100.0 / reached, 1) if reached else 0.0,
+            "dwell": {
+                "mean_seconds": round(dwell_seconds / dwell_count, 1) if dwell_count else None,
+                "histogram": [{"le": bound, "sessions": sessions}
+                              for bound, sessions in zip([*DWELL_BUCKETS, None], histogram)],
+            },
+        })
+    return {
+        "stages": stages,
+        "in_progress": rollup["open_sessions"],
+        "dropped_before_first_answer": rows.get(0, (0, 0))[1],
+        "questions": questions,
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+async def _main(args):
+    import database
+    from quiz_data import QUIZ_DATA
+
+    repo = database.create_repository()
+    await repo.init()
+    try:
+        outcome = await run(repo, QUIZ_DATA, args.chunk_size, args.idle_minutes)
+        print(f"Processed {outcome['events']} events, closed {outcome['closed']} sessions")
+    finally:
+        await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new analytics events into the quiz funnel rollups")
+    parser.add_argument("--chunk-size", type=int, default=FUNNEL_CHUNK)
+    parser.add_argument("--idle-minutes", type=int, default=IDLE_MINUTES,
+                        help="close sessions with no events for this long")
+    asyncio.run(_main(parser.parse_args()))
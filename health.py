@@ -0,0 +1,111 @@
+"""
+Liveness and readiness checks
+/health/live answers from memory in constant time: the process is up and
+its event loop is turning. /health/ready adds a database round trip
+(Repository.ping), cached for HEALTH_PROBE_TTL seconds so frequent probes
+from Docker, Fly and load balancers cost at most one query per worker per
+TTL, plus the writer queue, caches and background jobs.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+from time import monotonic, perf_counter
+from typing import Any, Dict, Optional
+
+from cache import CACHES
+
+PROBE_TTL = float(os.getenv("HEALTH_PROBE_TTL", "5"))
+PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+
+# Not ready once the writer queue is this full
+WRITER_BACKLOG_LIMIT = 0.9
+
+STARTED_AT = monotonic()
+
+_probe: Optional[Dict[str, Any]] = None
+_probe_expires = 0.0
+_inflight: Optional[asyncio.Future] = None
+
+
+def live() -> Dict[str, Any]:
+    return {"status": "alive", "uptime_seconds": round(monotonic() - STARTED_AT, 1)}
+
+
+async def _ping(repo) -> Dict[str, Any]:
+    global _probe, _probe_expires
+    started = perf_counter()
+    try:
+        await asyncio.wait_for(repo.ping(), PROBE_TIMEOUT)
+        probe = {"ok": True}
+    except asyncio.TimeoutError:
+        probe = {"ok": False, "error": f"no response within {PROBE_TIMEOUT:g}s"}
+    except Exception as e:
+        probe = {"ok": False, "error": str(e)}
+    probe["latency_ms"] = round((perf_counter() - started) * 1000, 2)
+    probe["checked_at"] = datetime.now(timezone.utc).isoformat()
+    _probe, _probe_expires = probe, monotonic() + PROBE_TTL
+    return probe
+
+
+async def database_probe(repo) -> Dict[str, Any]:
+    """The latest database probe, re-run when older than PROBE_TTL; concurrent misses share one"""
+    global _inflight
+    if _probe is not None and monotonic() < _probe_expires:
+        return _probe
+    if _inflight is None:
+        _inflight = asyncio.ensure_future(_ping(repo))
+
+        def _done(_):
+            global _inflight
+            _inflight = None
+
+        _inflight.add_done_callback(_done)
+    return await asyncio.shield(_inflight)
+
+
+def writer_status(repo) -> Optional[Dict[str, Any]]:
+    writer = getattr(repo, "writer", None)
+    if writer is None:
+        return None
+    return {
+        "connected": writer.connected,
+        "pending": writer.pending,
+        "max_pending": writer.max_pending,
+        "dropped": writer.dropped.value,
+    }
+
+
+def cache_status() -> Dict[str, Dict[str, Any]]:
+    status = {}
+    for name, cache in CACHES.items():
+        lookups = cache.stats.hits + cache.stats.misses
+        status[name] = {
+            "entries": len(cache),
+            "maxsize": cache.maxsize,
+            "hit_ratio": round(cache.stats.hits / lookups, 4) if lookups else None,
+        }
+    return status
+
+
+def scheduler_status(jobs) -> Optional[Dict[str, Any]]:
+    if jobs is None:
+        return None
+    return {"leader": jobs.leader.held, "jobs": [job.name for job in jobs.jobs], "running": sorted(jobs.running)}
+
+
+async def ready(repo, jobs=None) -> Dict[str, Any]:
+    """Readiness report; "ready" is False when the database or the writer queue is failing"""
+    database = await database_probe(repo)
+    writer = writer_status(repo)
+    backlogged = writer is not None and writer["pending"] >= writer["max_pending"] * WRITER_BACKLOG_LIMIT
+    is_ready = database["ok"] and not backlogged
+    return {
+        "status": "ready" if is_ready else "unavailable",
+        "ready": is_ready,
+        "backend": repo.name,
+        "database": database,
+        "writer": writer,
+        "caches": cache_status(),
+        "scheduler": scheduler_status(jobs),
+    }
@@ -0,0 +1,102 @@
+"""
+Normalized per-answer rows for SQL-side item analytics
+Every chosen answer of a result is one response_items row
+(result_id, question_id, choice, weight, is_primary), where weight is the
+points the choice scored (0 for demographic or unscored answers). Rows are
+written with the result; older results are filled by the backfill:
+
+    python items.py backfill           # chunked, resumable
+    python items.py report             # answer counts per question
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+
+import codec
+import scoring
+
+BACKFILL_CHUNK = 500
+
+
+def response_items(quiz: Dict[str, Any], responses: Dict[str, Any]) -> List[Tuple[int, str, int, int]]:
+    """(question_id, choice, weight, is_primary) for every known answer in a response set"""
+    questions = {str(question["id"]): question for question in quiz["questions"]}
+    items = []
+    for question_id, answer in responses.items():
+        question = questions.get(str(question_id))
+        if question is None:
+            continue
+        if isinstance(answer, dict):
+            primary, secondary = answer.get("primary"), answer.get("secondary") or []
+        else:
+            primary, secondary = answer, []
+        if not isinstance(secondary, list):
+            secondary = []
+
+        if question.get("type") == "demographic":
+            primary_points = secondary_points = 0
+        else:
+            primary_points, secondary_points = scoring.answer_weights(quiz, question)
+        scored = question.get("scoring") or {}
+        seen = set()
+        for choice, is_primary in [(primary, 1), *((choice, 0) for choice in secondary)]:
+            if not isinstance(choice, str) or choice not in question["answers"] or choice in seen:
+                continue
+            seen.add(choice)
+            weight = (primary_points if is_primary else secondary_points) if choice in scored else 0
+            items.append((question["id"], choice, weight, is_primary))
+    return items
+
+
+async def backfill(repo, quiz: Dict[str, Any], chunk_size: int = BACKFILL_CHUNK) -> Dict[str, int]:
+    """Write response_items for every result that has none, in id order and short transactions"""
+    decoder = codec.Codec(quiz)
+    results = written = 0
+    after_id = 0
+    while True:
+        rows = await repo.results_without_items(after_id, chunk_size)
+        if not rows:
+            break
+        items = []
+        for result_id, responses_json, responses_bin in rows:
+            # JSON kept by the codec backfill is the original; otherwise decode the binary record
+            if responses_json:
+                responses = json.loads(responses_json)
+            else:
+                responses = decoder.decode_responses(responses_bin) if responses_bin else {}
+            items.extend((result_id, *item) for item in response_items(quiz, responses))
+        await repo.store_items(items)
+        results += len(rows)
+        written += len(items)
+        after_id = rows[-1][0]
+    return {"results": results, "items": written}
+
+
+async def _main(args):
+    import database
+    import stats
+    from quiz_data import QUIZ_DATA
+
+    repo = database.create_repository()
+    await repo.init()
+    try:
+        if args.command == "backfill":
+            outcome = await backfill(repo, QUIZ_DATA, args.chunk_size)
+            print(f"Wrote {outcome['items']} response items for {outcome['results']} results")
+            return
+        for question in (await stats.answers(repo, QUIZ_DATA))["questions"]:
+            print(f"Q{question['question_id']} ({question['respondents']} respondents)")
+            for answer in question["answers"]:
+                print(f"  {answer['answer']}  {answer['count']:>7}  {answer['share']:>5.1f}%  "
+                      f"first choice {answer['first_choice']:>7}")
+    finally:
+        await repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-answer response items")
+    parser.add_argument("command", choices=("report", "backfill"))
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,283 @@
+"""
+Runtime metrics for the AI Archetype Quiz
+Preallocated counters and histograms exposed in Prometheus text format
+"""
+
+import asyncio
+import os
+import resource
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+# Latency buckets (seconds)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# Status codes the app can produce; anything else is folded into "other"
+STATUS_CODES = (200, 201, 204, 304, 400, 401, 403, 404, 405, 413, 422, 429, 500, 503)
+
+# Storage call sites that are timed individually
+SQL_SITES = (
+    "submit_insert",
+    "analytics_insert",
+    "results_lookup",
+    "stats_results",
+    "stats_events",
+    "stats_answers",
+    "stats_funnel",
+    "health_check",
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Not timed: Prometheus scrapes and the platform's liveness probe would drown out real traffic
+EXCLUDED_PATHS = frozenset(("/metrics", "/health/live"))
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() only touches preallocated slots"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str, lines: List[str]):
+        cumulative = 0
+        prefix = f"{labels}," if labels else ""
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+
+
+class CacheStats:
+    """Hit/miss counters for one named cache"""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+
+class Counter:
+    """Monotonic counter for one label set"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+# Registries - populated at import or route-binding time, never per request
+_request_histograms: Dict[str, Dict[object, Histogram]] = {}
+_route_labels: Dict[Callable, str] = {}
+_sql_histograms: Dict[str, Histogram] = {site: Histogram(SQL_BUCKETS) for site in SQL_SITES}
+_caches: Dict[str, CacheStats] = {}
+_job_histograms: Dict[str, Histogram] = {}
+_counters: Dict[str, Dict[str, Counter]] = {}
+_counter_help: Dict[str, str] = {}
+_loop_lag = Histogram(LOOP_LAG_BUCKETS)
+_loop_lag_last = 0.0
+_app = None
+
+
+def _preallocate_route(path: str):
+    if path not in _request_histograms:
+        per_status = {code: Histogram(REQUEST_BUCKETS) for code in STATUS_CODES}
+        per_status["other"] = Histogram(REQUEST_BUCKETS)
+        _request_histograms[path] = per_status
+
+
+def bind_routes(app):
+    """Map route endpoints to their path templates and preallocate histograms"""
+    global _app
+    _app = app
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        path = getattr(route, "path", None)
+        if endpoint is not None and path is not None:
+            _route_labels[endpoint] = path
+            _preallocate_route(path)
+    _preallocate_route(UNMATCHED_ROUTE)
+
+
+def observe_request(endpoint: Optional[Callable], status: int, duration: float):
+    """Record one finished request against its route template"""
+    route = _route_labels.get(endpoint, UNMATCHED_ROUTE) if endpoint is not None else UNMATCHED_ROUTE
+    if route == UNMATCHED_ROUTE and endpoint is not None and _app is not None:
+        # Route registered after the last bind (rare); rebind once
+        bind_routes(_app)
+        route = _route_labels.get(endpoint, UNMATCHED_ROUTE)
+    per_status = _request_histograms[route]
+    histogram = per_status.get(status)
+    if histogram is None:
+        histogram = per_status["other"]
+    histogram.observe(duration)
+
+
+def observe_sql(site: str, duration: float):
+    """Record the time spent in one storage call site"""
+    _sql_histograms[site].observe(duration)
+
+
+def cache(name: str) -> CacheStats:
+    """Get (or register) the hit/miss counters for a named cache"""
+    stats = _caches.get(name)
+    if stats is None:
+        stats = _caches[name] = CacheStats()
+    return stats
+
+
+def job(name: str) -> Histogram:
+    """Get (or register) the duration histogram of a background job (see scheduler.py)"""
+    histogram = _job_histograms.get(name)
+    if histogram is None:
+        histogram = _job_histograms[name] = Histogram(JOB_BUCKETS)
+    return histogram
+
+
+def counter(name: str, help_text: str, **labels: str) -> Counter:
+    """Get (or register) a counter; call at setup time and keep the result"""
+    label_text = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    _counter_help.setdefault(name, help_text)
+    series = _counters.setdefault(name, {})
+    existing = series.get(label_text)
+    if existing is None:
+        existing = series[label_text] = Counter()
+    return existing
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by route and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Checked before anything is allocated for the request
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            observe_request(scope.get("endpoint"), status, perf_counter() - started)
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Measure how late the event loop wakes us up, forever"""
+    global _loop_lag_last
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled - interval)
+        _loop_lag_last = lag
+        _loop_lag.observe(lag)
+
+
+def _resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not Linux - fall back to peak RSS (kilobytes on Linux/BSD, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def render() -> str:
+    """Render every metric in Prometheus text exposition format"""
+    lines: List[str] = []
+
+    lines.append("# HELP quiz_http_requests_total HTTP requests by route and status code")
+    lines.append("# TYPE quiz_http_requests_total counter")
+    for route, per_status in _request_histograms.items():
+        for status, histogram in per_status.items():
+            if histogram.count:
+                lines.append(f'quiz_http_requests_total{{route="{route}",status="{status}"}} {histogram.count}')
+
+    lines.append("# HELP quiz_http_request_duration_seconds HTTP request latency by route and status code")
+    lines.append("# TYPE quiz_http_request_duration_seconds histogram")
+    for route, per_status in _request_histograms.items():
+        for status, histogram in per_status.items():
+            if histogram.count:
+                histogram.render("quiz_http_request_duration_seconds",
+                                 f'route="{route}",status="{status}"', lines)
+
+    lines.append("# HELP quiz_db_query_duration_seconds Storage time per call site")
+    lines.append("# TYPE quiz_db_query_duration_seconds histogram")
+    for site, histogram in _sql_histograms.items():
+        histogram.render("quiz_db_query_duration_seconds", f'site="{site}"', lines)
+
+    lines.append("# HELP quiz_cache_requests_total Cache lookups by cache and result")
+    lines.append("# TYPE quiz_cache_requests_total counter")
+    for name, stats in _caches.items():
+        lines.append(f'quiz_cache_requests_total{{cache="{name}",result="hit"}} {stats.hits}')
+        lines.append(f'quiz_cache_requests_total{{cache="{name}",result="miss"}} {stats.misses}')
+    lines.append("# HELP quiz_cache_hit_ratio Fraction of cache lookups that hit")
+    lines.append("# TYPE quiz_cache_hit_ratio gauge")
+    for name, stats in _caches.items():
+        lookups = stats.hits + stats.misses
+        ratio = stats.hits / lookups if lookups else 0.0
+        lines.append(f'quiz_cache_hit_ratio{{cache="{name}"}} {ratio:.4f}')
+
+    lines.append("# HELP quiz_job_duration_seconds Background job run time")
+    lines.append("# TYPE quiz_job_duration_seconds histogram")
+    for name, histogram in _job_histograms.items():
+        histogram.render("quiz_job_duration_seconds", f'job="{name}"', lines)
+
+    for name, series in _counters.items():
+        lines.append(f"# HELP {name} {_counter_help[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for label_text, value in series.items():
+            labels = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{name}{labels} {value.value}")
+
+    lines.append("# HELP quiz_event_loop_lag_seconds Event loop scheduling delay")
+    lines.append("# TYPE quiz_event_loop_lag_seconds histogram")
+    _loop_lag.render("quiz_event_loop_lag_seconds", "", lines)
+    lines.append("# HELP quiz_event_loop_lag_last_seconds Most recent event loop lag sample")
+    lines.append("# TYPE quiz_event_loop_lag_last_seconds gauge")
+    lines.append(f"quiz_event_loop_lag_last_seconds {_loop_lag_last:.6f}")
+
+    lines.append("# HELP process_resident_memory_bytes Resident memory size in bytes")
+    lines.append("# TYPE process_resident_memory_bytes gauge")
+    lines.append(f"process_resident_memory_bytes {_resident_memory_bytes()}")
+
+    return "\n".join(lines) + "\n"
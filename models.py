@@ -1 +1,102 @@
+"""
+Request models for the AI Archetype Quiz API
+Submissions are validated strictly against the quiz definition registered
+with use_quiz(): known question ids, that question's answer letters and a
+bounded list of additional choices, and at least one answer. Anything
+else is a 422.
+"""
 
+from typing import Annotated, Any, Dict, FrozenSet, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, constr, model_validator
+
+MAX_ADDITIONAL_CHOICES = 2  # the quiz UI allows three selections per question
+MAX_RESPONSES = 100
+
+Letter = constr(pattern=r"^[A-Z]$")
+QuestionId = constr(pattern=r"^[1-9][0-9]{0,2}$")
+
+# Question id -> allowed answer letters, from the quiz definition
+_answers: Dict[str, FrozenSet[str]] = {}
+
+
+def use_quiz(quiz: Dict[str, Any]):
+    """Validate submissions against this quiz definition"""
+    _answers.clear()
+    _answers.update({str(question["id"]): frozenset(question["answers"]) for question in quiz["questions"]})
+
+
+class Choice(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    primary: Letter
+    secondary: List[Letter] = Field(default_factory=list, max_length=MAX_ADDITIONAL_CHOICES)
+
+
+# A bare letter is a single choice; the quiz UI sends {primary, secondary}
+Responses = Annotated[Dict[QuestionId, Union[Letter, Choice]], Field(min_length=1, max_length=MAX_RESPONSES)]
+
+
+def check_answers(responses: Dict[str, Union[str, Choice]]):
+    """Raise ValueError unless every answer is one the quiz offers for that question, at most once"""
+    for question_id, answer in responses.items():
+        allowed = _answers.get(question_id)
+        if allowed is None:
+            raise ValueError(f"unknown question {question_id}")
+        choices = [answer] if isinstance(answer, str) else [answer.primary, *answer.secondary]
+        if any(choice not in allowed for choice in choices):
+            raise ValueError(f"unknown answer for question {question_id}")
+        if len(set(choices)) != len(choices):
+            raise ValueError(f"repeated answer for question {question_id}")
+
+
+def canonical(responses: Dict[str, Union[str, Choice]]) -> Dict[str, Dict[str, Any]]:
+    """Responses in one shape, ordered by question: {"2": {"primary": "A", "secondary": ["C"]}}"""
+    ordered = {}
+    for question_id in sorted(responses, key=int):
+        answer = responses[question_id]
+        if isinstance(answer, str):
+            ordered[question_id] = {"primary": answer, "secondary": []}
+        else:
+            ordered[question_id] = {"primary": answer.primary, "secondary": list(answer.secondary)}
+    return ordered
+
+
+class QuizSubmission(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    responses: Responses
+    completion_time: Optional[float] = Field(default=None, ge=0, le=7 * 24 * 60, allow_inf_nan=False)  # minutes
+
+    @model_validator(mode="after")
+    def known_answers(self) -> "QuizSubmission":
+        check_answers(self.responses)
+        return self
+
+    def canonical_responses(self) -> Dict[str, Dict[str, Any]]:
+        return canonical(self.responses)
+
+
+class AnalyticsEvent(BaseModel):
+    event_type: str
+    session_id: Optional[str] = None
+    data: Optional[Dict] = None
+
+
+class ScoreBatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # One QuizSubmission.responses object per set, validated the same way
+    responses: List[Responses] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def known_answers(self) -> "ScoreBatch":
+        for index, responses in enumerate(self.responses):
+            try:
+                check_answers(responses)
+            except ValueError as e:
+                raise ValueError(f"response set {index}: {e}")
+        return self
+
+    def canonical_responses(self) -> List[Dict[str, Dict[str, Any]]]:
+        return [canonical(responses) for responses in self.responses]
@@ -0,0 +1,173 @@
+"""
+On-demand request profiling
+Runs selected requests under cProfile and keeps the results in data/profiles/
+
+cProfile hooks the event loop thread, so a profile also contains whatever
+other requests ran on the loop while it was recorded. Each profile's
+metadata keeps concurrent_requests, the most other requests in flight at
+once; profile on an idle worker for a clean picture of one request.
+"""
+
+import asyncio
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+
+import auth
+
+PROFILE_DIR = Path("data/profiles")
+MAX_PROFILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Never profile the diagnostics endpoints themselves
+EXCLUDED_PREFIXES = ("/metrics", "/admin")
+
+PROFILE_NAME = re.compile(r"^[0-9T]+-[a-z0-9_-]+-\d+ms\.prof$")
+
+# cProfile hooks the whole thread, so only one request is profiled at a time
+_active = threading.Lock()
+
+# HTTP requests in flight on this worker, and the most seen during the current profile
+_in_flight = 0
+_peak = 0
+
+
+def _requested_by_admin(scope) -> bool:
+    headers = Headers(scope=scope)
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    flagged = any(value.lower() in ("1", "true") for value in [headers.get("x-profile", ""), *query.get("profile", [])])
+    return flagged and auth.is_admin(headers)
+
+
+def _slug(path: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", path.lower()).strip("-")
+    return slug[:40] or "root"
+
+
+def _save(profiler: cProfile.Profile, meta: Dict) -> str:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    name = f"{stamp}-{_slug(meta['path'])}-{int(meta['duration_ms'])}ms.prof"
+    profiler.dump_stats(PROFILE_DIR / name)
+    (PROFILE_DIR / f"{name}.json").write_text(json.dumps(meta))
+    _prune()
+    return name
+
+
+def _prune():
+    """Delete the oldest profiles beyond MAX_PROFILES"""
+    profiles = sorted(PROFILE_DIR.glob("*.prof"))
+    for stale in profiles[:max(0, len(profiles) - MAX_PROFILES)]:
+        stale.unlink(missing_ok=True)
+        Path(f"{stale}.json").unlink(missing_ok=True)
+
+
+def list_profiles() -> List[Dict]:
+    """Metadata for every stored profile, newest first"""
+    if not PROFILE_DIR.exists():
+        return []
+    entries = []
+    for profile in sorted(PROFILE_DIR.glob("*.prof"), reverse=True):
+        meta_path = Path(f"{profile}.json")
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            meta = {}
+        meta["name"] = profile.name
+        meta["size_bytes"] = profile.stat().st_size
+        entries.append(meta)
+    return entries
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Resolve a stored profile by name, rejecting anything that is not one"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling admin-flagged or sampled requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight, _peak
+        _in_flight += 1
+        _peak = max(_peak, _in_flight)
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+    async def _handle(self, scope, receive, send):
+        global _peak
+        if scope["path"].startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if _requested_by_admin(scope):
+            trigger = "admin"
+        elif SAMPLE_RATE and random.random() < SAMPLE_RATE:
+            trigger = "sampled"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        if not _active.acquire(blocking=False):
+            # Another request is already being profiled
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        _peak = _in_flight
+        started = perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                profiler.disable()
+            duration_ms = (perf_counter() - started) * 1000
+            endpoint = scope.get("endpoint")
+            meta = {
+                "path": scope["path"],
+                "method": scope["method"],
+                "endpoint": getattr(endpoint, "__name__", None),
+                "status": status,
+                "trigger": trigger,
+                "duration_ms": round(duration_ms, 3),
+                "concurrent_requests": _peak - 1,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            try:
+                # Writing the stats file and pruning old ones is disk work; keep it off the loop
+                await asyncio.to_thread(_save, profiler, meta)
+            except OSError as e:
+                print(f"Profile save error: {e}")
+        finally:
+            _active.release()
@@ -0,0 +1,190 @@
+"""
+In-process pub/sub for the live stats stream
+submit_quiz publishes one delta per stored result. Deltas are merged and
+fanned out to every /api/stats/stream subscriber at most STREAM_MAX_RATE
+times a second, each flush encoded once as a Server-Sent Event, so viewers
+cost no database reads. A fresh stats snapshot is published whenever the
+scheduler re-warms the stats cache; it also reconciles counts across
+workers, since each worker only sees the deltas it publishes itself.
+Snapshots are stamped with the bus's publish count taken before their
+query ran: deltas published after the stamp are replayed on top of the
+snapshot instead of being dropped as already included.
+
+Every subscriber has a bounded queue. One that falls STREAM_QUEUE_SIZE
+messages behind (a client not reading) is dropped: its stream ends and the
+browser's EventSource reconnects from a fresh snapshot.
+
+Streams also end after STREAM_MAX_SECONDS and when the bus stops in the app
+lifespan. uvicorn waits for open responses before running the lifespan
+shutdown, so run it with --timeout-graceful-shutdown: streams still open
+after that are cancelled, and a restart never waits out a full stream.
+"""
+
+import asyncio
+import json
+import os
+from collections import Counter, deque
+from typing import Any, Dict, Optional, Set
+
+import metrics
+
+MAX_RATE = float(os.getenv("STREAM_MAX_RATE", "1"))
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "32"))
+MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "5000"))
+# Published deltas kept for replay on top of a snapshot stamped before them
+REPLAY_LIMIT = 10000
+
+# Ends a subscriber's stream
+CLOSED = None
+
+
+def encode(event: str, seq: int, data: Dict[str, Any]) -> bytes:
+    """One Server-Sent Event"""
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    """One stream's bounded queue of encoded events"""
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.dropped = False
+
+
+class StatsBus:
+    """Merges published stats deltas and fans them out at a capped rate"""
+
+    def __init__(self, max_rate: float = MAX_RATE, queue_size: int = QUEUE_SIZE,
+                 max_subscribers: int = MAX_SUBSCRIBERS):
+        self.interval = 1 / max_rate
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[Subscriber] = set()
+        self.seq = 0
+        # Deltas published so far; a snapshot's stamp is this count before its query
+        self.published = 0
+        self._recent = deque(maxlen=REPLAY_LIMIT)
+        self._total = 0
+        self._archetypes = Counter()
+        self._roles = Counter()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.sent = metrics.counter("quiz_stream_messages_total", "Stats stream events fanned out (per flush)")
+        self.dropped = metrics.counter("quiz_stream_dropped_total",
+                                       "Stats stream subscribers dropped for falling behind")
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop flushing and end every open stream"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.close_all()
+
+    def close_all(self):
+        for subscriber in list(self.subscribers):
+            self._close(subscriber)
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """A new subscriber, or None when at MAX_SUBSCRIBERS"""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, archetype: str, role: Optional[str]):
+        """Count one new result; sent with the next flush"""
+        self.published += 1
+        self._recent.append((self.published, archetype, role))
+        self._count(archetype, role)
+        if self._wake is not None:
+            self._wake.set()
+
+    def publish_snapshot(self, snapshot: Dict[str, Any], stamp: int):
+        """Replace the viewers' totals with a snapshot whose query started at publish count stamp
+
+        Deltas up to the stamp are dropped as already included. Later ones,
+        flushed or not, are sent again after the snapshot.
+        """
+        self._snapshot = snapshot
+        self._total = 0
+        self._archetypes.clear()
+        self._roles.clear()
+        while self._recent and self._recent[0][0] <= stamp:
+            self._recent.popleft()
+        for _, archetype, role in self._recent:
+            self._count(archetype, role)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _count(self, archetype: str, role: Optional[str]):
+        self._total += 1
+        self._archetypes[archetype] += 1
+        if role:
+            self._roles[role] += 1
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            self.flush()
+            # Anything published meanwhile waits for the next flush
+            await asyncio.sleep(self.interval)
+
+    def flush(self):
+        if self._snapshot is not None:
+            self.seq += 1
+            self._fan_out(encode("snapshot", self.seq, self._snapshot))
+            self._snapshot = None
+        if self._total:
+            self.seq += 1
+            self._fan_out(encode("delta", self.seq, {
+                "total": self._total,
+                "archetypes": dict(self._archetypes),
+                "roles": dict(self._roles),
+            }))
+            self._total = 0
+            self._archetypes.clear()
+            self._roles.clear()
+
+    def _fan_out(self, message: bytes):
+        if not self.subscribers:
+            return
+        self.sent.inc()
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self.dropped.inc()
+                self._close(subscriber)
+
+    def _close(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        # Discard the backlog so the end marker fits
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(CLOSED)
+
+
+def stream_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a stats.snapshot the stream sends"""
+    return {
+        "total": snapshot["total"],
+        "recent": snapshot["recent"],
+        "distribution": [{"archetype": item["archetype"], "count": item["count"]}
+                         for item in snapshot["distribution"]],
+        "roles": snapshot["roles"],
+        "updated_at": snapshot["updated_at"],
+    }
@@ -0,0 +1,411 @@
+"""
+Quiz definition for the AI Archetype Quiz
+Questions, archetypes, scoring rules and role mapping. Kept apart from the
+web app so command-line tools can load it without importing main.py.
+"""
+
+# Enhanced Quiz Data - Professional Scoring System
+QUIZ_DATA = {
+    "version": "3.0-professional",
+    "total_questions": 10,
+    "estimated_completion_minutes": 5,
+    # Points per choice and secondary-archetype thresholds; a question can
+    # override the points with e.g. "weights": {"primary": 4, "secondary": 2}
+    "scoring_rules": {
+        "primary_weight": 3,
+        "secondary_weight": 1,
+        "secondary_min_score": 4,
+        "secondary_max_gap": 3,
+        "default_archetype": "Pragmatist"
+    },
+    "questions": [
+        {
+            "id": 1,
+            "question": "What's your primary role when it comes to AI decisions in your organization?",
+            "type": "demographic",
+            "answers": {
+                "A": "Individual contributor - I use tools but don't choose them",
+                "B": "Team leader - I guide implementation for my team", 
+                "C": "Executive - I set strategy and allocate resources",
+                "D": "Researcher/Academic - I study and evaluate these technologies",
+                "E": "Advisor/Consultant - I help others make informed decisions",
+                "F": "Concerned observer - I'm affected but have little formal influence"
+            },
+            "scoring": {
+                # Demographic question - no archetype scoring
+            }
+        },
+        {
+            "id": 2,
+            "question": "Over the next 2-3 years, AI will most likely...",
+            "answers": {
+                "A": "Create more valuable work by automating routine tasks",
+                "B": "Significantly reduce jobs in knowledge work professions",
+                "C": "Enhance existing roles more than replace them",
+                "D": "Create economic disruption before long-term benefits emerge",
+                "E": "Concentrate power while displacing human expertise",
+                "F": "Too uncertain to predict with confidence"
+            },
+            "scoring": {
+                "A": "Innovator",
+                "B": "Guardian", 
+                "C": "Pragmatist",
+                "D": "Guardian",
+                "E": "Egalitarian",
+                "F": "Scholar"
+            }
+        },
+        {
+            "id": 3,
+            "question": "When your organization faces new AI opportunities, what's your first instinct?",
+            "answers": {
+                "A": "Research the evidence and validate the claims",
+                "B": "Assess competitive implications and strategic value",
+                "C": "Consider the human impact and job implications",
+                "D": "Evaluate practical implementation challenges",
+                "E": "Examine security risks and compliance requirements",
+                "F": "Look for ways to ensure equitable access and benefits",
+                "G": "Explore breakthrough potential and innovation opportunities"
+            },
+            "scoring": {
+                "A": "Scholar",
+                "B": "Strategist",
+                "C": "Humanist",
+                "D": "Pragmatist",
+                "E": "Guardian",
+                "F": "Egalitarian",
+                "G": "Innovator"
+            }
+        },
+        {
+            "id": 4,
+            "question": "What concerns you most about AI implementation in professional settings?",
+            "answers": {
+                "A": "Loss of human skills and over-dependence on automation",
+                "B": "Security vulnerabilities and governance failures",
+                "C": "Widening gaps between AI-enabled and traditional workers",
+                "D": "Rushing adoption without rigorous validation",
+                "E": "Missing competitive opportunities while others advance",
+                "F": "Tools that create more problems than they solve",
+                "G": "Believing inflated promises instead of realistic expectations"
+            },
+            "scoring": {
+                "A": "Humanist",
+                "B": "Guardian",
+                "C": "Egalitarian",
+                "D": "Scholar",
+                "E": "Strategist",
+                "F": "Pragmatist",
+                "G": "Scholar"
+            }
+        },
+        {
+            "id": 5,
+            "question": "If you could have an AI 'expert advisor' available 24/7, what would be most valuable?",
+            "answers": {
+                "A": "Research assistance and evidence-based insights",
+                "B": "Strategic analysis and competitive intelligence", 
+                "C": "Learning support and skill development guidance",
+                "D": "Creative collaboration and idea development",
+                "E": "Practical problem-solving for daily challenges",
+                "F": "Ensuring decisions consider human impact and ethics",
+                "G": "Making expert knowledge accessible to everyone"
+            },
+            "scoring": {
+                "A": "Scholar",
+                "B": "Strategist",
+                "C": "Humanist",
+                "D": "Innovator",
+                "E": "Pragmatist",
+                "F": "Humanist",
+                "G": "Egalitarian"
+            }
+        },
+        {
+            "id": 6,
+            "question": "What would make you confident in an AI implementation?",
+            "answers": {
+                "A": "Transparent processes and robust safety measures",
+                "B": "Peer-reviewed research and systematic validation",
+                "C": "Clear evidence it enhances rather than replaces human work",
+                "D": "Demonstrated competitive advantages and ROI",
+                "E": "Equitable access and inclusive design principles",
+                "F": "Reliable performance in real-world conditions",
+                "G": "Breakthrough capabilities that open new possibilities"
+            },
+            "scoring": {
+                "A": "Guardian",
+                "B": "Scholar",
+                "C": "Humanist",
+                "D": "Strategist",
+                "E": "Egalitarian",
+                "F": "Pragmatist",
+                "G": "Innovator"
+            }
+        },
+        {
+            "id": 7,
+            "question": "How would you approach leading others through AI adoption?",
+            "answers": {
+                "A": "Start small, learn from experience, scale what works",
+                "B": "Invest heavily in training and skill development",
+                "C": "Establish clear governance and ethical guidelines first",
+                "D": "Focus on tools that amplify human capabilities",
+                "E": "Ensure benefits and opportunities reach everyone",
+                "F": "Move decisively to capture competitive advantages",
+                "G": "Pursue transformative applications that create new value"
+            },
+            "scoring": {
+                "A": "Pragmatist",
+                "B": "Humanist",
+                "C": "Guardian",
+                "D": "Humanist",
+                "E": "Egalitarian",
+                "F": "Strategist",
+                "G": "Innovator"
+            }
+        },
+        {
+            "id": 8,
+            "question": "When evaluating AI solutions, what do you prioritize first?",
+            "answers": {
+                "A": "Evidence base and methodological rigor",
+                "B": "Security, privacy, and compliance features",
+                "C": "Impact on employee experience and job satisfaction",
+                "D": "Business case and strategic alignment",
+                "E": "Accessibility across different skill levels",
+                "F": "Practical integration with existing workflows",
+                "G": "Innovation potential and competitive differentiation"
+            },
+            "scoring": {
+                "A": "Scholar",
+                "B": "Guardian",
+                "C": "Humanist",
+                "D": "Strategist",
+                "E": "Egalitarian",
+                "F": "Pragmatist",
+                "G": "Innovator"
+            }
+        },
+        {
+            "id": 9,
+            "question": "When you encounter AI skepticism or resistance, what's your approach?",
+            "answers": {
+                "A": "Share research and evidence to address specific concerns",
+                "B": "Acknowledge concerns and collaborate on solutions",
+                "C": "Demonstrate practical benefits through small experiments",
+                "D": "Emphasize human values and ethical safeguards",
+                "E": "Show how AI can increase rather than decrease opportunities",
+                "F": "Focus on competitive necessity and strategic advantages",
+                "G": "Respect their caution - skepticism prevents costly mistakes"
+            },
+            "scoring": {
+                "A": "Scholar",
+                "B": "Humanist",
+                "C": "Pragmatist",
+                "D": "Humanist",
+                "E": "Egalitarian",
+                "F": "Strategist",
+                "G": "Scholar"
+            }
+        },
+        {
+            "id": 10,
+            "question": "What's your biggest hope for AI's impact on work and society?",
+            "answers": {
+                "A": "Liberating humans from tedious work to focus on meaningful challenges",
+                "B": "Breaking down barriers so talent can flourish regardless of background",
+                "C": "Accelerating scientific progress to solve humanity's biggest problems",
+                "D": "Creating sustainable competitive advantages and economic growth",
+                "E": "Enabling personalized learning and continuous skill development",
+                "F": "Making complex problems manageable with better tools",
+                "G": "Opening entirely new frontiers of innovation and possibility"
+            },
+            "scoring": {
+                "A": "Humanist",
+                "B": "Egalitarian",
+                "C": "Scholar",
+                "D": "Strategist",
+                "E": "Humanist",
+                "F": "Pragmatist",
+                "G": "Innovator"
+            }
+        }
+    ],
+    "archetypes": {
+        "Scholar": {
+            "name": "The Scholar",
+            "description": "Sees AI as a frontier for scientific inquiry and intellectual rigor. Values research, empirical evidence, and robust theoretical frameworks.",
+            "characteristics": [
+                "Grounds decisions in evidence and analysis",
+                "Keeps hype in check with data and systematic study",
+                "Fosters continuous learning and improvement",
+                "Values peer-reviewed research and validation"
+            ],
+            "approach": "Engage in pilot design, assessment, and lessons-learned reviews. Leverage their expertise to set up meaningful metrics and success criteria.",
+            "change_response": "May delay action while seeking more data. Can struggle with ambiguity or practical constraints.",
+            "risks": "Analysis paralysis - seeking perfect data before moving forward.",
+            "icon": "📚",
+            "color": "#4ECDC4"
+        },
+        "Strategist": {
+            "name": "The Strategist", 
+            "description": "Approaches AI through the lens of competitive advantage, business value, and organizational transformation. Focused on aligning AI initiatives with mission, ROI, and market realities.",
+            "characteristics": [
+                "Drives alignment between AI and business outcomes",
+                "Secures resources and executive sponsorship", 
+                "Keeps efforts goal-oriented",
+                "Focuses on competitive advantage and ROI"
+            ],
+            "approach": "Involve in roadmap and business case development. Pair with values-driven archetypes to ensure plans are both profitable and principled.",
+            "change_response": "May prioritize value over values. Can move too fast for adequate stakeholder buy-in.",
+            "risks": "May overlook ethical considerations for business gains; could rush implementation.",
+            "icon": "📈",
+            "color": "#FF6B35"
+        },
+        "Humanist": {
+            "name": "The Humanist",
+            "description": "Centers human wellbeing, agency, and dignity. Sees AI as a tool for human flourishing, not a replacement for human value.",
+            "characteristics": [
+                "Ensures AI enhances rather than erodes humanity",
+                "Champions user experience and emotional impacts",
+                "Raises questions about autonomy and meaning of work",
+                "Advocates for human-centered design"
+            ],
+            "approach": "Invite into user research, change management, and communication planning. Recognize their advocacy for meaning and wellbeing.",
+            "change_response": "May resist efficiency if it feels dehumanizing. Could overlook technical or business constraints.",
+            "risks": "May slow adoption focused on human impact; could resist beneficial automation.",
+            "icon": "🤝",
+            "color": "#95E1D3"
+        },
+        "Pragmatist": {
+            "name": "The Pragmatist",
+            "description": "Values practicality, incremental progress, and evidence-based action. Focused on what works 'on the ground,' not just in theory or vision.",
+            "characteristics": [
+                "Bridges vision and execution",
+                "Surfaces operational risks early",
+                "Supports sustainable, manageable rollout",
+                "Focuses on practical implementation"
+            ],
+            "approach": "Make part of implementation, feedback, and continuous improvement cycles. Empower them to surface blockers early.",
+            "change_response": "May overlook breakthrough potential in favor of short-term feasibility. Sometimes seen as cautious.",
+            "risks": "May miss transformative opportunities by focusing too heavily on incremental improvements.",
+            "icon": "🔧",
+            "color": "#A8E6CF"
+        },
+        "Guardian": {
+            "name": "The Guardian",
+            "description": "Focuses on risk management, safety, security, and governance. Prioritizes regulation, compliance, and robust oversight to prevent harm.",
+            "characteristics": [
+                "Prevents costly mistakes or scandals",
+                "Enforces standards and accountability",
+                "Brings holistic view of risk and privacy",
+                "Advocates for robust oversight"
+            ],
+            "approach": "Involve from the start in risk assessment and policy creation. Give them real decision rights in solution-finding.",
+            "change_response": "May slow down or block beneficial innovation. Can be perceived as overly rigid.",
+            "risks": "Could create overly restrictive policies that hinder beneficial innovation.",
+            "icon": "🛡️",
+            "color": "#B4A7D6"
+        },
+        "Egalitarian": {
+            "name": "The Egalitarian",
+            "description": "Prioritizes fairness, equity, and justice in all aspects of AI. Focused on ensuring access, preventing bias, and protecting the vulnerable.",
+            "characteristics": [
+                "Brings voice of inclusion and social impact",
+                "Highlights bias and advocates for equity",
+                "Ensures systems don't amplify inequalities",
+                "Focuses on fair benefit sharing"
+            ],
+            "approach": "Invite to review design, hiring, and deployment plans for inclusion. Use their insights to address bias or access barriers.",
+            "change_response": "May see business tradeoffs as insufficiently just. Risk of focusing on edge cases over general progress.",
+            "risks": "Could slow deployment over inclusion concerns; may focus on edge cases at expense of broader progress.",
+            "icon": "⚖️",
+            "color": "#FFE66D"
+        },
+        "Innovator": {
+            "name": "The Innovator",
+            "description": "Sees AI as an adventure and a lever for transformative change. Motivated by curiosity, creativity, and the drive to be first.",
+            "characteristics": [
+                "Sparks momentum and excitement",
+                "Rapidly discovers new use cases",
+                "Inspires others through visible action",
+                "Willing to take risks and experiment"
+            ],
+            "approach": "Encourage experiments and create space for safe piloting. Pair with operational partners to scale impact.",
+            "change_response": "Can overlook implementation realities. May unintentionally leave others behind.",
+            "risks": "May move too fast without proper consideration; could overlook practical constraints.",
+            "icon": "🚀",
+            "color": "#FF8B94"
+        },
+        "Steward": {
+            "name": "The Steward",
+            "description": "Guided by environmental and resource stewardship. Focused on ensuring AI is sustainable and ecologically responsible.",
+            "characteristics": [
+                "Advocates for 'AI for Good' and long-term thinking",
+                "Raises questions about energy use and waste",
+                "Focuses on ecological impact and sustainability",
+                "Champions resource-conscious solutions"
+            ],
+            "approach": "Include early in decision-making. Let them help shape sustainable policies and evaluate environmental tradeoffs.",
+            "change_response": "May be perceived as slowing progress if sustainability isn't prioritized by others.",
+            "risks": "May slow adoption over environmental concerns; could limit growth-focused applications.",
+            "icon": "🌱",
+            "color": "#90EE90"
+        },
+        "Learner": {
+            "name": "The Learner/Educator",
+            "description": "Driven by curiosity, upskilling, and the desire to build AI literacy. Acts as a bridge between developers, decision-makers, and end-users.",
+            "characteristics": [
+                "Helps organizations adapt and stay resilient",
+                "Builds trust through transparent communication",
+                "Champions realistic self-assessment",
+                "Focuses on building AI literacy"
+            ],
+            "approach": "Engage in onboarding, internal communications, and change management. Recognize efforts to build AI-ready organization.",
+            "change_response": "May become frustrated if others resist learning or if upskilling isn't prioritized.",
+            "risks": "May focus too heavily on training at expense of immediate implementation needs.",
+            "icon": "🎓",
+            "color": "#87CEEB"
+        },
+        "Integrator": {
+            "name": "The Integrator/Facilitator",
+            "description": "Ensures AI moves from pilot to real-world use. Focuses on implementation, monitoring, and continuous improvement.",
+            "characteristics": [
+                "Makes change real through integration",
+                "Sets up safety nets and feedback loops",
+                "Guides ongoing user education",
+                "Bridges strategy and operations"
+            ],
+            "approach": "Empower with authority and cross-functional access. Invite into both planning and rollout phases.",
+            "change_response": "May be seen as bureaucratic. Can become bottlenecks if not properly empowered.",
+            "risks": "Could slow processes if not given proper authority; may focus too much on process over outcomes.",
+            "icon": "🔗",
+            "color": "#DDA0DD"
+        },
+        "Skeptic": {
+            "name": "The Skeptic/Resistor",
+            "description": "Approaches AI with critical lens, motivated by self-preservation, skepticism, or deep questions about value and risk.",
+            "characteristics": [
+                "Identifies blind spots in hype and groupthink",
+                "Protects team from unintended consequences",
+                "Surfaces real risks and concerns",
+                "Provides essential critical perspective"
+            ],
+            "approach": "Acknowledge legitimacy of skepticism. Invite into structured evaluation and provide clear, transparent answers.",
+            "change_response": "May default to resistance or disengage entirely. Can discourage experimentation if not engaged thoughtfully.",
+            "risks": "Could block beneficial innovations; may discourage necessary experimentation and learning.",
+            "icon": "🤔",
+            "color": "#F0E68C"
+        }
+    },
+    # Role demographic mapping (Q1 only)
+    "role_mapping": {
+        "A": "individual_contributor", 
+        "B": "team_leader", 
+        "C": "executive", 
+        "D": "academic", 
+        "E": "advisor", 
+        "F": "observer"
+    }
+}
@@ -0,0 +1,111 @@
+"""
+Per-client token-bucket rate limiting
+Buckets live in memory, keyed by client IP, with LRU eviction of idle clients.
+RateLimitMiddleware takes the token before a limited route reads its body,
+so throttled requests cost no body read, JSON parsing or validation.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Tuple
+
+from fastapi.responses import JSONResponse
+
+import metrics
+
+MAX_TRACKED_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+
+def _budget(env_name: str, default: str) -> Tuple[float, float]:
+    """Parse a "rate:burst" budget (tokens per second : bucket size)"""
+    rate, burst = os.getenv(env_name, default).split(":")
+    return float(rate), float(burst)
+
+
+class TokenBucketLimiter:
+    """Token bucket per client key for one route"""
+
+    def __init__(self, route: str, rate: float, burst: float, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.route = route
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # key -> [tokens, last refill time]; order is least recently seen first
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = metrics.counter("quiz_rate_limit_requests_total",
+                                       "Requests seen by the rate limiter", route=route, result="allowed")
+        self.throttled = metrics.counter("quiz_rate_limit_requests_total",
+                                         "Requests seen by the rate limiter", route=route, result="throttled")
+
+    def allow(self, key: str) -> bool:
+        """Take one token for key; False means the request should be dropped"""
+        now = monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                self.allowed.inc()
+                return True
+
+        self.throttled.inc()
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until an empty bucket has a token again"""
+        return max(1, int(1 / self.rate + 0.999)) if self.rate > 0 else 60
+
+
+# Route budgets: a full quiz sends ~25 analytics events and a single submission
+ANALYTICS_LIMITER = TokenBucketLimiter("/api/analytics", *_budget("RATE_LIMIT_ANALYTICS", "2:40"))
+SUBMIT_LIMITER = TokenBucketLimiter("/api/submit", *_budget("RATE_LIMIT_SUBMIT", "0.1:5"))
+SCORE_LIMITER = TokenBucketLimiter("/api/score/batch", *_budget("RATE_LIMIT_SCORE_BATCH", "0.2:5"))
+
+# Limited routes (POST only): the limiter and the 429 body it answers with
+ROUTE_LIMITERS: Dict[str, Tuple[TokenBucketLimiter, Dict[str, Any]]] = {
+    "/api/analytics": (ANALYTICS_LIMITER, {"status": "throttled"}),
+    "/api/submit": (SUBMIT_LIMITER, {"detail": "Too many submissions"}),
+    "/api/score/batch": (SCORE_LIMITER, {"detail": "Too many scoring requests"}),
+}
+
+
+def client_ip(scope, ip_header: str = "") -> str:
+    """The trusted proxy's client address header when configured, else the peer address"""
+    if ip_header:
+        name = ip_header.lower().encode()
+        for key, value in scope["headers"]:
+            if key == name and value:
+                return value.decode("latin-1")
+    client = scope.get("client")
+    return client[0] if client else ""
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware answering 429 for ROUTE_LIMITERS before the body is read"""
+
+    def __init__(self, app, limiters: Dict[str, Tuple[TokenBucketLimiter, Dict[str, Any]]] = ROUTE_LIMITERS,
+                 ip_header: str = ""):
+        self.app = app
+        self.limiters = limiters
+        self.ip_header = ip_header
+
+    async def __call__(self, scope, receive, send):
+        limited = self.limiters.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limited is not None:
+            limiter, body = limited
+            if not limiter.allow(client_ip(scope, self.ip_header)):
+                response = JSONResponse(body, status_code=429, headers={"Retry-After": str(limiter.retry_after())})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
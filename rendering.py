@@ -0,0 +1,79 @@
+"""
+HTML rendering for the AI Archetype Quiz
+Jinja2 templates from templates/ with autoescaping and an on-disk bytecode
+cache. Static fragments (archetype cards, whole static pages) are rendered
+once per process; only the dynamic parts of a page are recomputed.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+TEMPLATE_CACHE_DIR = Path(os.getenv("TEMPLATE_CACHE_DIR", "data/template_cache"))
+
+# Development only: re-read templates when they change on disk
+AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "").lower() in ("1", "true")
+
+
+def _bytecode_cache():
+    try:
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        return FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+    except OSError as e:
+        print(f"Template bytecode cache disabled: {e}")
+        return None
+
+
+env = Environment(
+    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=AUTO_RELOAD,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+# Keep QUIZ_DATA's key order in |tojson - the client relies on it
+env.policies["json.dumps_kwargs"] = {"sort_keys": False}
+
+_fragments: Dict[Tuple, Markup] = {}
+
+
+def fragment(name: str, **context: Any) -> Markup:
+    """Render a template once per distinct (hashable) context and reuse the HTML"""
+    key = (name, tuple(sorted(context.items())))
+    html = _fragments.get(key)
+    if html is None or AUTO_RELOAD:
+        html = _fragments[key] = Markup(env.get_template(name).render(**context))
+    return html
+
+
+env.globals["fragment"] = fragment
+
+
+def render(name: str, **context: Any) -> str:
+    """Render a page; its static fragments come from the fragment cache"""
+    return env.get_template(name).render(**context)
+
+
+def render_static(name: str) -> str:
+    """A page with no per-request data, rendered once"""
+    return str(fragment(name))
+
+
+def render_block(name: str, block: str, **context: Any) -> str:
+    """Render one {% block %} of a template on its own, for streamed pages"""
+    template = env.get_template(name)
+    return "".join(template.blocks[block](template.new_context(context)))
+
+
+def static_block(name: str, block: str) -> str:
+    """A block with no per-request data, rendered once"""
+    key = (name, block)
+    html = _fragments.get(key)
+    if html is None or AUTO_RELOAD:
+        html = _fragments[key] = Markup(render_block(name, block))
+    return str(html)
@@ -0,0 +1,233 @@
+"""
+Retention for raw analytics events
+Moves events older than the retention age into gzip NDJSON archives under
+data/archive/ (one file per month) and keeps per-day counts in the
+analytics_daily rollup. Deletes run in small transactions so live writes
+are never blocked for long.
+
+    python retention.py --days 180
+    python retention.py --days 30 --chunk-size 200
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import database
+import shards
+
+ARCHIVE_DIR = Path(os.getenv("ANALYTICS_ARCHIVE_DIR", "data/archive"))
+RETENTION_DAYS = int(os.getenv("ANALYTICS_RETENTION_DAYS", "180"))
+CHUNK_SIZE = int(os.getenv("ANALYTICS_RETENTION_CHUNK", "500"))
+
+# Pause between chunks so the writer and request handlers get the lock in between
+CHUNK_PAUSE = 0.05
+
+# Freed pages handed back per incremental vacuum step
+VACUUM_PAGES = 256
+
+FIELDS = shards.COLUMNS.split(", ")
+
+def archive_path(month: str) -> Path:
+    return ARCHIVE_DIR / f"analytics-{month}.ndjson.gz"
+
+
+def archived_months() -> List[str]:
+    """Months that have an archive file, oldest first"""
+    if not ARCHIVE_DIR.exists():
+        return []
+    return sorted(path.name[len("analytics-"):-len(".ndjson.gz")] for path in ARCHIVE_DIR.glob("analytics-*.ndjson.gz"))
+
+
+def read_archive(month: str) -> Iterator[Dict]:
+    """Events archived for a month, in archive order
+
+    Each run appends a new gzip member, and a run interrupted between the
+    append and the delete archives the same rows again; ids are unique
+    within a month, so repeats are skipped here.
+    """
+    path = archive_path(month)
+    if not path.exists():
+        return
+    seen = set()
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        for line in archive:
+            event = json.loads(line)
+            if event["id"] in seen:
+                continue
+            seen.add(event["id"])
+            yield event
+
+
+def _append(month: str, rows: List[tuple]):
+    """Append rows as one gzip member and make them durable before anything is deleted"""
+    path = archive_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(FIELDS, row)), separators=(",", ":")).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _rollup(conn: sqlite3.Connection, schema: str, condition: str, parameters: tuple):
+    conn.execute(f'''
+        INSERT INTO main.analytics_daily (day, event_type, events)
+        SELECT DATE(created_at), event_type, COUNT(*)
+        FROM {schema}.analytics WHERE {condition}
+        GROUP BY DATE(created_at), event_type
+        ON CONFLICT (day, event_type) DO UPDATE SET events = analytics_daily.events + excluded.events
+    ''', parameters)
+
+
+def _incremental_vacuum(conn: sqlite3.Connection, schema: str):
+    """Return freed pages to the filesystem a few at a time"""
+    if conn.execute(f"PRAGMA {schema}.auto_vacuum").fetchone()[0] != 2:
+        # Shard created before incremental auto-vacuum was enabled
+        return
+    while conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]:
+        conn.execute(f"PRAGMA {schema}.incremental_vacuum({VACUUM_PAGES})").fetchall()
+        conn.commit()
+        time.sleep(CHUNK_PAUSE)
+
+
+def funnel_read_up_to(conn: sqlite3.Connection, month: str) -> Optional[int]:
+    """Highest event id of a month the funnel has folded in; None when it needs none of the month
+
+    Raw events are only archived once the funnel has read them: its rollups
+    cannot be rebuilt from the daily counts kept here. This mirrors which
+    months Repository.analytics_after still reads.
+    """
+    try:
+        checkpoint = dict(conn.execute("SELECT source, last_id FROM main.funnel_checkpoints").fetchall())
+    except sqlite3.OperationalError:
+        # No funnel tables: nothing reads the raw events
+        return None
+    if month < max(checkpoint, default="") and shards.is_sealed(month):
+        return None
+    return checkpoint.get(month, 0)
+
+
+def _prune_open(conn: sqlite3.Connection, month: str, cutoff: str, chunk_size: int) -> int:
+    """Archive and delete old rows from a shard that is still being written, chunk by chunk"""
+    schema = "retain_" + month.replace("-", "_")
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shards.shard_path(month).resolve()),))
+    read_up_to = funnel_read_up_to(conn, month)
+    last_id = read_up_to if read_up_to is not None else -1
+    moved = 0
+    try:
+        while True:
+            rows = conn.execute(f'''
+                SELECT {shards.COLUMNS} FROM {schema}.analytics
+                WHERE created_at < ? AND (? < 0 OR id <= ?) ORDER BY id LIMIT ?
+            ''', (cutoff, last_id, last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            _append(month, rows)
+
+            # Rows written meanwhile are newer than the cutoff, so this matches exactly the chunk
+            condition, parameters = "id <= ? AND created_at < ?", (rows[-1][0], cutoff)
+            conn.execute("BEGIN IMMEDIATE")
+            _rollup(conn, schema, condition, parameters)
+            conn.execute(f"DELETE FROM {schema}.analytics WHERE {condition}", parameters)
+            conn.commit()
+            moved += len(rows)
+            time.sleep(CHUNK_PAUSE)
+
+        if moved:
+            _incremental_vacuum(conn, schema)
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+    return moved
+
+
+def _retire_month(conn: sqlite3.Connection, month: str, chunk_size: int) -> int:
+    """Archive a whole month that is past the cutoff, record its rollup once, then drop the shard"""
+    done = conn.execute("SELECT events FROM analytics_archived WHERE month = ?", (month,)).fetchone()
+    if done:
+        # Archived by an earlier run that stopped before deleting the file
+        shards.drop(month)
+        return 0
+
+    schema = "retire_" + month.replace("-", "_")
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shards.shard_path(month).resolve()),))
+    moved = 0
+    try:
+        read_up_to = funnel_read_up_to(conn, month)
+        newest = conn.execute(f"SELECT MAX(id) FROM {schema}.analytics").fetchone()[0]
+        if read_up_to is not None and newest is not None and newest > read_up_to:
+            print(f"Retention waiting for the funnel to read analytics shard {month}")
+            return 0
+
+        last_id = 0
+        while True:
+            rows = conn.execute(f'''
+                SELECT {shards.COLUMNS} FROM {schema}.analytics
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            _append(month, rows)
+            last_id = rows[-1][0]
+            moved += len(rows)
+
+        conn.execute("BEGIN IMMEDIATE")
+        _rollup(conn, schema, "1", ())
+        conn.execute("INSERT INTO analytics_archived (month, events) VALUES (?, ?)", (month, moved))
+        conn.commit()
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+
+    shards.drop(month)
+    return moved
+
+
+def run(days: int = RETENTION_DAYS, chunk_size: int = CHUNK_SIZE) -> Dict[str, int]:
+    """Apply the retention policy once; returns archived event counts per month"""
+    cutoff_at = datetime.now(timezone.utc) - timedelta(days=days)
+    # created_at is a naive UTC 'YYYY-MM-DD HH:MM:SS' string in every shard
+    cutoff = cutoff_at.strftime("%Y-%m-%d %H:%M:%S")
+    cutoff_month = shards.month_of(cutoff_at)
+
+    conn = database.connect(database.DB_PATH)
+    archived = {}
+    try:
+        for statement in database.ROLLUP_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+        # Under the default policy old rows go when their whole month is
+        # retired, i.e. once the cutoff has moved past the end of it. The
+        # cutoff month is only pruned row by row while it is still open, which
+        # takes a retention age shorter than about a month plus
+        # ANALYTICS_SEAL_AFTER_DAYS. A sealed cutoff month stays immutable, so
+        # events can outlive the retention age by up to a month.
+        for month in shards.list_months():
+            if month < cutoff_month:
+                archived[month] = _retire_month(conn, month, chunk_size)
+            elif month == cutoff_month and not shards.is_sealed(month):
+                archived[month] = _prune_open(conn, month, cutoff, chunk_size)
+    finally:
+        conn.close()
+
+    total = sum(archived.values())
+    if total:
+        print(f"Retention archived {total} analytics events older than {cutoff}")
+    return archived
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive and delete raw analytics events past the retention age")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for month, count in run(args.days, args.chunk_size).items():
+        print(f"{month}: {count} events archived")
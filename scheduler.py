@@ -0,0 +1,159 @@
+"""
+In-process background jobs
+Periodic jobs (funnel rollups, shard sealing, retention, stats cache
+warming) run inside the web app and start and stop with its lifespan.
+Each job runs every interval plus random jitter, so workers started
+together do not fire in step, and never overlaps itself.
+
+Jobs that change shared state run on one worker only: the leader, which
+holds an exclusive file lock (SCHEDULER_LOCK_DIR/scheduler.lock). Others
+retry the lock on each tick and take over if the leader exits. Per-worker
+jobs (cache warming) run everywhere. Durations and outcomes go to /metrics.
+On shutdown a running job gets SCHEDULER_DRAIN_SECONDS to finish before it
+is cancelled.
+"""
+
+import asyncio
+import os
+import random
+from pathlib import Path
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows - no flock; every worker acts as leader
+    fcntl = None
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+DRAIN_SECONDS = float(os.getenv("SCHEDULER_DRAIN_SECONDS", "10"))
+LOCK_DIR = Path(os.getenv("SCHEDULER_LOCK_DIR", "data"))
+
+JOB_RESULTS = ("ok", "error", "cancelled", "skipped")
+
+
+class Job:
+    """One periodic job; run is an async callable taking no arguments"""
+
+    def __init__(self, name: str, interval: float, run: Callable[[], Awaitable], leader_only: bool = True,
+                 delay: Optional[float] = None):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.leader_only = leader_only
+        # First run after delay seconds (default: one interval)
+        self.delay = interval if delay is None else delay
+        self.duration = metrics.job(name)
+        self.outcomes = {result: metrics.counter("quiz_job_runs_total", "Background job runs by outcome",
+                                                 job=name, result=result)
+                         for result in JOB_RESULTS}
+
+
+class LeaderLock:
+    """Exclusive, non-blocking flock held for as long as this process leads"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None and self._file is not True:
+            # Closing the file drops the lock; the OS does the same if the process dies
+            self._file.close()
+        self._file = None
+
+
+class Scheduler:
+    """Runs Jobs on their intervals until stopped"""
+
+    def __init__(self, jobs: List[Job], lock_path: Path = LOCK_DIR / "scheduler.lock",
+                 jitter: float = JITTER, drain_seconds: float = DRAIN_SECONDS):
+        self.jobs = jobs
+        self.jitter = jitter
+        self.drain_seconds = drain_seconds
+        self.leader = LeaderLock(lock_path)
+        self.running: Dict[str, asyncio.Task] = {}
+        self._loops: List[asyncio.Task] = []
+        self._stopping: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._loops = [asyncio.create_task(self._loop(job)) for job in self.jobs]
+
+    def _wait(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep unless stopped first; True when it is time to run"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def _loop(self, job: Job):
+        delay = self._wait(job.delay)
+        while await self._sleep(delay):
+            delay = self._wait(job.interval)
+            if job.leader_only and not self.leader.acquire():
+                job.outcomes["skipped"].inc()
+                continue
+            # Awaited here, so the next run is only scheduled once this one is done
+            task = self.running[job.name] = asyncio.create_task(job.run())
+            started = perf_counter()
+            try:
+                await task
+                job.outcomes["ok"].inc()
+            except asyncio.CancelledError:
+                # Cut off by stop() after the drain period
+                job.outcomes["cancelled"].inc()
+                return
+            except Exception as e:
+                job.outcomes["error"].inc()
+                print(f"Background job {job.name} failed: {e}")
+            finally:
+                job.duration.observe(perf_counter() - started)
+                self.running.pop(job.name, None)
+
+    async def stop(self):
+        """Stop scheduling, give running jobs drain_seconds to finish, then cancel them"""
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        pending = list(self.running.values())
+        if pending:
+            _, late = await asyncio.wait(pending, timeout=self.drain_seconds)
+            for task in late:
+                print(f"Cancelling background job still running after {self.drain_seconds:g}s drain")
+                task.cancel()
+        # Idle loops wake on the stop event; the others end with their job
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self.leader.release()
+
+
+def in_thread(function: Callable, *args) -> Callable[[], Awaitable]:
+    """A job body for blocking code (sqlite3, file I/O), run in the default executor"""
+    return lambda: asyncio.to_thread(function, *args)
@@ -0,0 +1,152 @@
+"""
+Archetype scoring rules and the compiled batch scorer
+Points and the secondary-archetype thresholds come from the quiz definition:
+quiz-wide "scoring_rules", optionally overridden per question by "weights".
+Scorer flattens the definition into per-answer arrays so a whole batch of
+response sets is scored with a handful of numpy operations, with the same
+results (including tie-breaks) as scoring each set on its own.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_RULES = {
+    "primary_weight": 3,       # points for the first choice
+    "secondary_weight": 1,     # points for each additional choice
+    "secondary_min_score": 4,  # a secondary archetype needs at least this many points
+    "secondary_max_gap": 3,    # ...and to be within this many points of the primary
+    "default_archetype": "Pragmatist",
+}
+
+
+def rules(quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """Quiz-wide scoring rules, with defaults for anything not configured"""
+    return {**DEFAULT_RULES, **quiz.get("scoring_rules", {})}
+
+
+def answer_weights(quiz: Dict[str, Any], question: Dict[str, Any]) -> Tuple[int, int]:
+    """(first choice, additional choice) points for one question"""
+    quiz_rules = rules(quiz)
+    weights = question.get("weights", {})
+    return (weights.get("primary", quiz_rules["primary_weight"]),
+            weights.get("secondary", quiz_rules["secondary_weight"]))
+
+
+class Scorer:
+    """A quiz definition compiled to flat arrays, for scoring many response sets at once"""
+
+    def __init__(self, quiz: Dict[str, Any]):
+        self.rules = rules(quiz)
+        self.archetypes = list(quiz["archetypes"])
+        self.names = [quiz["archetypes"][key]["name"] for key in self.archetypes]
+        self.role_mapping = quiz.get("role_mapping", {})
+        index = {key: i for i, key in enumerate(self.archetypes)}
+        self.default = index[self.rules["default_archetype"]]
+
+        # One slot per scoring (question, answer) pair
+        self.demographic = set()
+        self.slots: Dict[Tuple[int, str], int] = {}
+        slot_archetype, primary_points, secondary_points = [], [], []
+        for question in quiz["questions"]:
+            if question.get("type") == "demographic":
+                self.demographic.add(question["id"])
+                continue
+            primary, secondary = answer_weights(quiz, question)
+            for answer, archetype in (question.get("scoring") or {}).items():
+                self.slots[(question["id"], answer)] = len(slot_archetype)
+                slot_archetype.append(index[archetype])
+                primary_points.append(primary)
+                secondary_points.append(secondary)
+
+        self.slot_archetype = np.array(slot_archetype, dtype=np.intp)
+        # points[kind, slot]: kind 0 is a first choice, 1 an additional choice
+        self.points = np.array([primary_points, secondary_points], dtype=np.int64).reshape(2, -1)
+
+    def encode(self, batch: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Optional[str]]]:
+        """Flatten response sets to (row, slot, kind) picks in answer order, plus each set's role"""
+        rows, slots, kinds, roles = [], [], [], []
+        for row, responses in enumerate(batch):
+            role = None
+            for question_id, answer in responses.items():
+                try:
+                    question_num = int(question_id)
+                except (TypeError, ValueError):
+                    continue
+
+                if question_num in self.demographic:
+                    if isinstance(answer, dict) and "primary" in answer:
+                        choice = answer["primary"]
+                        role = self.role_mapping.get(choice, "unknown") if isinstance(choice, str) else "unknown"
+                    elif isinstance(answer, str):
+                        role = self.role_mapping.get(answer, "unknown")
+                    continue
+
+                if isinstance(answer, dict):
+                    secondary = answer.get("secondary", [])
+                    picks = [(answer.get("primary"), 0)]
+                    if isinstance(secondary, list):
+                        picks.extend((choice, 1) for choice in secondary)
+                else:
+                    picks = [(answer, 0)]
+
+                for choice, kind in picks:
+                    slot = self.slots.get((question_num, choice)) if isinstance(choice, str) else None
+                    if slot is not None:
+                        rows.append(row)
+                        slots.append(slot)
+                        kinds.append(kind)
+            roles.append(role)
+
+        return (np.array(rows, dtype=np.intp), np.array(slots, dtype=np.intp),
+                np.array(kinds, dtype=np.intp), roles)
+
+    def score_picks(self, n: int, rows: np.ndarray, slots: np.ndarray, kinds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-set archetype totals, and the pick at which each archetype first scored (len(rows) if never)"""
+        k = len(self.archetypes)
+        cells = rows * k + self.slot_archetype[slots]
+        scores = np.bincount(cells, weights=self.points[kinds, slots], minlength=n * k).astype(np.int64)
+        first = np.full(n * k, len(cells), dtype=np.int64)
+        touched, first_pick = np.unique(cells, return_index=True)
+        first[touched] = first_pick
+        return scores.reshape(n, k), first.reshape(n, k)
+
+    def classify(self, scores: np.ndarray, first: np.ndarray, picks: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Primary and secondary archetype index per set; secondary is -1 when it does not qualify"""
+        n = scores.shape[0]
+        scored = first < picks
+        sets = np.arange(n)
+
+        # Highest score first; ties go to whichever archetype scored first,
+        # matching a stable sort of the scores dict built in answer order
+        rank = np.where(scored, -scores.astype(np.int64) * (picks + 1) + first, np.iinfo(np.int64).max)
+        top = rank.argmin(axis=1)
+        primary = np.where(scored[sets, top], top, self.default)
+        if scores.shape[1] < 2:
+            return primary, np.full(n, -1)
+
+        rank[sets, top] = np.iinfo(np.int64).max
+        runner_up = rank.argmin(axis=1)
+        top_score, second_score = scores[sets, top], scores[sets, runner_up]
+        qualifies = (scored[sets, runner_up]
+                     & (second_score >= self.rules["secondary_min_score"])
+                     & (top_score - second_score <= self.rules["secondary_max_gap"]))
+        return primary, np.where(qualifies, runner_up, -1)
+
+    def score_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score every response set in a batch; nothing is stored"""
+        rows, slots, kinds, roles = self.encode(batch)
+        scores, first = self.score_picks(len(batch), rows, slots, kinds)
+        primary, secondary = self.classify(scores, first, len(rows))
+        scored = first < len(rows)
+
+        results = []
+        for i, (score_row, scored_row) in enumerate(zip(scores.tolist(), scored.tolist())):
+            results.append({
+                "primary_archetype": self.archetypes[primary[i]],
+                "secondary_archetype": self.archetypes[secondary[i]] if secondary[i] >= 0 else None,
+                "archetype_name": self.names[primary[i]],
+                "scores": {key: score for key, score, hit in zip(self.archetypes, score_row, scored_row) if hit},
+                "role_demographic": roles[i],
+            })
+        return results
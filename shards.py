@@ -0,0 +1,336 @@
+"""
+Monthly analytics shards
+Raw analytics events live in one SQLite file per month under data/analytics/
+and are ATTACHed on demand. Finished months are sealed (vacuumed once and
+made read-only), so dropping a month of data is a file delete.
+
+    python shards.py list
+    python shards.py seal
+    python shards.py drop 2025-01
+    python shards.py migrate           # add the indexed event_data columns
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import stat
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SHARD_DIR = Path(os.getenv("ANALYTICS_SHARD_DIR", "data/analytics"))
+
+# A month is sealed once it has been over for this long, so late writes have landed
+SEAL_AFTER = timedelta(days=int(os.getenv("ANALYTICS_SEAL_AFTER_DAYS", "1")))
+
+# SQLite allows 10 attached databases by default; leave room for the caller
+MAX_ATTACHED = 8
+
+SHARD_NAME = re.compile(r"^analytics-(\d{4}-\d{2})\.db$")
+MONTH = re.compile(r"^\d{4}-\d{2}$")
+
+# Schema the writing connection attaches this month's shard under
+CURRENT = "shard_current"
+
+COLUMNS = "id, event_type, session_id, event_data, ip_address, user_agent, created_at"
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS {schema}.analytics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        session_id TEXT,
+        event_data TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_analytics_event ON analytics(event_type)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_analytics_created ON analytics(created_at)',
+)
+
+# Frequently queried event_data keys, promoted to indexed virtual columns:
+# (column, type, JSON path). They are computed on read and cost nothing in
+# the table; only their partial indexes take space.
+EVENT_FIELDS = (
+    ("archetype", "TEXT", "$.archetype"),
+    ("role", "TEXT", "$.role"),
+    ("page", "TEXT", "$.page"),
+    ("question_number", "INTEGER", "$.question_number"),
+    ("completion_time", "REAL", "$.completion_time"),
+)
+EVENT_COLUMNS = ", ".join(name for name, _, _ in EVENT_FIELDS)
+
+# Shards whose schema this process has already created
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def utc(moment: datetime) -> datetime:
+    """An aware datetime in UTC; naive ones are taken to be UTC already, as SQLite timestamps are"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def month_of(moment: datetime) -> str:
+    return utc(moment).strftime("%Y-%m")
+
+
+def shard_path(month: str) -> Path:
+    return SHARD_DIR / f"analytics-{month}.db"
+
+
+def list_months() -> List[str]:
+    """Months that have a shard file, oldest first"""
+    if not SHARD_DIR.exists():
+        return []
+    return sorted(match.group(1) for match in map(SHARD_NAME.match, os.listdir(SHARD_DIR)) if match)
+
+
+def months_between(since: datetime, until: datetime) -> List[str]:
+    """Every month touched by [since, until]"""
+    months = []
+    since, until = utc(since), utc(until)
+    year, month = since.year, since.month
+    while (year, month) <= (until.year, until.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def is_sealed(month: str) -> bool:
+    path = shard_path(month)
+    return path.exists() and not path.stat().st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _attached(conn: sqlite3.Connection) -> Dict[str, str]:
+    return {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+
+
+def _ensure_schema(conn: sqlite3.Connection, schema: str, month: str):
+    with _ready_lock:
+        if month in _ready:
+            return
+        # Both are stored in the file; auto_vacuum only takes effect on a new,
+        # empty shard and lets retention hand freed pages back incrementally
+        conn.execute(f"PRAGMA {schema}.auto_vacuum=INCREMENTAL")
+        conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement.format(schema=schema))
+        _ensure_event_columns(conn, schema)
+        conn.commit()
+        _ready.add(month)
+
+
+def _event_columns(conn: sqlite3.Connection, schema: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA {schema}.table_xinfo(analytics)")} & {
+        name for name, _, _ in EVENT_FIELDS}
+
+
+def _ensure_event_columns(conn: sqlite3.Connection, schema: str):
+    """Add any missing EVENT_FIELDS column and its index (caller commits)"""
+    existing = _event_columns(conn, schema)
+    for name, sql_type, path in EVENT_FIELDS:
+        if name not in existing:
+            # json_valid keeps a malformed row readable instead of failing the whole query
+            conn.execute(f'''
+                ALTER TABLE {schema}.analytics ADD COLUMN {name} {sql_type}
+                GENERATED ALWAYS AS (CASE WHEN json_valid(event_data) THEN json_extract(event_data, '{path}') END) VIRTUAL
+            ''')
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_analytics_{name} ON analytics({name}) "
+                     f"WHERE {name} IS NOT NULL")
+
+
+def attach_current(conn: sqlite3.Connection) -> str:
+    """Attach this month's shard (creating it) for writing and return its schema name
+
+    Attaching is not allowed inside a transaction, so writers that batch call
+    this before their first statement; mid-transaction calls keep whatever
+    shard is already attached.
+    """
+    month = month_of(datetime.now(timezone.utc))
+    path = shard_path(month).resolve()
+    attached = _attached(conn).get(CURRENT)
+    if attached == str(path) or (attached and conn.in_transaction):
+        return CURRENT
+    if attached:
+        conn.execute(f"DETACH DATABASE {CURRENT}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn.execute(f"ATTACH DATABASE ? AS {CURRENT}", (str(path),))
+    _ensure_schema(conn, CURRENT, month)
+    return CURRENT
+
+
+def attach_window(conn: sqlite3.Connection, since: datetime, until: Optional[datetime] = None) -> List[str]:
+    """Expose the shards covering [since, until] as a TEMP VIEW named analytics
+
+    Only months that overlap the window are attached, so time-bounded queries
+    never open older shards. Returns the months that were attached.
+    """
+    until = until or datetime.now(timezone.utc)
+    existing = set(list_months())
+    months = [month for month in months_between(since, until) if month in existing]
+    if len(months) > MAX_ATTACHED:
+        raise ValueError(f"window spans {len(months)} shards; at most {MAX_ATTACHED} can be attached")
+
+    attached = _attached(conn)
+    selects = []
+    for month in months:
+        schema = "a_" + month.replace("-", "_")
+        if schema not in attached:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shard_path(month).resolve()),))
+        # A shard the column migration has not reached yet reads as NULLs
+        present = _event_columns(conn, schema)
+        fields = ", ".join(name if name in present else f"NULL AS {name}" for name, _, _ in EVENT_FIELDS)
+        selects.append(f"SELECT {COLUMNS}, {fields} FROM {schema}.analytics")
+    if not selects:
+        # No shards yet - an empty relation with the same columns
+        columns = COLUMNS.split(", ") + EVENT_COLUMNS.split(", ")
+        selects.append("SELECT " + ", ".join(f"NULL AS {column}" for column in columns) + " WHERE 0")
+
+    conn.execute("DROP VIEW IF EXISTS temp.analytics")
+    conn.execute(f"CREATE TEMP VIEW analytics AS {' UNION ALL '.join(selects)}")
+    return months
+
+
+def seal(month: str) -> bool:
+    """Vacuum a finished month once and make its file read-only"""
+    if is_sealed(month) or month >= month_of(datetime.now(timezone.utc) - SEAL_AFTER):
+        return False
+    path = shard_path(month)
+    conn = sqlite3.connect(path)
+    try:
+        # Rollback journal mode so read-only opens never need -wal/-shm files
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    print(f"Sealed analytics shard {month}")
+    return True
+
+
+def seal_due() -> List[str]:
+    """Seal every finished month that is not sealed yet"""
+    sealed = []
+    for month in list_months():
+        try:
+            if seal(month):
+                sealed.append(month)
+        except sqlite3.Error as e:
+            # Busy with a straggling writer; the next run picks it up
+            print(f"Shard seal error ({month}): {e}")
+    return sealed
+
+
+def migrate_event_columns() -> List[str]:
+    """Add the EVENT_FIELDS columns to every shard that lacks them, unsealing sealed ones briefly"""
+    migrated = []
+    for month in list_months():
+        path = shard_path(month)
+        sealed = is_sealed(month)
+        try:
+            conn = sqlite3.connect(f"file:{path.resolve()}?mode=ro", uri=True)
+            try:
+                if _event_columns(conn, "main") == {name for name, _, _ in EVENT_FIELDS}:
+                    continue
+            finally:
+                conn.close()
+
+            if sealed:
+                path.chmod(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+            try:
+                conn = sqlite3.connect(path)
+                try:
+                    _ensure_event_columns(conn, "main")
+                    conn.commit()
+                finally:
+                    conn.close()
+            finally:
+                if sealed:
+                    path.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            migrated.append(month)
+            print(f"Added event columns to analytics shard {month}")
+        except sqlite3.Error as e:
+            # Another worker is migrating the same shard; whichever finishes first wins
+            print(f"Shard column migration error ({month}): {e}")
+    return migrated
+
+
+def drop(month: str):
+    """Delete a month of raw events"""
+    if not MONTH.match(month):
+        raise ValueError(f"not a month: {month}")
+    if month == month_of(datetime.now(timezone.utc)):
+        raise ValueError("refusing to drop the shard currently being written")
+    path = shard_path(month)
+    with _ready_lock:
+        _ready.discard(month)
+    for stale in (path, Path(f"{path}-wal"), Path(f"{path}-shm"), Path(f"{path}-journal")):
+        stale.unlink(missing_ok=True)
+
+
+def migrate_legacy(conn: sqlite3.Connection):
+    """Move rows from the old single analytics table in quiz.db into monthly shards"""
+    legacy = conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name = 'analytics'"
+    ).fetchone()
+    if not legacy:
+        return
+
+    months = [row[0] for row in conn.execute(
+        "SELECT DISTINCT strftime('%Y-%m', created_at) FROM main.analytics WHERE created_at IS NOT NULL"
+    ).fetchall()]
+    for month in months:
+        SHARD_DIR.mkdir(parents=True, exist_ok=True)
+        schema = "legacy_" + month.replace("-", "_")
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shard_path(month).resolve()),))
+        try:
+            _ensure_schema(conn, schema, month)
+            # IMMEDIATE serializes workers starting together; the loser finds nothing left
+            conn.execute("BEGIN IMMEDIATE")
+            moved = conn.execute(f'''
+                INSERT INTO {schema}.analytics (event_type, session_id, event_data, ip_address, user_agent, created_at)
+                SELECT event_type, session_id, event_data, ip_address, user_agent, created_at
+                FROM main.analytics WHERE strftime('%Y-%m', created_at) = ?
+                ORDER BY id
+            ''', (month,)).rowcount
+            conn.execute("DELETE FROM main.analytics WHERE strftime('%Y-%m', created_at) = ?", (month,))
+            conn.commit()
+            if moved:
+                print(f"Moved {moved} analytics events into shard {month}")
+        finally:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+    # Rows without a timestamp cannot be placed in a month
+    leftover = conn.execute("SELECT COUNT(*) FROM main.analytics").fetchone()[0]
+    if leftover:
+        print(f"Keeping legacy analytics table: {leftover} rows without created_at")
+        return
+    conn.execute("DROP TABLE IF EXISTS main.analytics")
+    conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage monthly analytics shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show shards, sizes and whether they are sealed")
+    commands.add_parser("seal", help="Vacuum and seal finished months")
+    commands.add_parser("migrate", help="Add the indexed event_data columns to every shard")
+    drop_parser = commands.add_parser("drop", help="Delete one month of raw events")
+    drop_parser.add_argument("month", help="YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for month in list_months():
+            size_kb = shard_path(month).stat().st_size / 1024
+            print(f"{month}  {size_kb:10.1f} KB  {'sealed' if is_sealed(month) else 'open'}")
+    elif args.command == "seal":
+        print(f"Sealed: {', '.join(seal_due()) or 'nothing due'}")
+    elif args.command == "migrate":
+        print(f"Migrated: {', '.join(migrate_event_columns()) or 'nothing to do'}")
+    elif args.command == "drop":
+        drop(args.month)
+        print(f"Dropped {args.month}")
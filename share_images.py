@@ -0,0 +1,216 @@
+"""
+Open Graph share images
+Server-rendered 1200x630 cards per archetype, optionally with the score
+radar drawn by createRadarChart on the results page. Images are keyed by a
+hash of everything that affects the pixels, cached in memory and under
+data/og/, and rendered in a small process pool so crawler bursts cannot
+tie up the event loop. Pool workers start from a forkserver (spawn where
+there is none), never a fork of the threaded web process.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from pathlib import Path
+from typing import Dict, Optional
+
+from cache import LRUCache
+
+# PNG needs cairosvg and the cairo system library; SVG always works
+try:
+    import cairosvg
+except (ImportError, OSError):
+    cairosvg = None
+
+OG_DIR = Path(os.getenv("OG_IMAGE_DIR", "data/og"))
+# Each worker holds its own cairo renderer (~50MB); two at most keeps a 512MB VM safe
+MAX_RENDER_WORKERS = 2
+RENDER_WORKERS = max(1, min(int(os.getenv("OG_RENDER_WORKERS", "1")), os.cpu_count() or 1, MAX_RENDER_WORKERS))
+
+# Bump when the drawing code changes so every cached image is re-rendered
+RENDERER_VERSION = 1
+
+WIDTH, HEIGHT = 1200, 630
+MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+DIGEST = re.compile(r"^[0-9a-f]{16}$")
+
+IMAGES = LRUCache("og_images", maxsize=int(os.getenv("OG_IMAGE_CACHE_SIZE", "128")))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def default_format() -> str:
+    return "png" if cairosvg else "svg"
+
+
+def available(fmt: str) -> bool:
+    return fmt == "svg" or (fmt == "png" and cairosvg is not None)
+
+
+def image_spec(archetype_key: str, archetypes: Dict[str, Dict], scores: Optional[Dict[str, int]] = None) -> Dict:
+    """Everything the renderer draws, in canonical form"""
+    archetype = archetypes[archetype_key]
+    spec = {
+        "version": RENDERER_VERSION,
+        "archetype": archetype_key,
+        "name": archetype["name"],
+        "description": archetype["description"],
+        "icon": archetype.get("icon", ""),
+        "color": archetype.get("color", "#667eea"),
+    }
+    if scores is not None:
+        spec["radar"] = [
+            [key, data["name"], data.get("color", "#667eea"), int(scores.get(key, 0))]
+            for key, data in archetypes.items()
+        ]
+    return spec
+
+
+def digest(spec: Dict) -> str:
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _radar_svg(radar, cx: float, cy: float, radius: float) -> str:
+    parts = []
+    for ring in range(1, 6):
+        parts.append(f'<circle cx="{cx}" cy="{cy}" r="{radius * ring / 5:.1f}" fill="none" stroke="#e5e7eb" stroke-width="1"/>')
+
+    step = 2 * math.pi / len(radar)
+    points = []
+    for i, (_, name, color, score) in enumerate(radar):
+        angle = i * step - math.pi / 2
+        x, y = cx + math.cos(angle) * radius, cy + math.sin(angle) * radius
+        parts.append(f'<line x1="{cx}" y1="{cy}" x2="{x:.1f}" y2="{y:.1f}" stroke="#d1d5db" stroke-width="1"/>')
+
+        value = min(score / 10, 1) * radius
+        points.append((cx + math.cos(angle) * value, cy + math.sin(angle) * value, color, score))
+
+        label_x, label_y = cx + math.cos(angle) * (radius + 34), cy + math.sin(angle) * (radius + 34)
+        short_name = name.split(" ")[1] if " " in name else name
+        parts.append(f'<text x="{label_x:.1f}" y="{label_y:.1f}" font-size="15" font-weight="600" fill="#374151" '
+                     f'text-anchor="middle" dominant-baseline="middle">{escape(short_name)}</text>')
+
+    outline = " ".join(f"{x:.1f},{y:.1f}" for x, y, _, _ in points)
+    parts.append(f'<polygon points="{outline}" fill="rgba(102,126,234,0.22)" stroke="#667eea" stroke-width="3" '
+                 f'stroke-linejoin="round"/>')
+    for x, y, color, score in points:
+        if score >= 1:
+            parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="6" fill="{escape(color)}" stroke="#ffffff" stroke-width="2"/>')
+    return "".join(parts)
+
+
+def render_svg(spec: Dict) -> str:
+    """Draw the share card as an SVG document"""
+    has_radar = "radar" in spec
+    text_width = 34 if has_radar else 52
+    lines = textwrap.wrap(spec["description"], text_width)
+    if len(lines) > 5:
+        lines = lines[:5]
+        lines[-1] = lines[-1].rstrip(".,;") + "…"
+
+    description = "".join(
+        f'<tspan x="90" dy="{0 if i == 0 else 38}">{escape(line)}</tspan>' for i, line in enumerate(lines)
+    )
+    radar = _radar_svg(spec["radar"], 880, 330, 180) if has_radar else ""
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}">'
+        '<defs><linearGradient id="bg" x1="0" y1="0" x2="1" y2="1">'
+        '<stop offset="0" stop-color="#667eea"/><stop offset="1" stop-color="#764ba2"/>'
+        '</linearGradient></defs>'
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="url(#bg)"/>'
+        f'<rect x="40" y="40" width="{WIDTH - 80}" height="{HEIGHT - 80}" rx="28" fill="#ffffff"/>'
+        f'<rect x="40" y="40" width="12" height="{HEIGHT - 80}" rx="6" fill="{escape(spec["color"])}"/>'
+        '<g font-family="Inter, -apple-system, \'Segoe UI\', Helvetica, Arial, sans-serif">'
+        '<text x="90" y="110" font-size="26" font-weight="600" fill="#6b7280">My AI Archetype</text>'
+        f'<text x="90" y="200" font-size="72">{escape(spec["icon"])}</text>'
+        f'<text x="190" y="195" font-size="56" font-weight="700" fill="#1f2937">{escape(spec["name"])}</text>'
+        f'<text x="90" y="280" font-size="28" fill="#374151">{description}</text>'
+        '<text x="90" y="550" font-size="24" font-weight="600" fill="#667eea">Discover yours at aiarchetypes.acceleratinghumans.com</text>'
+        f'{radar}'
+        '</g></svg>'
+    )
+
+
+def render(spec: Dict, fmt: str) -> bytes:
+    """Render one image; runs in a pool worker"""
+    svg = render_svg(spec).encode()
+    if fmt == "png":
+        return cairosvg.svg2png(bytestring=svg, output_width=WIDTH, output_height=HEIGHT)
+    return svg
+
+
+def _start_method() -> str:
+    # Forking a process that already runs threads (to_thread workers, the
+    # writer client) can copy a held lock into the child and hang it
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                    mp_context=multiprocessing.get_context(_start_method()))
+    return _pool
+
+
+def shutdown():
+    """Stop the render pool"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def cached(image_digest: str, fmt: str) -> Optional[bytes]:
+    """Previously rendered image bytes for a digest, from memory or disk"""
+    if not DIGEST.match(image_digest) or fmt not in MEDIA_TYPES:
+        return None
+    key = f"{image_digest}.{fmt}"
+    image = IMAGES.get(key)
+    if image is not None:
+        return image
+    try:
+        image = await asyncio.get_running_loop().run_in_executor(None, (OG_DIR / key).read_bytes)
+    except FileNotFoundError:
+        return None
+    IMAGES.put(key, image)
+    return image
+
+
+async def get_image(spec: Dict, fmt: str) -> bytes:
+    """Image bytes for a spec: memory, then disk, then a single pooled render per key"""
+    image_digest = digest(spec)
+    image = await cached(image_digest, fmt)
+    if image is not None:
+        return image
+
+    key = f"{image_digest}.{fmt}"
+    # Concurrent requests for the same key share one render
+    pending = _inflight.get(key)
+    if pending is None:
+        pending = _inflight[key] = asyncio.ensure_future(_render_and_store(spec, fmt, key))
+        pending.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(pending)
+
+
+async def _render_and_store(spec: Dict, fmt: str, key: str) -> bytes:
+    image = await asyncio.get_running_loop().run_in_executor(_get_pool(), render, spec, fmt)
+    try:
+        OG_DIR.mkdir(parents=True, exist_ok=True)
+        partial = OG_DIR / f"{key}.{os.getpid()}.tmp"
+        partial.write_bytes(image)
+        partial.replace(OG_DIR / key)
+    except OSError as e:
+        print(f"Share image cache write error: {e}")
+    IMAGES.put(key, image)
+    return image
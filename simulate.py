@@ -0,0 +1,207 @@
+"""
+Monte Carlo analysis of the scoring model
+Generates synthetic response sets under a configurable answer distribution,
+scores them with the vectorized scorer (scoring.py) in a process pool and
+reports how often each archetype comes out primary or secondary, and how
+often the top score is tied (decided by answer order, not by points).
+
+    python simulate.py --quizzes 10000000
+    python simulate.py --quizzes 1000000 --position-bias 0.8 --json
+    python simulate.py --weights answer_weights.json --skip 0.1
+
+--weights is a JSON object of question id -> {answer: relative weight};
+answers not listed keep weight 1, and "*" applies to every question.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import scoring
+from quiz_data import QUIZ_DATA
+
+CHUNK_SIZE = 250_000
+
+_scorer: Optional[scoring.Scorer] = None
+
+
+def get_scorer() -> scoring.Scorer:
+    global _scorer
+    if _scorer is None:
+        _scorer = scoring.Scorer(QUIZ_DATA)
+    return _scorer
+
+
+def question_outcomes(question: Dict, weights: Dict[str, Dict[str, float]], position_bias: float,
+                      max_choices: int, skip: float, offset: int, never: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Every way to answer one question: cumulative probability, points per archetype, first pick per archetype
+
+    A respondent picks 1..max_choices answers (equally likely counts), each
+    drawn without replacement in proportion to its weight.
+    """
+    scorer = get_scorer()
+    k = len(scorer.archetypes)
+    overrides = {**weights.get("*", {}), **weights.get(str(question["id"]), {})}
+    answers = {}
+    for position, answer in enumerate(question["answers"]):
+        weight = float(overrides.get(answer, 1)) * position_bias ** position
+        if weight > 0:
+            answers[answer] = weight
+
+    probabilities, points, firsts = [skip], [np.zeros(k, dtype=np.int32)], [np.full(k, never, dtype=np.int32)]
+    counts = range(1, min(max_choices, len(answers)) + 1)
+    for count in counts:
+        for picks in permutations(answers, count):
+            probability, remaining = (1 - skip) / len(counts), sum(answers.values())
+            row_points, row_firsts = np.zeros(k, dtype=np.int32), np.full(k, never, dtype=np.int32)
+            for position, answer in enumerate(picks):
+                probability *= answers[answer] / remaining
+                remaining -= answers[answer]
+                slot = scorer.slots.get((question["id"], answer))
+                if slot is not None:
+                    archetype = scorer.slot_archetype[slot]
+                    row_points[archetype] += scorer.points[min(position, 1), slot]
+                    row_firsts[archetype] = min(row_firsts[archetype], offset + position)
+            probabilities.append(probability)
+            points.append(row_points)
+            firsts.append(row_firsts)
+
+    cumulative = np.cumsum(probabilities)
+    cumulative /= cumulative[-1]
+    return cumulative, np.array(points), np.array(firsts)
+
+
+def answer_plan(weights: Dict[str, Dict[str, float]], position_bias: float, max_choices: int,
+                skip: float) -> Tuple[List, int]:
+    """Outcome tables for every scored question in quiz order, and the "never scored" pick number"""
+    scorer = get_scorer()
+    questions = [question for question in QUIZ_DATA["questions"] if question["id"] not in scorer.demographic]
+    never = len(questions) * max_choices
+    return [question_outcomes(question, weights, position_bias, max_choices, skip, i * max_choices, never)
+            for i, question in enumerate(questions)], never
+
+
+def simulate_chunk(n: int, seed, plan: List, never: int) -> Dict[str, np.ndarray]:
+    """Generate and score n quizzes; returns count arrays that add up across chunks"""
+    scorer = get_scorer()
+    rng = np.random.default_rng(seed)
+    k = len(scorer.archetypes)
+
+    # One uniform draw per question picks a whole answer (skip, 1st, 2nd, ... choice)
+    scores = np.zeros((n, k), dtype=np.int32)
+    first = np.full((n, k), never, dtype=np.int32)
+    for cumulative, points, firsts in plan:
+        outcome = np.searchsorted(cumulative, rng.random(n), side="right")
+        np.minimum(outcome, len(cumulative) - 1, out=outcome)
+        scores += points[outcome]
+        np.minimum(first, firsts[outcome], out=first)
+
+    primary, secondary = scorer.classify(scores, first, never)
+    scored = first < never
+    ranked = np.where(scored, scores, np.iinfo(np.int32).min)
+    tied = scored.any(axis=1) & ((ranked == ranked.max(axis=1, keepdims=True)).sum(axis=1) > 1)
+    return {
+        "quizzes": np.array(n),
+        "primary": np.bincount(primary, minlength=k),
+        "secondary": np.bincount(secondary + 1, minlength=k + 1),
+        "tied": np.array(tied.sum()),
+        "tie_winners": np.bincount(primary[tied], minlength=k),
+        "unscored": np.array((~scored.any(axis=1)).sum()),
+    }
+
+
+def run(quizzes: int, workers: int, weights: Dict, position_bias: float = 1.0, max_choices: int = 3,
+        skip: float = 0.0, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Simulate quizzes in CHUNK_SIZE pieces across a process pool and add up the counts"""
+    plan, never = answer_plan(weights, position_bias, max_choices, skip)
+    sizes = [min(CHUNK_SIZE, quizzes - start) for start in range(0, quizzes, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(size, chunk_seed, plan, never) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers <= 1 or len(jobs) == 1:
+        parts = [simulate_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(simulate_chunk, *zip(*jobs)))
+
+    totals = parts[0]
+    for part in parts[1:]:
+        for key in totals:
+            totals[key] = totals[key] + part[key]
+    return totals
+
+
+def report(totals: Dict[str, np.ndarray], elapsed: float, workers: int) -> Dict:
+    """Rates per archetype; an even split would give every archetype 1/11 of primaries"""
+    scorer = get_scorer()
+    quizzes = int(totals["quizzes"])
+    tied = int(totals["tied"])
+    even = 1 / len(scorer.archetypes)
+    return {
+        "quizzes": quizzes,
+        "seconds": round(elapsed, 2),
+        "workers": workers,
+        "tie_rate": tied / quizzes,
+        "no_secondary_rate": int(totals["secondary"][0]) / quizzes,
+        "unscored_rate": int(totals["unscored"]) / quizzes,
+        "archetypes": {
+            key: {
+                "name": name,
+                "primary_rate": int(totals["primary"][i]) / quizzes,
+                "secondary_rate": int(totals["secondary"][i + 1]) / quizzes,
+                "vs_even": int(totals["primary"][i]) / quizzes / even,
+                "tie_win_share": int(totals["tie_winners"][i]) / tied if tied else 0.0,
+            }
+            for i, (key, name) in enumerate(zip(scorer.archetypes, scorer.names))
+        },
+    }
+
+
+def print_report(summary: Dict):
+    quizzes, seconds = summary["quizzes"], summary["seconds"]
+    print(f"Simulated {quizzes:,} quizzes in {seconds:.2f}s "
+          f"({quizzes / max(seconds, 1e-9) / 1e6:.1f}M/s, {summary['workers']} workers)\n")
+    print(f"{'Archetype':<28} {'Primary':>8} {'vs even':>8} {'Secondary':>10} {'Wins ties':>10}")
+    rows = sorted(summary["archetypes"].values(), key=lambda row: -row["primary_rate"])
+    for row in rows:
+        print(f"{row['name']:<28} {row['primary_rate']:>8.2%} {row['vs_even']:>7.2f}x "
+              f"{row['secondary_rate']:>10.2%} {row['tie_win_share']:>10.2%}")
+    print(f"\nTied top score: {summary['tie_rate']:.2%}   No secondary: {summary['no_secondary_rate']:.2%}   "
+          f"No scored answers: {summary['unscored_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo bias analysis of the archetype scoring model")
+    parser.add_argument("--quizzes", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--weights", help="JSON file of question id -> {answer: weight}")
+    parser.add_argument("--position-bias", type=float, default=1.0,
+                        help="weight multiplier per answer position (<1 favours earlier answers)")
+    parser.add_argument("--max-choices", type=int, default=3, help="choices per question, 1 to this many")
+    parser.add_argument("--skip", type=float, default=0.0, help="probability of leaving a question unanswered")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.quizzes < 1 or args.max_choices < 1 or not 0 <= args.skip < 1 or args.position_bias <= 0:
+        parser.error("need --quizzes >= 1, --max-choices >= 1, 0 <= --skip < 1 and --position-bias > 0")
+    weights = {}
+    if args.weights:
+        with open(args.weights) as f:
+            weights = json.load(f)
+
+    started = perf_counter()
+    totals = run(args.quizzes, args.workers, weights, args.position_bias, args.max_choices, args.skip, args.seed)
+    summary = report(totals, perf_counter() - started, args.workers)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(summary)
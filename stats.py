@@ -0,0 +1,150 @@
+"""
+Shared quiz statistics for /summary and /api/stats
+One grouped scan of results (database.Repository.results_breakdown) is
+folded into totals, a zero-filled archetype distribution, role and daily
+counts. The snapshot is cached as a single object for STATS_CACHE_TTL
+seconds, and concurrent misses share one computation.
+
+Per-answer statistics (/api/stats/answers) are indexed aggregates over
+response_items (see items.py), cached per question for the same TTL, as
+is the funnel report built from the funnel.py rollups.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import funnel
+from cache import LRUCache
+
+STATS_TTL = float(os.getenv("STATS_CACHE_TTL", "30"))
+EVENT_DAYS = 7
+
+SNAPSHOTS = LRUCache("stats", maxsize=1, ttl=STATS_TTL)
+ANSWER_STATS = LRUCache("answer_stats", maxsize=64, ttl=STATS_TTL)
+FUNNEL_STATS = LRUCache("funnel_stats", maxsize=1, ttl=STATS_TTL)
+
+_inflight: Optional[asyncio.Future] = None
+
+
+def build(rows: List[Tuple], events: Dict[str, int], archetypes: Dict[str, Dict]) -> Dict[str, Any]:
+    """Fold breakdown rows into the snapshot both endpoints render"""
+    total = recent = timed = 0
+    time_sum = 0.0
+    counts: Dict[str, int] = {}
+    names: Dict[str, str] = {}
+    roles: Dict[str, int] = {}
+    daily: Dict[str, int] = {}
+
+    for archetype, name, role, day, count, recent_count, seconds, timed_count in rows:
+        total += count
+        recent += recent_count or 0
+        time_sum += seconds or 0
+        timed += timed_count
+        counts[archetype] = counts.get(archetype, 0) + count
+        names.setdefault(archetype, name)
+        if role is not None:
+            roles[role] = roles.get(role, 0) + count
+        if day is not None:
+            daily[day] = daily.get(day, 0) + count
+
+    # Every archetype in the quiz is listed, including ones nobody has yet
+    keys = list(archetypes) + [key for key in counts if key not in archetypes]
+    distribution = [
+        {
+            "archetype": key,
+            "name": names.get(key) or archetypes[key]["name"],
+            "count": counts.get(key, 0),
+            "percentage": round(counts.get(key, 0) * 100.0 / total, 1) if total > 0 else 0.0,
+        }
+        for key in keys
+    ]
+    distribution.sort(key=lambda item: (-item["count"], item["name"]))
+
+    return {
+        "total": total,
+        "recent": recent,
+        "avg_time": time_sum / timed if timed else 0,
+        "archetype_count": len(archetypes),
+        "distribution": distribution,
+        "roles": dict(sorted(roles.items(), key=lambda item: (-item[1], item[0]))),
+        "daily": dict(sorted(daily.items())),
+        "events": events,
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+async def snapshot(repo, archetypes: Dict[str, Dict]) -> Dict[str, Any]:
+    """The current stats snapshot, from cache or one shared computation"""
+    global _inflight
+    cached = SNAPSHOTS.get("snapshot")
+    if cached is not None:
+        return cached
+
+    if _inflight is None:
+        _inflight = asyncio.ensure_future(_compute(repo, archetypes))
+
+        def _done(_):
+            global _inflight
+            _inflight = None
+
+        _inflight.add_done_callback(_done)
+    return await asyncio.shield(_inflight)
+
+
+async def refresh(repo, archetypes: Dict[str, Dict]) -> Dict[str, Any]:
+    """Recompute the snapshot ahead of its expiry, so requests keep hitting the cache"""
+    return await _compute(repo, archetypes)
+
+
+async def _compute(repo, archetypes: Dict[str, Dict]) -> Dict[str, Any]:
+    rows = await repo.results_breakdown()
+    events = await repo.event_counts(EVENT_DAYS)
+    result = build(rows, events, archetypes)
+    SNAPSHOTS.put("snapshot", result)
+    return result
+
+
+def build_answers(rows: List[Tuple], questions: List[Dict]) -> Dict[str, Any]:
+    """Fold (question_id, choice, count, first choice count, points) rows into per-question answer stats"""
+    picks = {(question_id, choice): (count, first, points) for question_id, choice, count, first, points in rows}
+    result = []
+    for question in questions:
+        respondents = sum(picks.get((question["id"], letter), (0, 0, 0))[1] for letter in question["answers"])
+        answers = []
+        for letter, text in question["answers"].items():
+            count, first, points = picks.get((question["id"], letter), (0, 0, 0))
+            answers.append({
+                "answer": letter,
+                "text": text,
+                "count": count,
+                "first_choice": first,
+                "points": points,
+                "share": round(count * 100.0 / respondents, 1) if respondents else 0.0,
+                "first_choice_share": round(first * 100.0 / respondents, 1) if respondents else 0.0,
+            })
+        result.append({"question_id": question["id"], "question": question["question"],
+                       "respondents": respondents, "answers": answers})
+    return {"questions": result, "updated_at": datetime.now().isoformat()}
+
+
+async def answers(repo, quiz: Dict[str, Any], question_id: Optional[int] = None) -> Dict[str, Any]:
+    """Answer stats for one question, or every question when question_id is None"""
+    cached = ANSWER_STATS.get(question_id)
+    if cached is not None:
+        return cached
+    questions = [question for question in quiz["questions"] if question_id in (None, question["id"])]
+    result = build_answers(await repo.answer_counts(question_id), questions)
+    ANSWER_STATS.put(question_id, result)
+    return result
+
+
+async def funnel_report(repo, quiz: Dict[str, Any]) -> Dict[str, Any]:
+    """Quiz funnel (stages, per-question reach, drop-off and dwell) from the rollup tables"""
+    cached = FUNNEL_STATS.get("funnel")
+    if cached is not None:
+        return cached
+    result = funnel.report(await repo.funnel_rollup(), quiz)
+    FUNNEL_STATS.put("funnel", result)
+    return result
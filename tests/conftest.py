@@ -0,0 +1,34 @@
+"""
+The app against a temporary SQLite database, without its lifespan (no
+background jobs), with fresh caches and rate limits no test reaches
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import database
+import main
+import ratelimit
+import shards
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_DIR", tmp_path / "analytics")
+    monkeypatch.setattr(shards, "_ready", set())
+    repo = database.SQLiteRepository(tmp_path / "quiz.db")
+    asyncio.run(repo.init())
+    monkeypatch.setattr(main, "repo", repo)
+    return repo
+
+
+@pytest.fixture
+def client(repo, monkeypatch):
+    for path, (limiter, body) in list(ratelimit.ROUTE_LIMITERS.items()):
+        monkeypatch.setitem(ratelimit.ROUTE_LIMITERS, path, (ratelimit.TokenBucketLimiter(path, 0, 1000), body))
+    for named in cache.CACHES.values():
+        named.clear()
+    return TestClient(main.app)
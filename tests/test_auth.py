@@ -0,0 +1,75 @@
+"""
+Share tokens verify only untampered, under the quiz version they were
+signed for; deployments refuse to start without a real SECRET_KEY
+"""
+
+import base64
+import importlib
+import uuid
+
+import pytest
+
+import auth
+
+QUIZ_VERSION = "2.0"
+
+
+def token_bytes(token: str) -> bytearray:
+    return bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+
+
+def encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode()
+
+
+def test_token_verifies():
+    session_id = str(uuid.uuid4())
+    token = auth.share_token(session_id, 3, None, QUIZ_VERSION)
+
+    assert auth.read_share_token(token, QUIZ_VERSION) == auth.ShareToken(session_id, 3, None, True)
+    assert len(token) <= 42
+
+
+@pytest.mark.parametrize("offset", [1, 2, 5, -1])
+def test_tampered_token_does_not_verify(offset):
+    session_id = str(uuid.uuid4())
+    raw = token_bytes(auth.share_token(session_id, 3, 5, QUIZ_VERSION))
+    raw[offset] ^= 0x01
+
+    read = auth.read_share_token(encode(raw), QUIZ_VERSION)
+    assert read is not None and not read.verified
+
+
+def test_token_expires_with_the_quiz_version():
+    token = auth.share_token(str(uuid.uuid4()), 3, 5, QUIZ_VERSION)
+    read = auth.read_share_token(token, "2.1")
+    # Still usable for a session lookup, not for rendering the archetypes it names
+    assert read is not None and not read.verified
+
+
+@pytest.mark.parametrize("token", ["", "not a token", "AAAA", encode(b"\x02" + bytes(auth.SHARE_TOKEN_BYTES - 1))])
+def test_malformed_tokens_are_rejected(token):
+    assert auth.read_share_token(token, QUIZ_VERSION) is None
+
+
+def test_missing_secret_key_fails_a_deployment(monkeypatch, capsys):
+    monkeypatch.setattr(auth, "SECRET_KEY", "")
+    monkeypatch.setattr(auth, "DEPLOYED", False)
+    auth.check_secret_key()
+    assert "SECRET_KEY" in capsys.readouterr().out
+
+    monkeypatch.setattr(auth, "DEPLOYED", True)
+    with pytest.raises(RuntimeError):
+        auth.check_secret_key()
+
+    monkeypatch.setattr(auth, "SECRET_KEY", "a-real-key")
+    auth.check_secret_key()
+
+
+def test_placeholder_secret_key_counts_as_unset(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "your-secret-key-here")
+    try:
+        assert importlib.reload(auth).SECRET_KEY == ""
+    finally:
+        monkeypatch.undo()
+        importlib.reload(auth)
@@ -0,0 +1,37 @@
+"""
+Oversized request bodies are refused with 413 before any JSON parsing,
+whether announced by Content-Length or sent chunked
+"""
+
+import bodylimit
+
+LIMIT = bodylimit.ROUTE_MAX_BYTES["/api/analytics"]
+
+
+def chunks(size: int, chunk_size: int = 1024):
+    body = b'{"event_type": "page_view", "data": {"padding": "' + b"x" * size + b'"}}'
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def test_content_length_over_the_route_limit(client):
+    response = client.post("/api/analytics", content=b"x" * (LIMIT + 1),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_chunked_body_over_the_route_limit(client):
+    # No Content-Length: counted as it arrives
+    response = client.post("/api/analytics", content=chunks(LIMIT), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_bodies_within_the_limit_pass(client):
+    response = client.post("/api/analytics", content=b"".join(chunks(LIMIT // 2)),
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+
+
+def test_other_routes_use_the_default_limit(client):
+    response = client.post("/api/unknown", content=b"x" * (bodylimit.DEFAULT_MAX_BYTES + 1))
+    assert response.status_code == 413
@@ -0,0 +1,79 @@
+"""
+Binary records decode to the responses and scores they were built from
+Each response set is encoded, decoded and scored again, and must score
+exactly like the JSON it came from.
+"""
+
+import json
+import random
+
+import pytest
+
+import codec
+import scoring
+from quiz_data import QUIZ_DATA
+
+CODEC = codec.Codec(QUIZ_DATA)
+SCORER = scoring.Scorer(QUIZ_DATA)
+
+
+def response_sets(count: int, seed: int = 7) -> list:
+    """Canonical response sets with random first and additional choices, some questions left out"""
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        responses = {}
+        for question in QUIZ_DATA["questions"]:
+            if rng.random() < 0.1:
+                continue
+            answers = list(question["answers"])
+            primary = rng.choice(answers)
+            others = [answer for answer in answers if answer != primary]
+            secondary = sorted(rng.sample(others, rng.randint(0, 2)))
+            responses[str(question["id"])] = {"primary": primary, "secondary": secondary}
+        sets.append(responses)
+    return sets
+
+
+def test_responses_round_trip_and_score_the_same():
+    sets = response_sets(200)
+    decoded = [CODEC.decode_responses(CODEC.encode_responses(json.loads(json.dumps(responses))))
+               for responses in sets]
+
+    assert decoded == sets
+    assert SCORER.score_batch(decoded) == SCORER.score_batch(sets)
+
+
+def test_scores_round_trip():
+    for result in SCORER.score_batch(response_sets(50, seed=11)):
+        record = CODEC.encode_scores(result["scores"], result["secondary_archetype"])
+        assert len(record) == CODEC.scores_size
+        assert CODEC.decode_scores(record) == {
+            "scores": {key: score for key, score in result["scores"].items() if score},
+            "secondary_archetype": result["secondary_archetype"],
+        }
+
+
+def test_convert_row_drops_json_only_when_it_round_trips():
+    responses = response_sets(1)[0]
+    result = SCORER.score_batch([responses])[0]
+    scores_json = json.dumps({"scores": result["scores"], "secondary_archetype": result["secondary_archetype"]})
+
+    responses_bin, scores_bin, keep_responses, keep_scores = codec.convert_row(CODEC, json.dumps(responses), scores_json)
+    assert (keep_responses, keep_scores) == ("", "")
+    assert CODEC.decode_responses(responses_bin) == responses
+    assert CODEC.decode_scores(scores_bin)["scores"] == {k: v for k, v in result["scores"].items() if v}
+
+    # An answer the quiz does not know is kept as JSON
+    unknown = dict(responses, **{"2": {"primary": "Z", "secondary": []}})
+    _, _, keep_responses, _ = codec.convert_row(CODEC, json.dumps(unknown), scores_json)
+    assert keep_responses == json.dumps(unknown)
+
+
+def test_unsupported_records_are_rejected():
+    with pytest.raises(ValueError):
+        CODEC.decode_responses(b"\x02" + bytes(CODEC.response_size - 1))
+    with pytest.raises(ValueError):
+        CODEC.decode_scores(b"\x01")
+    with pytest.raises(ValueError):
+        CODEC.encode_responses({"2": "Z"})
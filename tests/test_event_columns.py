@@ -0,0 +1,121 @@
+"""
+Promoted event_data keys: shards carry the generated columns and their
+indexes, older shards are migrated (sealed ones included) and the export
+filters on them
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import export
+import retention
+import shards
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+LAST_MONTH = (datetime.now(timezone.utc).replace(day=1) - timedelta(days=1)).replace(day=1, hour=12)
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_DIR", tmp_path / "analytics")
+    monkeypatch.setattr(shards, "_ready", set())
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", tmp_path / "archive")
+
+
+def make_shard(moment: datetime, events, migrated: bool = True) -> str:
+    """A shard with (event type, event_data) rows; unmigrated ones have the old schema only"""
+    month = shards.month_of(moment)
+    path = shards.shard_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        if migrated:
+            shards._ensure_schema(conn, "main", month)
+        else:
+            for statement in shards.SCHEMA:
+                conn.execute(statement.format(schema="main"))
+        conn.executemany("INSERT INTO analytics (event_type, event_data, created_at) VALUES (?, ?, ?)",
+                         [(event_type, data, moment.strftime(TIME_FORMAT)) for event_type, data in events])
+        conn.commit()
+    finally:
+        conn.close()
+    return month
+
+
+def query(month: str, sql: str, parameters=()) -> list:
+    conn = sqlite3.connect(shards.shard_path(month))
+    try:
+        return conn.execute(sql, parameters).fetchall()
+    finally:
+        conn.close()
+
+
+EVENTS = [
+    ("quiz_completed", json.dumps({"archetype": "Innovator", "role": "developer", "completion_time": 95.5})),
+    ("answer_selected", json.dumps({"question_number": 4})),
+    ("page_view", json.dumps({"page": "/results"})),
+    ("page_view", "not json"),
+    ("page_view", json.dumps(["a", "list"])),
+    ("page_view", None),
+]
+
+
+def test_columns_read_their_event_data_keys():
+    month = make_shard(LAST_MONTH, EVENTS)
+    assert query(month, f"SELECT {shards.EVENT_COLUMNS} FROM analytics ORDER BY id") == [
+        ("Innovator", "developer", None, None, 95.5),
+        (None, None, None, 4, None),
+        (None, None, "/results", None, None),
+        (None, None, None, None, None),
+        (None, None, None, None, None),
+        (None, None, None, None, None),
+    ]
+
+
+@pytest.mark.parametrize("name", [name for name, _, _ in shards.EVENT_FIELDS])
+def test_filters_are_index_lookups(name):
+    month = make_shard(LAST_MONTH, EVENTS)
+    plan = " ".join(row[-1] for row in query(month, f"EXPLAIN QUERY PLAN SELECT id FROM analytics WHERE {name} = ?",
+                                              ("x",)))
+    assert f"idx_analytics_{name}" in plan
+
+
+def test_migration_adds_columns_to_old_shards_and_keeps_them_sealed():
+    month = make_shard(LAST_MONTH, EVENTS[:1], migrated=False)
+    shards.shard_path(month).chmod(0o444)
+    assert "archetype" not in {row[1] for row in query(month, "PRAGMA table_xinfo(analytics)")}
+
+    assert shards.migrate_event_columns() == [month]
+    assert shards.is_sealed(month)
+    assert query(month, "SELECT archetype, completion_time FROM analytics") == [("Innovator", 95.5)]
+    indexes = {row[0] for row in query(month, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {f"idx_analytics_{name}" for name, _, _ in shards.EVENT_FIELDS} <= indexes
+    assert shards.migrate_event_columns() == []
+
+
+def test_window_reads_unmigrated_shards_as_nulls():
+    make_shard(LAST_MONTH, EVENTS[:1], migrated=False)
+    conn = sqlite3.connect(":memory:")
+    try:
+        shards.attach_window(conn, since=LAST_MONTH)
+        assert conn.execute("SELECT event_type, archetype FROM analytics").fetchall() == [("quiz_completed", None)]
+    finally:
+        conn.close()
+
+
+def test_export_filters_live_and_archived_events():
+    make_shard(LAST_MONTH, EVENTS)
+    [event] = export.iter_events(filters={"event_type": "answer_selected", "question_number": 4})
+    assert json.loads(event["event_data"]) == {"question_number": 4}
+    assert [json.loads(event["event_data"])["archetype"]
+            for event in export.iter_events(filters={"archetype": "Innovator"})] == ["Innovator"]
+    assert list(export.iter_events(filters={"archetype": "Guardian"})) == []
+
+    # Archived rows go through the same filters as they are read
+    archived = {"event_type": "quiz_completed", "event_data": EVENTS[0][1]}
+    assert export._matches(archived, {"role": "developer"})
+    assert not export._matches(archived, {"role": "executive"})
+    assert not export._matches({"event_type": "page_view", "event_data": "not json"}, {"page": "/results"})
@@ -0,0 +1,115 @@
+"""
+Incremental funnel: runs read only events past the checkpoint, sessions
+carry over between runs, and quiet sessions are closed as abandoned at the
+furthest question they reached
+"""
+
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import funnel
+import shards
+from quiz_data import QUIZ_DATA
+
+# Events go in last month's shard, so they are in the past whatever the time
+START = (datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+         - timedelta(days=1)).replace(day=1, hour=12)
+MONTH = shards.month_of(START)
+NEVER_IDLE = 60 * 24 * 365 * 10
+
+
+def add_events(*events):
+    """(event type, attempt, seconds after START, question number or None) into the shard"""
+    path = shards.shard_path(MONTH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        shards._ensure_schema(conn, "main", MONTH)
+        conn.executemany("INSERT INTO analytics (event_type, event_data, created_at) VALUES (?, ?, ?)", [
+            (event_type,
+             json.dumps({"attempt": attempt, **({"question_number": number} if number else {})}),
+             (START + timedelta(seconds=seconds)).strftime(funnel.TIME_FORMAT))
+            for event_type, attempt, seconds, number in events
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(repo, **kwargs):
+    async def main():
+        outcome = await funnel.run(repo, QUIZ_DATA, **kwargs)
+        return outcome, await repo.funnel_rollup(), await repo.funnel_checkpoint()
+    return asyncio.run(main())
+
+
+def question_rows(rollup) -> dict:
+    """question number -> (reached, dropped, dwell count, dwell seconds)"""
+    return {row[0]: tuple(row[1:]) for row in rollup["questions"]}
+
+
+def started(attempt, seconds):
+    return ("quiz_started", attempt, seconds, None)
+
+
+def answer(attempt, seconds, number):
+    return ("answer_selected", attempt, seconds, number)
+
+
+def test_runs_resume_from_the_checkpoint(repo):
+    add_events(started("a", 0), started("b", 5), answer("a", 10, 1), answer("b", 20, 1), answer("a", 30, 2))
+    outcome, rollup, checkpoint = run(repo, chunk_size=2, idle_minutes=NEVER_IDLE)
+    assert outcome == {"events": 5, "closed": 0}
+    assert checkpoint == {MONTH: 5}
+    assert rollup["stages"] == {"started": 2}
+    assert rollup["open_sessions"] == 2
+    assert question_rows(rollup) == {1: (2, 0, 2, 25.0), 2: (1, 0, 1, 20.0)}
+
+    # Only the new events are read; session "a" continues from its stored state
+    add_events(answer("a", 60, 3), ("quiz_submitted", "a", 70, None))
+    outcome, rollup, checkpoint = run(repo, chunk_size=2, idle_minutes=NEVER_IDLE)
+    assert outcome == {"events": 2, "closed": 0}
+    assert checkpoint == {MONTH: 7}
+    assert rollup["stages"] == {"started": 2, "submitted": 1}
+    assert question_rows(rollup)[3] == (1, 0, 1, 30.0)
+
+    assert run(repo, idle_minutes=NEVER_IDLE)[0] == {"events": 0, "closed": 0}
+
+
+def test_idle_sessions_are_closed_as_abandoned(repo):
+    add_events(started("a", 0), answer("a", 10, 1), ("quiz_submitted", "a", 20, None),
+               started("b", 0), answer("b", 10, 1), answer("b", 40, 2),
+               started("c", 0))
+    outcome, rollup, _ = run(repo, idle_minutes=60)
+    assert outcome == {"events": 7, "closed": 3}
+    assert rollup["open_sessions"] == 0
+    # The submitted session is closed but not abandoned
+    assert rollup["stages"] == {"started": 3, "submitted": 1, "abandoned": 2}
+    rows = question_rows(rollup)
+    assert rows[0][1] == 1  # "c" left before any answer
+    assert rows[2][1] == 1  # "b" left at question 2
+    assert funnel.report(rollup, QUIZ_DATA)["dropped_before_first_answer"] == 1
+
+
+def test_sessions_without_a_start_are_followed_but_not_counted():
+    batch = funnel.Batch(len(QUIZ_DATA["questions"]))
+    at = START.strftime(funnel.TIME_FORMAT)
+    batch.apply((MONTH, 1, "answer_selected", None, json.dumps({"attempt": "x", "question_number": 1}),
+                 None, None, at))
+    batch.apply((MONTH, 2, "quiz_submitted", None, json.dumps({"attempt": "x"}), None, None, at))
+    changes = batch.changes()
+    assert changes["checkpoint"] == {MONTH: 2}
+    assert list(changes["sessions"]) == ["a:x"]
+    assert changes["stages"] == {} and changes["questions"] == {}
+
+
+def test_a_new_start_closes_the_previous_attempt():
+    batch = funnel.Batch(len(QUIZ_DATA["questions"]))
+    at = START.strftime(funnel.TIME_FORMAT)
+    for event_id in (1, 2):
+        batch.apply((MONTH, event_id, "quiz_started", None, None, "127.0.0.1", "pytest", at))
+    changes = batch.changes()
+    assert changes["stages"] == {"started": 2, "abandoned": 1}
+    assert changes["questions"] == {0: (0, 1, 0, 0.0)}
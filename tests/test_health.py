@@ -0,0 +1,116 @@
+"""
+Health checks: liveness never touches the database, and the readiness
+probe runs at most once per HEALTH_PROBE_TTL, shared by concurrent callers
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import health
+
+
+@pytest.fixture(autouse=True)
+def fresh_probe(monkeypatch):
+    monkeypatch.setattr(health, "_probe", None)
+    monkeypatch.setattr(health, "_probe_expires", 0.0)
+    monkeypatch.setattr(health, "_inflight", None)
+
+
+class FakeRepository:
+    name = "fake"
+
+    def __init__(self, delay: float = 0, error: Exception = None):
+        self.pings = 0
+        self.delay = delay
+        self.error = error
+
+    async def ping(self):
+        self.pings += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def pings(repo, monkeypatch):
+    """Database round trips made through the app's repository"""
+    seen = []
+    ping = repo.ping
+
+    async def counted():
+        seen.append(True)
+        await ping()
+
+    monkeypatch.setattr(repo, "ping", counted)
+    return seen
+
+
+def test_probe_is_cached_within_the_ttl(monkeypatch):
+    repo = FakeRepository()
+
+    async def main():
+        first = await health.database_probe(repo)
+        assert await health.database_probe(repo) is first
+        monkeypatch.setattr(health, "_probe_expires", 0.0)
+        return first, await health.database_probe(repo)
+
+    first, second = asyncio.run(main())
+    assert first["ok"] and second is not first
+    assert repo.pings == 2
+
+
+def test_concurrent_misses_share_one_ping():
+    repo = FakeRepository(delay=0.05)
+
+    async def main():
+        return await asyncio.gather(*(health.database_probe(repo) for _ in range(10)))
+
+    probes = asyncio.run(main())
+    assert repo.pings == 1
+    assert all(probe is probes[0] for probe in probes)
+
+
+def test_failures_and_timeouts_are_reported(monkeypatch):
+    monkeypatch.setattr(health, "PROBE_TIMEOUT", 0.01)
+    failed = asyncio.run(health.database_probe(FakeRepository(error=RuntimeError("database is locked"))))
+    assert (failed["ok"], failed["error"]) == (False, "database is locked")
+
+    monkeypatch.setattr(health, "_probe_expires", 0.0)
+    slow = asyncio.run(health.database_probe(FakeRepository(delay=1)))
+    assert (slow["ok"], slow["error"]) == (False, "no response within 0.01s")
+
+
+def test_writer_backlog_is_not_ready():
+    repo = FakeRepository()
+    repo.writer = SimpleNamespace(connected=True, pending=95, max_pending=100, dropped=SimpleNamespace(value=0))
+    report = asyncio.run(health.ready(repo))
+    assert report["database"]["ok"] and not report["ready"]
+    assert report["writer"]["pending"] == 95
+
+
+def test_liveness_never_queries_the_database(client, pings):
+    for _ in range(3):
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+    assert pings == []
+
+
+def test_readiness_and_summary_share_the_cached_probe(client, pings):
+    for path in ("/health/ready", "/health/ready", "/health"):
+        assert client.get(path).status_code == 200
+    assert client.get("/health").json()["status"] == "healthy"
+    assert pings == [True]
+
+
+def test_failing_database_is_503(client, repo, monkeypatch):
+    async def unreachable():
+        raise RuntimeError("unable to open database file")
+
+    monkeypatch.setattr(repo, "ping", unreachable)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["database"]["error"] == "unable to open database file"
+    assert client.get("/health").json() == {"status": "unhealthy", "error": "unable to open database file"}
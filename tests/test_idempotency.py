@@ -0,0 +1,52 @@
+"""
+Retries carrying the same Idempotency-Key get the original response, from
+the in-memory cache or, once evicted, rebuilt from the stored result
+"""
+
+import sqlite3
+
+import main
+
+SUBMISSION = {"responses": {"1": "A", "2": {"primary": "B", "secondary": ["C"]}, "3": "D"}, "completion_time": 4.5}
+
+
+def stored_results(repo) -> int:
+    conn = sqlite3.connect(repo.path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def submit(client, key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post("/api/submit", json=SUBMISSION, headers=headers)
+
+
+def test_retry_is_answered_from_the_cache(client, repo):
+    first = submit(client, "retry-1")
+    assert first.status_code == 200
+    again = submit(client, "retry-1")
+    assert again.json() == first.json()
+    assert stored_results(repo) == 1
+
+
+def test_retry_after_eviction_is_rebuilt_from_the_database(client, repo):
+    first = submit(client, "retry-2").json()
+    main.IDEMPOTENT_RESPONSES.clear()
+
+    again = submit(client, "retry-2").json()
+    assert again == first
+    assert stored_results(repo) == 1
+    # And cached again for the next retry
+    assert main.IDEMPOTENT_RESPONSES.get("retry-2") == first
+
+
+def test_without_a_key_every_submission_is_stored(client, repo):
+    assert submit(client).json()["session_id"] != submit(client).json()["session_id"]
+    assert stored_results(repo) == 2
+
+
+def test_overlong_key_is_rejected(client, repo):
+    assert submit(client, "k" * (main.IDEMPOTENCY_KEY_MAX_LENGTH + 1)).status_code == 400
+    assert stored_results(repo) == 0
@@ -0,0 +1,103 @@
+"""
+Response items: one weighted row per chosen answer, the resumable backfill
+of older results (JSON and binary) and the answer stats built from them
+"""
+
+import asyncio
+import copy
+import json
+import sqlite3
+import uuid
+
+import codec
+import items
+from quiz_data import QUIZ_DATA
+
+
+def result_row(responses: str = "", responses_bin: bytes = None):
+    """A result stored without response items, as before they existed"""
+    return {
+        "session_id": str(uuid.uuid4()),
+        "primary_archetype": "Innovator",
+        "archetype_name": "The Innovator",
+        "all_scores": json.dumps({"Innovator": 6}),
+        "responses": responses,
+        "responses_bin": responses_bin,
+        "role_demographic": None,
+        "completion_time": None,
+        "user_agent": "pytest",
+        "ip_address": "127.0.0.1",
+        "idempotency_key": None,
+    }
+
+
+def stored_items(repo) -> list:
+    conn = sqlite3.connect(repo.path)
+    try:
+        return conn.execute("SELECT result_id, question_id, choice, weight, is_primary FROM response_items "
+                            "ORDER BY result_id, question_id, is_primary DESC, choice").fetchall()
+    finally:
+        conn.close()
+
+
+def test_items_carry_the_points_each_choice_scored():
+    responses = {"1": "A", "2": {"primary": "B", "secondary": ["C"]}, "3": "D"}
+    assert items.response_items(QUIZ_DATA, responses) == [
+        (1, "A", 0, 1),  # demographic answers score nothing
+        (2, "B", 3, 1),
+        (2, "C", 1, 0),
+        (3, "D", 3, 1),
+    ]
+
+
+def test_per_question_weights_override_the_quiz_rules():
+    quiz = copy.deepcopy(QUIZ_DATA)
+    quiz["questions"][1]["weights"] = {"primary": 5, "secondary": 2}
+    assert items.response_items(quiz, {"2": {"primary": "B", "secondary": ["C"]}}) == [(2, "B", 5, 1), (2, "C", 2, 0)]
+
+
+def test_unknown_and_repeated_answers_are_skipped():
+    responses = {"2": {"primary": "B", "secondary": ["B", "C", "C", "Z", 7]}, "999": "A", "3": None}
+    assert items.response_items(QUIZ_DATA, responses) == [(2, "B", 3, 1), (2, "C", 1, 0)]
+
+
+def test_backfill_reads_json_and_binary_results(repo):
+    responses = {"2": {"primary": "B", "secondary": ["C"]}}
+    encoded = codec.Codec(QUIZ_DATA).encode_responses({"3": "D"})
+
+    async def check():
+        await repo.save_result(result_row(json.dumps(responses)))
+        await repo.save_result(result_row(responses_bin=encoded))
+        await repo.save_result(result_row())
+        return await items.backfill(repo, QUIZ_DATA, chunk_size=2)
+
+    assert asyncio.run(check()) == {"results": 3, "items": 3}
+    assert stored_items(repo) == [(1, 2, "B", 3, 1), (1, 2, "C", 1, 0), (2, 3, "D", 3, 1)]
+
+
+def test_backfill_resumes_where_it_stopped(repo):
+    async def check():
+        await repo.save_result(result_row(json.dumps({"2": "A"})))
+        first = await items.backfill(repo, QUIZ_DATA)
+        await repo.save_result(result_row(json.dumps({"3": "B"})))
+        return first, await items.backfill(repo, QUIZ_DATA)
+
+    assert asyncio.run(check()) == ({"results": 1, "items": 1}, {"results": 1, "items": 1})
+    assert stored_items(repo) == [(1, 2, "A", 3, 1), (2, 3, "B", 3, 1)]
+
+
+def test_answer_stats_count_every_submission(client):
+    for answer in ({"primary": "B", "secondary": ["C"]}, "B", {"primary": "C", "secondary": ["B"]}):
+        assert client.post("/api/submit", json={"responses": {"2": answer, "3": "A"}}).status_code == 200
+
+    [question] = client.get("/api/stats/answers", params={"question_id": 2}).json()["questions"]
+    answers = {answer["answer"]: answer for answer in question["answers"]}
+    assert question["respondents"] == 3
+    assert (answers["B"]["count"], answers["B"]["first_choice"], answers["B"]["points"]) == (3, 2, 7)
+    assert (answers["C"]["count"], answers["C"]["first_choice"], answers["C"]["points"]) == (2, 1, 4)
+    assert answers["A"]["count"] == 0
+    assert answers["B"]["share"] == 100.0
+
+
+def test_unknown_question_is_404(client):
+    assert client.get("/api/stats/answers", params={"question_id": 999}).status_code == 404
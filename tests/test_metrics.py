@@ -0,0 +1,59 @@
+"""
+Request metrics are labelled by route template, never by raw path, and
+excluded paths are not timed
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+
+ROUTE = "/test-metrics/items/{item_id}"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = FastAPI()
+
+    @app.get(ROUTE)
+    async def item(item_id: str):
+        return {"item_id": item_id}
+
+    @app.get("/metrics")
+    async def scrape():
+        return {}
+
+    app.add_middleware(metrics.MetricsMiddleware)
+    monkeypatch.setattr(metrics, "_app", None)
+    metrics.bind_routes(app)
+    return TestClient(app)
+
+
+def requests_total(route: str, status: int = 200) -> int:
+    per_status = metrics._request_histograms.get(route, {})
+    return per_status[status].count if status in per_status else 0
+
+
+def test_requests_are_labelled_by_route_template(client):
+    before = requests_total(ROUTE)
+    for item_id in ("a", "b", "c"):
+        assert client.get(f"/test-metrics/items/{item_id}").status_code == 200
+
+    assert requests_total(ROUTE) == before + 3
+    rendered = metrics.render()
+    assert f'route="{ROUTE}",status="200"' in rendered
+    assert "/test-metrics/items/a" not in rendered
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = requests_total(metrics.UNMATCHED_ROUTE, 404)
+    assert client.get("/test-metrics/nowhere/1").status_code == 404
+    assert client.get("/test-metrics/nowhere/2").status_code == 404
+    assert requests_total(metrics.UNMATCHED_ROUTE, 404) == before + 2
+
+
+def test_excluded_paths_are_not_timed(client):
+    before = requests_total("/metrics")
+    assert client.get("/metrics").status_code == 200
+    assert requests_total("/metrics") == before
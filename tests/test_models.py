@@ -0,0 +1,51 @@
+"""
+Submissions and score batches are validated against the quiz definition
+Anything the quiz would not produce is a 422, before scoring or storage
+see it.
+"""
+
+import pytest
+from pydantic import ValidationError
+
+from models import QuizSubmission, ScoreBatch
+
+VALID = {"1": "A", "2": {"primary": "B", "secondary": ["C"]}}
+
+INVALID = {
+    "empty responses": {"responses": {}},
+    "unknown question": {"responses": {"99": "A"}},
+    "invalid option": {"responses": {"2": "Z"}},
+    "repeated option": {"responses": {"2": {"primary": "B", "secondary": ["B"]}}},
+    "too many additional choices": {"responses": {"2": {"primary": "A", "secondary": ["B", "C", "D"]}}},
+    "extra field": {"responses": VALID, "score": 100},
+    "extra choice field": {"responses": {"2": {"primary": "A", "weight": 3}}},
+}
+
+
+def test_valid_submission_is_canonical():
+    submission = QuizSubmission(responses={"2": {"primary": "B", "secondary": ["C"]}, "1": "A"})
+    assert submission.canonical_responses() == {
+        "1": {"primary": "A", "secondary": []},
+        "2": {"primary": "B", "secondary": ["C"]},
+    }
+
+
+@pytest.mark.parametrize("body", INVALID.values(), ids=INVALID.keys())
+def test_invalid_submission_is_rejected(client, body):
+    response = client.post("/api/submit", json=body)
+    assert response.status_code == 422
+    # Locations and messages only; the payload is not echoed back
+    assert all(set(error) == {"type", "loc", "msg"} for error in response.json()["detail"])
+
+
+@pytest.mark.parametrize("body", INVALID.values(), ids=INVALID.keys())
+def test_invalid_batch_set_is_rejected(client, body):
+    batch = {"responses": [VALID, body["responses"]]}
+    batch.update({key: value for key, value in body.items() if key != "responses"})
+    assert client.post("/api/score/batch", json=batch).status_code == 422
+
+
+def test_empty_batch_is_rejected(client):
+    with pytest.raises(ValidationError):
+        ScoreBatch(responses=[])
+    assert client.post("/api/score/batch", json={"responses": []}).status_code == 422
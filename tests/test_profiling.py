@@ -0,0 +1,68 @@
+"""
+Admin-flagged requests are profiled and saved off the event loop, with
+the number of requests that overlapped them
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import auth
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(auth, "ADMIN_TOKEN", "secret")
+
+
+def scope(path: str, profile: bool):
+    headers = [(b"x-profile", b"1"), (b"x-admin-token", b"secret")] if profile else []
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "query_string": b""}
+
+
+def run_requests(requests, delay: float = 0.05):
+    """Run (path, profile) requests concurrently through the middleware"""
+    async def app(scope, receive, send):
+        await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    middleware = profiling.ProfilingMiddleware(app)
+
+    async def main():
+        await asyncio.gather(*(middleware(scope(path, profile), receive, send) for path, profile in requests))
+
+    asyncio.run(main())
+
+
+def test_profile_is_saved_off_the_loop_with_its_concurrency(monkeypatch):
+    save = profiling._save
+    threads = []
+
+    def recording_save(profiler, meta):
+        threads.append(threading.current_thread())
+        return save(profiler, meta)
+
+    monkeypatch.setattr(profiling, "_save", recording_save)
+    run_requests([("/results/a", True), ("/", False), ("/about", False)])
+
+    assert threads and threads[0] is not threading.main_thread()
+    [meta] = profiling.list_profiles()
+    assert meta["path"] == "/results/a" and meta["status"] == 200 and meta["trigger"] == "admin"
+    assert meta["concurrent_requests"] == 2
+    assert profiling.profile_path(meta["name"]) is not None
+
+
+def test_unflagged_and_excluded_requests_are_not_profiled():
+    run_requests([("/", False), ("/metrics", True), ("/admin/profiles", True)], delay=0)
+    assert profiling.list_profiles() == []
+    assert profiling._in_flight == 0
@@ -0,0 +1,89 @@
+"""
+The stats bus: deltas merged per flush, snapshots stamped with the publish
+count their query started at, and slow subscribers dropped
+"""
+
+import asyncio
+import json
+
+import pubsub
+
+
+def events(subscriber) -> list:
+    """(event, data) for every queued message"""
+    received = []
+    while not subscriber.queue.empty():
+        message = subscriber.queue.get_nowait()
+        if message is pubsub.CLOSED:
+            received.append(("closed", None))
+            continue
+        fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+        received.append((fields["event"], json.loads(fields["data"])))
+    return received
+
+
+def run(check):
+    async def main():
+        return check(pubsub.StatsBus(queue_size=4))
+    return asyncio.run(main())
+
+
+def test_deltas_are_merged_per_flush():
+    def check(bus):
+        subscriber = bus.subscribe()
+        bus.publish("Innovator", "developer")
+        bus.publish("Innovator", None)
+        bus.publish("Guardian", "developer")
+        bus.flush()
+        bus.flush()
+        return events(subscriber)
+
+    assert run(check) == [("delta", {"total": 3, "archetypes": {"Innovator": 2, "Guardian": 1},
+                                     "roles": {"developer": 2}})]
+
+
+def test_deltas_after_the_snapshot_stamp_are_replayed():
+    def check(bus):
+        subscriber = bus.subscribe()
+        bus.publish("Innovator", None)  # included in the snapshot
+        stamp = bus.published
+        bus.publish("Guardian", None)  # published while the query ran, flushed before the snapshot
+        bus.flush()
+        bus.publish("Catalyst", None)  # published while the query ran, still pending
+        bus.publish_snapshot({"total": 2}, stamp)
+        bus.flush()
+        return events(subscriber)
+
+    assert run(check) == [
+        ("delta", {"total": 2, "archetypes": {"Innovator": 1, "Guardian": 1}, "roles": {}}),
+        ("snapshot", {"total": 2}),
+        ("delta", {"total": 2, "archetypes": {"Guardian": 1, "Catalyst": 1}, "roles": {}}),
+    ]
+
+
+def test_deltas_up_to_the_stamp_are_dropped():
+    def check(bus):
+        subscriber = bus.subscribe()
+        bus.publish("Innovator", None)
+        bus.publish_snapshot({"total": 1}, bus.published)
+        bus.flush()
+        # Not replayed again by the next snapshot
+        bus.publish_snapshot({"total": 1}, 0)
+        bus.flush()
+        return events(subscriber)
+
+    assert run(check) == [("snapshot", {"total": 1}), ("snapshot", {"total": 1})]
+
+
+def test_slow_subscriber_is_dropped():
+    def check(bus):
+        slow, fast = bus.subscribe(), bus.subscribe()
+        for _ in range(5):
+            bus.publish("Innovator", None)
+            bus.flush()
+            events(fast)
+        return slow, fast, bus
+
+    slow, fast, bus = run(check)
+    assert slow.dropped and events(slow) == [("closed", None)]
+    assert bus.subscribers == {fast}
@@ -0,0 +1,65 @@
+"""
+SQLite statement instrumentation: per-statement aggregates, the slow-query
+log and EXPLAIN QUERY PLAN capture
+"""
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def conn(tmp_path):
+    database.reset_stats()
+    conn = database.connect(tmp_path / "instrumented.db")
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute("CREATE INDEX idx_items_name ON items(name)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(20)])
+    yield conn
+    conn.close()
+    database.reset_stats()
+
+
+def stats_for(prefix: str) -> dict:
+    [entry] = [entry for entry in database.query_stats() if entry["statement"].startswith(prefix)]
+    return entry
+
+
+def test_literals_and_whitespace_are_normalized():
+    assert database.normalize("SELECT * FROM items\n  WHERE id = 42 AND name = 'it''s'") == \
+        "SELECT * FROM items WHERE id = ? AND name = ?"
+
+
+def test_equivalent_statements_aggregate(conn, monkeypatch):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 10_000)
+    for item_id in (1, 2, 3):
+        conn.execute(f"SELECT name FROM items WHERE id = {item_id}").fetchall()
+    conn.execute("SELECT name FROM items WHERE name > ?", ("item 5",)).fetchall()  # item 6 to item 9
+
+    by_id = stats_for("SELECT name FROM items WHERE id")
+    assert (by_id["calls"], by_id["rows"], by_id["slow_calls"]) == (3, 3, 0)
+    assert stats_for("SELECT name FROM items WHERE name")["rows"] == 4
+    assert stats_for("INSERT INTO items")["rows"] == 20
+    assert database.slow_queries() == []
+
+
+def test_slow_statements_are_logged_with_their_plan(conn, monkeypatch):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 0)
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [("batch",)])
+    conn.execute("SELECT id FROM items WHERE name = ?", ("item 3",)).fetchall()
+
+    # Batches have no meaningful plan and stay out of the slow log
+    [entry] = database.slow_queries()
+    assert entry["statement"] == "SELECT id FROM items WHERE name = ?"
+    assert entry["rows"] == 1
+    assert any("idx_items_name" in step for step in entry["plan"])
+    assert stats_for("SELECT id FROM items")["plan"] == entry["plan"]
+
+
+def test_plans_are_captured_on_demand(conn, monkeypatch):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 10_000)
+    conn.execute("SELECT id FROM items WHERE name = ?", ("item 3",)).fetchall()
+    assert stats_for("SELECT id FROM items")["plan"] is None
+
+    database.explain_all(conn)
+    assert any("idx_items_name" in step for step in stats_for("SELECT id FROM items")["plan"])
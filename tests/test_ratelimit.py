@@ -0,0 +1,97 @@
+"""
+Token buckets: burst, refill and LRU eviction of idle clients, and the
+middleware answering 429 before a limited route reads its body
+"""
+
+import asyncio
+
+import pytest
+
+import ratelimit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "monotonic", clock)
+    return clock
+
+
+def test_burst_then_throttled(clock):
+    limiter = ratelimit.TokenBucketLimiter("/test/burst", rate=1, burst=3)
+    throttled = limiter.throttled.value
+
+    assert [limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+    assert limiter.throttled.value == throttled + 1
+    # Another client has its own bucket
+    assert limiter.allow("b")
+
+
+def test_refill(clock):
+    limiter = ratelimit.TokenBucketLimiter("/test/refill", rate=2, burst=2)
+    assert limiter.allow("a") and limiter.allow("a") and not limiter.allow("a")
+
+    clock.now += 0.25
+    assert not limiter.allow("a")
+    clock.now += 0.25
+    assert limiter.allow("a") and not limiter.allow("a")
+
+    # Refills never exceed the burst
+    clock.now += 60
+    assert [limiter.allow("a") for _ in range(3)] == [True, True, False]
+    assert limiter.retry_after() == 1
+
+
+def test_least_recently_seen_client_is_evicted(clock):
+    limiter = ratelimit.TokenBucketLimiter("/test/lru", rate=0.001, burst=1, max_clients=2)
+    assert limiter.allow("a") and limiter.allow("b")
+    assert not limiter.allow("a")  # "a" is now the most recently seen
+
+    assert limiter.allow("c")  # evicts "b"
+    assert list(limiter._buckets) == ["a", "c"]
+    # An evicted client starts again with a full bucket; a tracked one does not
+    assert limiter.allow("b")
+    assert not limiter.allow("c")
+
+
+def call(middleware, path: str, method: str = "POST", headers=(), client=("10.0.0.1", 5000)):
+    """Run one request through the middleware; returns (status, whether the body was read)"""
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers), "client": client}
+    reads, sent = [], []
+
+    async def receive():
+        reads.append(True)
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    asyncio.run(middleware(app)(scope, receive, send))
+    return sent[0]["status"], bool(reads)
+
+
+def test_middleware_throttles_before_the_body_is_read(clock):
+    limiter = ratelimit.TokenBucketLimiter("/test/route", rate=0.001, burst=1)
+    middleware = lambda app: ratelimit.RateLimitMiddleware(app, {"/test/route": (limiter, {"status": "throttled"})},
+                                                            ip_header="Fly-Client-IP")
+
+    assert call(middleware, "/test/route") == (200, True)
+    assert call(middleware, "/test/route") == (429, False)
+    # Keyed by the proxy's client header when present
+    assert call(middleware, "/test/route", headers=[(b"fly-client-ip", b"203.0.113.9")]) == (200, True)
+    # Other routes and methods are not limited
+    assert call(middleware, "/test/other") == (200, True)
+    assert call(middleware, "/test/route", method="GET") == (200, True)
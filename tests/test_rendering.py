@@ -0,0 +1,40 @@
+"""
+Precompiled Jinja2 pages: every template compiles, the quiz page embeds
+QUIZ_DATA in its own key order, static pages render once and values are
+escaped
+"""
+
+import json
+import re
+
+import pytest
+
+import rendering
+from quiz_data import QUIZ_DATA
+
+
+@pytest.mark.parametrize("name", rendering.env.list_templates())
+def test_template_compiles(name):
+    rendering.env.get_template(name)
+
+
+def test_quiz_page_embeds_the_quiz_in_order(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    embedded = re.search(r"const quizData = (.*?);\n", response.text).group(1)
+    quiz = json.loads(embedded)
+    assert quiz == json.loads(json.dumps(QUIZ_DATA))
+    assert list(quiz["archetypes"]) == list(QUIZ_DATA["archetypes"])
+
+
+def test_static_pages_render_once(client):
+    assert client.get("/references").text == rendering.render_static("references.html")
+    assert rendering.fragment("references.html") is rendering.fragment("references.html")
+
+
+def test_values_are_escaped():
+    archetype = dict(QUIZ_DATA["archetypes"]["Innovator"], name="<script>alert(1)</script>")
+    html = rendering.render("results.html", archetype=archetype, archetype_key="Innovator",
+                            og_image="https://example.com/og.png", og_image_width=1200, og_image_height=630)
+    assert "<script>alert(1)</script>" not in html
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
@@ -0,0 +1,80 @@
+"""
+Results pages: strong validators answered without a lookup, the "*"
+wildcard not honoured, and unknown sessions cached as 404s
+"""
+
+import uuid
+
+import pytest
+
+import main
+
+SUBMISSION = {"responses": {"1": "A", "2": {"primary": "B", "secondary": ["C"]}, "3": "D"}}
+
+
+@pytest.fixture
+def lookups(repo, monkeypatch):
+    """Every session id the results page looks up"""
+    seen = []
+    get_result = repo.get_result
+
+    async def counted(session_id):
+        seen.append(session_id)
+        return await get_result(session_id)
+
+    monkeypatch.setattr(repo, "get_result", counted)
+    return seen
+
+
+@pytest.fixture
+def session_id(client):
+    return client.post("/api/submit", json=SUBMISSION).json()["session_id"]
+
+
+def test_page_carries_immutable_validators(client, session_id):
+    response = client.get(f"/results/{session_id}")
+    assert response.status_code == 200
+    assert response.headers["etag"] == main.results_etag(session_id)
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["last-modified"].endswith("GMT")
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}'])
+def test_matching_etag_is_304_without_a_lookup(client, session_id, lookups, if_none_match):
+    etag = main.results_etag(session_id)
+    response = client.get(f"/results/{session_id}", headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert lookups == []
+
+
+def test_wildcard_if_none_match_is_not_honoured(client, lookups):
+    missing = str(uuid.uuid4())
+    response = client.get(f"/results/{missing}", headers={"If-None-Match": "*"})
+    # "*" would claim the page exists; the lookup says otherwise
+    assert response.status_code == 404
+    assert lookups == [missing]
+
+
+def test_if_modified_since_is_304(client, session_id):
+    last_modified = client.get(f"/results/{session_id}").headers["last-modified"]
+    assert client.get(f"/results/{session_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # If-None-Match takes precedence when both are sent
+    assert client.get(f"/results/{session_id}", headers={"If-Modified-Since": last_modified,
+                                                         "If-None-Match": '"other"'}).status_code == 200
+
+
+def test_unknown_session_is_a_cached_404(client, lookups):
+    missing = str(uuid.uuid4())
+    for _ in range(3):
+        response = client.get(f"/results/{missing}")
+        assert response.status_code == 404
+        assert response.headers["cache-control"] == f"public, max-age={main.RESULTS_NOT_FOUND_TTL}"
+    assert lookups == [missing]
+
+
+def test_signed_share_token_renders_without_a_lookup(client, lookups):
+    token = client.post("/api/submit", json=SUBMISSION).json()["share_token"]
+    response = client.get(f"/results/{token}")
+    assert response.status_code == 200
+    assert lookups == []
@@ -0,0 +1,141 @@
+"""
+Which retention path removes old analytics events
+Shards are built by hand around the real cutoff (now - days), then
+retention.run is applied once.
+"""
+
+import asyncio
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import database
+import retention
+import shards
+
+DAYS = 180
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_DIR", tmp_path / "analytics")
+    monkeypatch.setattr(shards, "_ready", set())
+    monkeypatch.setattr(retention, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(retention, "CHUNK_PAUSE", 0)
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "quiz.db")
+
+
+def make_shard(moments, sealed=False) -> str:
+    """A shard holding one event per moment; all moments fall in the same month"""
+    month = shards.month_of(moments[0])
+    path = shards.shard_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        for statement in shards.SCHEMA:
+            conn.execute(statement.format(schema="main"))
+        conn.executemany("INSERT INTO analytics (event_type, created_at) VALUES ('page_view', ?)",
+                         [(moment.strftime(TIME_FORMAT),) for moment in moments])
+        conn.commit()
+    finally:
+        conn.close()
+    if sealed:
+        path.chmod(0o444)
+    return month
+
+
+def remaining(month: str) -> list:
+    conn = sqlite3.connect(shards.shard_path(month))
+    try:
+        return [row[0] for row in conn.execute("SELECT created_at FROM analytics ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def cutoff_moments():
+    """(the cutoff, the start of its month, a moment in the month before)"""
+    cutoff_at = (datetime.now(timezone.utc) - timedelta(days=DAYS)).replace(microsecond=0)
+    month_start = cutoff_at.replace(day=1, hour=0, minute=0, second=0)
+    return cutoff_at, month_start, month_start - timedelta(days=1)
+
+
+def test_months_before_the_cutoff_month_are_retired():
+    _, _, previous = cutoff_moments()
+    month = make_shard([previous, previous], sealed=True)
+
+    assert retention.run(DAYS) == {month: 2}
+    assert not shards.shard_path(month).exists()
+    assert [event["created_at"] for event in retention.read_archive(month)] == [previous.strftime(TIME_FORMAT)] * 2
+
+
+def test_sealed_cutoff_month_keeps_rows_past_the_retention_age():
+    cutoff_at, month_start, _ = cutoff_moments()
+    month = make_shard([month_start, cutoff_at], sealed=True)
+
+    assert retention.run(DAYS) == {}
+    # Older than the cutoff, but kept until the whole month can be retired
+    assert remaining(month) == [month_start.strftime(TIME_FORMAT), cutoff_at.strftime(TIME_FORMAT)]
+
+
+def test_open_cutoff_month_is_pruned_row_by_row():
+    cutoff_at, month_start, _ = cutoff_moments()
+    month = make_shard([month_start, cutoff_at])
+
+    assert retention.run(DAYS) == {month: 1}
+    assert remaining(month) == [cutoff_at.strftime(TIME_FORMAT)]
+    assert [event["created_at"] for event in retention.read_archive(month)] == [month_start.strftime(TIME_FORMAT)]
+
+
+def recent_shards(ages) -> dict:
+    """Open shards holding one event per age (in hours); returns each month's newest event id"""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    by_month = defaultdict(list)
+    for age in ages:
+        moment = now - timedelta(hours=age)
+        by_month[shards.month_of(moment)].append(moment)
+    return {make_shard(moments): len(moments) for moments in by_month.values()}
+
+
+def event_counts() -> dict:
+    return asyncio.run(database.SQLiteRepository(database.DB_PATH).event_counts(days=7))
+
+
+def read_by_funnel(checkpoint: dict):
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        conn.executemany("INSERT OR REPLACE INTO funnel_checkpoints (source, last_id) VALUES (?, ?)",
+                         checkpoint.items())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_event_counts_survive_retention():
+    asyncio.run(database.SQLiteRepository(database.DB_PATH).init())
+    # Three to six days old, two days' retention, counted over a week
+    newest = recent_shards([72, 96, 120, 144, 1])
+    read_by_funnel(newest)
+    before = event_counts()
+
+    archived = retention.run(days=2)
+    assert sum(archived.values()) == 4
+    # The archived four now come from analytics_daily
+    assert event_counts() == before == {"page_view": 5}
+
+
+def test_retention_waits_for_the_funnel():
+    asyncio.run(database.SQLiteRepository(database.DB_PATH).init())
+    months = recent_shards([72, 96, 120, 144])
+
+    assert sum(retention.run(days=2).values()) == 0
+    assert sum(len(remaining(month)) for month in months) == 4
+
+
+def test_month_of_aware_and_naive_datetimes_agree():
+    aware = datetime(2025, 1, 31, 23, 30, tzinfo=timezone(timedelta(hours=-5)))
+    assert shards.month_of(aware) == "2025-02"
+    assert shards.month_of(aware.astimezone(timezone.utc).replace(tzinfo=None)) == "2025-02"
+    assert shards.months_between(datetime(2024, 12, 5), aware) == ["2024-12", "2025-01", "2025-02"]
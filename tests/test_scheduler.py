@@ -0,0 +1,109 @@
+"""
+Background jobs: one leader per lock file runs the shared jobs, per-worker
+jobs run everywhere, intervals are jittered and stop() drains running jobs
+before cancelling them
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+import scheduler
+
+
+def job(run, leader_only=True, interval=0.01, **kwargs) -> scheduler.Job:
+    # Unique names keep each test's metrics apart
+    return scheduler.Job(f"test_{uuid.uuid4().hex[:8]}", interval, run, leader_only=leader_only, **kwargs)
+
+
+def outcomes(job: scheduler.Job) -> dict:
+    return {result: counter.value for result, counter in job.outcomes.items() if counter.value}
+
+
+def counting(runs: list, name: str):
+    async def run():
+        runs.append(name)
+    return run
+
+
+@pytest.mark.skipif(scheduler.fcntl is None, reason="no flock on this platform")
+def test_lock_has_one_holder_at_a_time(tmp_path):
+    first, second = (scheduler.LeaderLock(tmp_path / "scheduler.lock") for _ in range(2))
+    assert first.acquire() and first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire() and second.held and not first.held
+    second.release()
+
+
+@pytest.mark.skipif(scheduler.fcntl is None, reason="no flock on this platform")
+def test_only_the_leader_runs_shared_jobs(tmp_path):
+    runs = []
+    workers = [
+        (name, job(counting(runs, name)), job(counting(runs, f"{name} local"), leader_only=False))
+        for name in ("one", "two")
+    ]
+
+    async def main():
+        schedulers = [scheduler.Scheduler([shared, local], lock_path=tmp_path / "scheduler.lock", jitter=0)
+                      for _, shared, local in workers]
+        for worker in schedulers:
+            worker.start()
+        await asyncio.sleep(0.1)
+        for worker in schedulers:
+            await worker.stop()
+
+    asyncio.run(main())
+    shared_runs = {name for name in runs if not name.endswith("local")}
+    assert len(shared_runs) == 1
+    assert {"one local", "two local"} <= set(runs)
+    follower = [shared for name, shared, _ in workers if name not in shared_runs][0]
+    assert outcomes(follower).keys() == {"skipped"}
+
+
+def test_intervals_are_jittered_within_bounds(tmp_path):
+    worker = scheduler.Scheduler([], lock_path=tmp_path / "scheduler.lock", jitter=0.1)
+    waits = {worker._wait(100) for _ in range(50)}
+    assert all(90 <= wait <= 110 for wait in waits)
+    assert len(waits) > 1
+
+
+def test_failed_runs_are_counted_and_retried(tmp_path):
+    async def fail():
+        raise RuntimeError("boom")
+
+    failing = job(fail, leader_only=False)
+
+    async def main():
+        worker = scheduler.Scheduler([failing], lock_path=tmp_path / "scheduler.lock", jitter=0)
+        worker.start()
+        await asyncio.sleep(0.1)
+        await worker.stop()
+
+    asyncio.run(main())
+    assert outcomes(failing)["error"] > 1
+
+
+@pytest.mark.parametrize("seconds, result", [(0.05, "ok"), (5, "cancelled")])
+def test_stop_drains_running_jobs_then_cancels_them(tmp_path, seconds, result):
+    started = []
+
+    async def slow():
+        started.append(True)
+        await asyncio.sleep(seconds)
+
+    slow_job = job(slow, leader_only=False, delay=0)
+
+    async def main():
+        worker = scheduler.Scheduler([slow_job], lock_path=tmp_path / "scheduler.lock", jitter=0,
+                                     drain_seconds=0.2)
+        worker.start()
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(worker.stop(), timeout=2)
+        return worker
+
+    worker = asyncio.run(main())
+    assert started == [True]
+    assert outcomes(slow_job) == {result: 1}
+    assert worker.running == {} and not worker.leader.held
@@ -0,0 +1,71 @@
+"""
+The compiled batch Scorer gives the same results as scoring one submission
+at a time (main.calculate_scores), including tie-breaks and per-question
+weights
+"""
+
+import copy
+import random
+
+import main
+import scoring
+from quiz_data import QUIZ_DATA
+
+
+def random_sets(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        responses = {}
+        for question in QUIZ_DATA["questions"]:
+            if rng.random() < 0.2:
+                continue
+            answers = list(question["answers"])
+            primary = rng.choice(answers)
+            secondary = rng.sample([answer for answer in answers if answer != primary], rng.randint(0, 2))
+            responses[str(question["id"])] = {"primary": primary, "secondary": secondary}
+        sets.append(responses)
+    return sets
+
+
+def score_one(responses: dict) -> dict:
+    scores, role = main.calculate_scores(responses)
+    primary, secondary = main.determine_primary_and_secondary(scores)
+    return {
+        "primary_archetype": primary,
+        "secondary_archetype": secondary,
+        "archetype_name": QUIZ_DATA["archetypes"][primary]["name"],
+        "scores": scores,
+        "role_demographic": role,
+    }
+
+
+def test_batch_matches_single_scoring():
+    sets = random_sets(500, seed=3) + [{}, {"1": "B"}, {"2": "A", "3": "A"}]
+    assert scoring.Scorer(QUIZ_DATA).score_batch(sets) == [score_one(responses) for responses in sets]
+
+
+def test_per_question_weights_override_the_quiz_rules(monkeypatch):
+    quiz = copy.deepcopy(QUIZ_DATA)
+    quiz["scoring_rules"] = {"primary_weight": 5}
+    question = next(question for question in quiz["questions"] if question.get("scoring"))
+    question["weights"] = {"primary": 1, "secondary": 4}
+    assert scoring.answer_weights(quiz, question) == (1, 4)
+    other = next(q for q in quiz["questions"] if q.get("scoring") and q is not question)
+    assert scoring.answer_weights(quiz, other) == (5, scoring.DEFAULT_RULES["secondary_weight"])
+
+    monkeypatch.setattr(main, "QUIZ_DATA", quiz)
+    sets = random_sets(200, seed=5)
+    assert scoring.Scorer(quiz).score_batch(sets) == [score_one(responses) for responses in sets]
+
+
+def test_batch_endpoint(client, monkeypatch):
+    sets = random_sets(3, seed=9)
+    response = client.post("/api/score/batch", json={"responses": sets})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 3 and body["quiz_version"] == QUIZ_DATA["version"]
+    assert body["results"] == [score_one(responses) for responses in sets]
+
+    monkeypatch.setattr(main, "SCORE_BATCH_MAX", 2)
+    assert client.post("/api/score/batch", json={"responses": sets}).status_code == 413
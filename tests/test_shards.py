@@ -0,0 +1,121 @@
+"""
+Monthly analytics shards: windowed attach, sealing, dropping and the
+migration of the old single analytics table
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import shards
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@pytest.fixture(autouse=True)
+def shard_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_DIR", tmp_path / "analytics")
+    monkeypatch.setattr(shards, "_ready", set())
+
+
+def add_events(month_start: datetime, count: int) -> str:
+    """count events on the first day of a month, in that month's shard"""
+    month = shards.month_of(month_start)
+    path = shards.shard_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        shards._ensure_schema(conn, "main", month)
+        conn.executemany("INSERT INTO analytics (event_type, created_at) VALUES ('page_view', ?)",
+                         [(month_start.strftime(TIME_FORMAT),)] * count)
+        conn.commit()
+    finally:
+        conn.close()
+    return month
+
+
+def month_starts(count: int) -> list:
+    """The first moment of this month and the count - 1 months before it, oldest first"""
+    start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    starts = [start]
+    for _ in range(count - 1):
+        starts.append((starts[-1] - timedelta(days=1)).replace(day=1))
+    return starts[::-1]
+
+
+def test_window_attaches_only_overlapping_months():
+    oldest, middle, current = month_starts(3)
+    for start, count in ((oldest, 1), (middle, 2), (current, 3)):
+        add_events(start, count)
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        months = shards.attach_window(conn, since=middle)
+        assert months == [shards.month_of(middle), shards.month_of(current)]
+        assert conn.execute("SELECT COUNT(*) FROM analytics").fetchone()[0] == 5
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        assert "a_" + shards.month_of(oldest).replace("-", "_") not in attached
+    finally:
+        conn.close()
+
+
+def test_window_without_shards_is_empty():
+    conn = sqlite3.connect(":memory:")
+    try:
+        assert shards.attach_window(conn, since=datetime.now(timezone.utc) - timedelta(days=7)) == []
+        assert conn.execute("SELECT COUNT(*) FROM analytics").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_finished_months_are_sealed_read_only():
+    # Two months back is past ANALYTICS_SEAL_AFTER_DAYS whatever today is
+    oldest, _, current = month_starts(3)
+    oldest_month, current_month = add_events(oldest, 1), add_events(current, 1)
+
+    assert oldest_month in shards.seal_due()
+    assert shards.is_sealed(oldest_month) and not shards.is_sealed(current_month)
+    assert shards.shard_path(oldest_month).stat().st_mode & 0o222 == 0
+    # Sealing is done once
+    assert oldest_month not in shards.seal_due()
+
+
+def test_drop_deletes_a_month_but_never_the_current_one():
+    previous, current = month_starts(2)
+    previous_month, current_month = add_events(previous, 1), add_events(current, 1)
+
+    shards.drop(previous_month)
+    assert shards.list_months() == [current_month]
+    with pytest.raises(ValueError):
+        shards.drop(current_month)
+    with pytest.raises(ValueError):
+        shards.drop("../quiz")
+
+
+def test_legacy_table_moves_into_monthly_shards(tmp_path):
+    conn = sqlite3.connect(tmp_path / "quiz.db")
+    try:
+        conn.execute("CREATE TABLE analytics (id INTEGER PRIMARY KEY, event_type TEXT, session_id TEXT, "
+                     "event_data TEXT, ip_address TEXT, user_agent TEXT, created_at TIMESTAMP)")
+        conn.executemany("INSERT INTO analytics (event_type, created_at) VALUES (?, ?)", [
+            ("page_view", "2025-01-05 10:00:00"),
+            ("page_view", "2025-01-20 10:00:00"),
+            ("quiz_started", "2025-02-01 00:00:00"),
+        ])
+        conn.commit()
+
+        shards.migrate_legacy(conn)
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'analytics'").fetchone() is None
+    finally:
+        conn.close()
+
+    assert shards.list_months() == ["2025-01", "2025-02"]
+    counts = {}
+    for month in shards.list_months():
+        shard = sqlite3.connect(shards.shard_path(month))
+        try:
+            counts[month] = shard.execute("SELECT COUNT(*) FROM analytics").fetchone()[0]
+        finally:
+            shard.close()
+    assert counts == {"2025-01": 2, "2025-02": 1}
@@ -0,0 +1,46 @@
+"""
+Share images render through the process pool, as PNG when cairosvg is
+available and as SVG otherwise
+"""
+
+import asyncio
+
+import pytest
+
+import share_images
+from quiz_data import QUIZ_DATA
+
+
+@pytest.fixture(autouse=True)
+def image_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(share_images, "OG_DIR", tmp_path / "og")
+    monkeypatch.setattr(share_images, "IMAGES", share_images.LRUCache("og_images_test", maxsize=8))
+    yield
+    share_images.shutdown()
+
+
+def render(fmt: str) -> bytes:
+    spec = share_images.image_spec("Innovator", QUIZ_DATA["archetypes"], {"Innovator": 9, "Guardian": 3})
+    return asyncio.run(share_images.get_image(spec, fmt))
+
+
+def test_pool_is_not_forked():
+    assert share_images._get_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+    assert 1 <= share_images.RENDER_WORKERS <= share_images.MAX_RENDER_WORKERS
+
+
+@pytest.mark.skipif(share_images.cairosvg is None, reason="cairosvg or the cairo library is not installed")
+def test_png_renders_in_the_pool():
+    image = render("png")
+    assert image.startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def test_svg_fallback_without_cairosvg(monkeypatch):
+    monkeypatch.setattr(share_images, "cairosvg", None)
+    assert share_images.default_format() == "svg"
+    assert not share_images.available("png")
+
+    image = render(share_images.default_format())
+    assert image.startswith(b"<svg") and b"The Innovator" in image
+    # Stored on disk too, so other workers serve it without rendering
+    assert list((share_images.OG_DIR).glob("*.svg"))
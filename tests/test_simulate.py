@@ -0,0 +1,68 @@
+"""
+Monte Carlo simulator: outcome tables agree with the scorer, results are
+reproducible from a seed and independent of how chunks are spread over
+workers
+"""
+
+import numpy as np
+import pytest
+
+import simulate
+from quiz_data import QUIZ_DATA
+
+
+def scored_question():
+    return next(question for question in QUIZ_DATA["questions"] if question.get("scoring"))
+
+
+def test_single_choice_outcomes_match_the_scorer():
+    scorer = simulate.get_scorer()
+    question = scored_question()
+    cumulative, points, firsts = simulate.question_outcomes(question, {}, 1.0, 1, 0.0, offset=0, never=99)
+
+    answers = list(question["answers"])
+    # Row 0 is "skipped", then one row per answer, equally likely
+    assert np.allclose(np.diff(cumulative), 1 / len(answers))
+    assert cumulative[-1] == pytest.approx(1.0)
+    for row, answer in enumerate(answers, start=1):
+        slot = scorer.slots.get((question["id"], answer))
+        expected = np.zeros(len(scorer.archetypes), dtype=np.int32)
+        if slot is not None:
+            expected[scorer.slot_archetype[slot]] = scorer.points[0, slot]
+        assert (points[row] == expected).all()
+        assert (firsts[row] < 99).sum() == (slot is not None)
+
+
+def test_weights_and_position_bias_shift_the_odds():
+    question = scored_question()
+    first, *others = list(question["answers"])
+    weights = {str(question["id"]): {first: 0}}
+    cumulative, _, _ = simulate.question_outcomes(question, weights, 1.0, 1, 0.0, offset=0, never=99)
+    assert len(cumulative) == len(others) + 1
+
+    biased, _, _ = simulate.question_outcomes(question, {}, 0.5, 1, 0.0, offset=0, never=99)
+    probabilities = np.diff(biased)
+    assert (probabilities[:-1] > probabilities[1:]).all()
+
+
+def test_runs_are_reproducible_and_add_up(monkeypatch):
+    monkeypatch.setattr(simulate, "CHUNK_SIZE", 1000)
+    serial = simulate.run(3500, workers=1, weights={}, skip=0.1, seed=42)
+    parallel = simulate.run(3500, workers=2, weights={}, skip=0.1, seed=42)
+
+    assert {key: value.tolist() for key, value in serial.items()} == \
+           {key: value.tolist() for key, value in parallel.items()}
+    assert int(serial["quizzes"]) == 3500
+    assert serial["primary"].sum() == 3500 and serial["secondary"].sum() == 3500
+    assert serial["tie_winners"].sum() == serial["tied"]
+
+    summary = simulate.report(serial, elapsed=1.0, workers=1)
+    assert sum(row["primary_rate"] for row in summary["archetypes"].values()) == pytest.approx(1.0)
+
+
+def test_skipping_everything_leaves_quizzes_unscored():
+    totals = simulate.run(500, workers=1, weights={}, skip=0.999999, seed=1)
+    assert int(totals["unscored"]) == 500
+    # Unscored quizzes fall back to the default archetype
+    default = simulate.get_scorer().default
+    assert int(totals["primary"][default]) == 500
@@ -0,0 +1,66 @@
+"""
+One grouped scan folded into the stats snapshot shared by /summary and
+/api/stats; concurrent cache misses share one computation
+"""
+
+import asyncio
+
+import stats
+from quiz_data import QUIZ_DATA
+
+ARCHETYPES = QUIZ_DATA["archetypes"]
+
+
+def test_breakdown_rows_are_folded():
+    rows = [
+        # archetype, name, role, day, count, last 7 days, completion time sum, timed count
+        ("Innovator", "The Innovator", "developer", "2025-06-01", 3, 2, 30.0, 3),
+        ("Innovator", "The Innovator", None, None, 1, 0, None, 0),
+        ("Guardian", "The Guardian", "developer", "2025-06-02", 1, 1, 10.0, 1),
+    ]
+    snapshot = stats.build(rows, {"page_view": 9}, ARCHETYPES)
+
+    assert (snapshot["total"], snapshot["recent"], snapshot["avg_time"]) == (5, 3, 10.0)
+    assert snapshot["roles"] == {"developer": 4}
+    assert snapshot["daily"] == {"2025-06-01": 3, "2025-06-02": 1}
+    assert snapshot["events"] == {"page_view": 9}
+    # Every archetype listed, most common first
+    distribution = snapshot["distribution"]
+    assert len(distribution) == len(ARCHETYPES)
+    assert distribution[0] == {"archetype": "Innovator", "name": "The Innovator", "count": 4, "percentage": 80.0}
+    assert {item["count"] for item in distribution[2:]} == {0}
+
+
+def test_concurrent_misses_share_one_computation(repo, monkeypatch):
+    scans = []
+    breakdown = repo.results_breakdown
+
+    async def counted():
+        scans.append(True)
+        await asyncio.sleep(0.05)
+        return await breakdown()
+
+    monkeypatch.setattr(repo, "results_breakdown", counted)
+    stats.SNAPSHOTS.clear()
+
+    async def main():
+        return await asyncio.gather(*(stats.snapshot(repo, ARCHETYPES) for _ in range(5)))
+
+    snapshots = asyncio.run(main())
+    assert len(scans) == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    # Cached for the next request
+    asyncio.run(stats.snapshot(repo, ARCHETYPES))
+    assert len(scans) == 1
+
+
+def test_api_and_summary_agree(client):
+    for responses in ({"1": "A", "2": "B"}, {"1": "B", "2": "B"}, {"1": "A", "2": "C"}):
+        assert client.post("/api/submit", json={"responses": responses}).status_code == 200
+    stats.SNAPSHOTS.clear()
+
+    api = client.get("/api/stats").json()
+    assert api["total_submissions"] == 3
+    assert sum(item["count"] for item in api["archetype_distribution"]) == 3
+    assert api["quiz_version"] == QUIZ_DATA["version"]
+    assert f">{api['total_submissions']}<" in client.get("/summary").text
@@ -0,0 +1,99 @@
+"""
+/api/stats/stream over ASGI: the current snapshot first, then deltas as
+results are published, until the bus stops; viewers past the cap get 503
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import main
+import pubsub
+
+SUBMISSION = {"responses": {"1": "A", "2": "B", "3": "D"}}
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = pubsub.StatsBus(max_rate=100)
+    monkeypatch.setattr(main, "STATS_BUS", bus)
+    return bus
+
+
+def parse(chunk: bytes) -> list:
+    """(event, data) for every event in a body chunk; retry and comment lines are skipped"""
+    events = []
+    for block in chunk.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+async def open_stream(chunks: asyncio.Queue, disconnected: asyncio.Event) -> dict:
+    """Run a GET of the stream through the whole app; body chunks go to chunks, then None"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": "/api/stats/stream", "raw_path": b"/api/stats/stream", "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 50000), "server": ("testserver", 80)}
+    start = {}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message.get("body"):
+            await chunks.put(message["body"])
+
+    await main.app(scope, receive, send)
+    await chunks.put(None)
+    return start
+
+
+def test_snapshot_then_deltas_until_the_bus_stops(client, bus):
+    assert client.post("/api/submit", json=SUBMISSION).status_code == 200
+    # Sent to nobody; the stream's snapshot counts it
+    bus.flush()
+
+    async def check():
+        bus.start()
+        chunks, disconnected = asyncio.Queue(), asyncio.Event()
+        stream = asyncio.create_task(open_stream(chunks, disconnected))
+        received = parse(await asyncio.wait_for(chunks.get(), 5))
+        assert len(bus.subscribers) == 1
+
+        bus.publish("Innovator", "developer")
+        bus.publish("Guardian", None)
+        received += parse(await asyncio.wait_for(chunks.get(), 5))
+
+        await bus.stop()
+        assert await asyncio.wait_for(chunks.get(), 5) is None
+        disconnected.set()
+        return await stream, received
+
+    start, received = asyncio.run(check())
+    assert start["status"] == 200
+    headers = dict(start["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert headers[b"cache-control"] == b"no-cache"
+
+    (first, snapshot), (second, delta) = received
+    assert first == "snapshot" and snapshot["total"] == 1
+    assert second == "delta"
+    assert delta == {"total": 2, "archetypes": {"Innovator": 1, "Guardian": 1}, "roles": {"developer": 1}}
+    assert bus.subscribers == set()
+
+
+def test_viewers_past_the_cap_are_turned_away(client, bus):
+    bus.max_subscribers = 0
+    response = client.get("/api/stats/stream")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
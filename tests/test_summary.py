@@ -0,0 +1,58 @@
+"""
+/summary streams its head before the stats are ready, and still closes the
+page when they fail
+"""
+
+import asyncio
+
+import main
+import rendering
+import stats
+
+
+def test_head_is_sent_before_the_stats(repo, monkeypatch):
+    ready = asyncio.Event()
+    snapshot = stats.build([], {}, main.QUIZ_DATA["archetypes"])
+
+    async def slow_snapshot(repo, archetypes):
+        await ready.wait()
+        return snapshot
+
+    monkeypatch.setattr(stats, "snapshot", slow_snapshot)
+
+    async def first_chunks():
+        sections = main.summary_sections()
+        head = await sections.__anext__()
+        # Still waiting for the stats
+        pending = asyncio.ensure_future(sections.__anext__())
+        await asyncio.sleep(0.05)
+        waited = not pending.done()
+        ready.set()
+        return head, waited, await pending, [chunk async for chunk in sections]
+
+    head, waited, totals, rest = asyncio.run(first_chunks())
+    assert head == rendering.static_block("summary.html", "head")
+    assert waited
+    assert totals == rendering.render_block("summary.html", "totals", total=0, recent=0, avg_time=0,
+                                            archetype_count=snapshot["archetype_count"])
+    assert rest[-1] == rendering.static_block("summary.html", "footer")
+
+
+def test_page_lists_the_stored_results(client):
+    client.post("/api/submit", json={"responses": {"1": "A", "2": "B", "3": "D"}})
+    response = client.get("/summary")
+    assert response.status_code == 200
+    assert response.headers["x-accel-buffering"] == "no"
+    assert response.text.endswith(rendering.static_block("summary.html", "footer"))
+    assert main.SUMMARY_UNAVAILABLE not in response.text
+
+
+def test_failed_stats_still_close_the_page(client, monkeypatch):
+    async def broken(repo, archetypes):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(stats, "snapshot", broken)
+    response = client.get("/summary")
+    assert response.status_code == 200
+    assert main.SUMMARY_UNAVAILABLE in response.text
+    assert response.text.endswith(rendering.static_block("summary.html", "footer"))
@@ -0,0 +1,180 @@
+"""
+Single-writer protocol: acknowledged writes, integrity errors and timeouts
+A WriterServer and WriterClient talk over a Unix socket in a temporary
+directory, against a temporary database.
+"""
+
+import asyncio
+import json
+import sqlite3
+import uuid
+
+import pytest
+
+import database
+import shards
+import writer
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "SHARD_DIR", tmp_path / "analytics")
+    monkeypatch.setattr(shards, "_ready", set())
+    path = tmp_path / "quiz.db"
+    asyncio.run(database.SQLiteRepository(path).init())
+    return path
+
+
+def result_row(**overrides):
+    row = {
+        "session_id": str(uuid.uuid4()),
+        "primary_archetype": "Innovator",
+        "archetype_name": "The Innovator",
+        "all_scores": json.dumps({"Innovator": 9}),
+        "responses": json.dumps({"2": {"primary": "A", "secondary": []}}),
+        "role_demographic": None,
+        "completion_time": 3.0,
+        "user_agent": "pytest",
+        "ip_address": "127.0.0.1",
+        "idempotency_key": None,
+    }
+    row.update(overrides)
+    return row
+
+
+def stored_sessions(db_path) -> set:
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT session_id FROM results")}
+    finally:
+        conn.close()
+
+
+def run_with_writer(db_path, socket_path, check, batch_window: float = 0.0, start_server: bool = True):
+    """Run check(start, server) while a writer serves socket_path; start() starts it late when start_server is False"""
+    server = writer.WriterServer(str(db_path), str(socket_path), batch_window=batch_window)
+
+    async def main():
+        tasks = []
+
+        async def start():
+            tasks.append(asyncio.create_task(server.serve()))
+            while not socket_path.exists():
+                await asyncio.sleep(0.01)
+
+        if start_server:
+            await start()
+        try:
+            return await check(start, server)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return asyncio.run(main())
+
+
+def test_write_is_acknowledged_once_committed(db_path, tmp_path):
+    row = result_row()
+
+    async def check(*_):
+        client = writer.WriterClient(str(tmp_path / "w.sock"), timeout=5)
+        await client.write("result", row)
+        # Committed before the acknowledgement arrived
+        assert row["session_id"] in stored_sessions(db_path)
+        assert client.pending == 0
+
+    run_with_writer(db_path, tmp_path / "w.sock", check)
+
+
+def test_duplicate_write_raises_integrity_error(db_path, tmp_path):
+    row = result_row()
+
+    async def check(*_):
+        client = writer.WriterClient(str(tmp_path / "w.sock"), timeout=5)
+        await client.write("result", row)
+        with pytest.raises(sqlite3.IntegrityError):
+            await client.write("result", result_row(session_id=row["session_id"]))
+
+    run_with_writer(db_path, tmp_path / "w.sock", check)
+
+
+def test_write_reaching_the_writer_late_is_not_committed(db_path, tmp_path):
+    row = result_row()
+
+    async def check(*_):
+        # The writer holds each batch open longer than the client waits
+        client = writer.WriterClient(str(tmp_path / "w.sock"), timeout=0.2)
+        with pytest.raises(writer.WriterUnavailable):
+            await client.write("result", row)
+        await asyncio.sleep(0.5)
+
+    run_with_writer(db_path, tmp_path / "w.sock", check, batch_window=0.4)
+    assert row["session_id"] not in stored_sessions(db_path)
+
+
+def test_timed_out_write_is_withdrawn_from_the_outbox(db_path, tmp_path):
+    row = result_row()
+
+    async def check(start, server):
+        # No writer yet: the message times out in the client's outbox
+        client = writer.WriterClient(str(tmp_path / "w.sock"), timeout=0.2)
+        with pytest.raises(writer.WriterUnavailable):
+            await client.write("result", row)
+        expired = server.expired.value
+        await start()
+        later = result_row()
+        client.timeout = 5
+        await client.write("result", later)
+        # Never sent, so the writer did not even have to expire it
+        assert server.expired.value == expired
+        return later
+
+    later = run_with_writer(db_path, tmp_path / "w.sock", check, start_server=False)
+    assert stored_sessions(db_path) == {later["session_id"]}
+
+
+def test_expired_messages_are_answered_without_writing(db_path):
+    conn = database.connect(db_path)
+    try:
+        outcomes = writer.WriterServer._commit(conn, [
+            {"id": 1, "op": "result", "row": result_row(), "deadline": 0},
+            {"id": 2, "op": "result", "row": result_row()},
+            {"id": 3, "op": "nonsense", "row": {}},
+        ])
+    finally:
+        conn.close()
+    assert [outcome.get("error") for outcome in outcomes] == ["expired", None, "unknown_op"]
+    assert len(stored_sessions(db_path)) == 1
+
+
+def test_repository_maintenance_writes_go_through_the_writer(db_path, tmp_path):
+    sessions = {f"session-{i:05d}": {"started_at": "2025-01-01 10:00:00", "last_event_at": "2025-01-01 10:05:00",
+                                     "furthest": 3, "reached": 7, "last_answer_at": None, "finished": 0}
+                for i in range(2000)}
+    changes = {"checkpoint": {"2025-01": 42}, "sessions": sessions, "closed": [], "stages": {"started": 2000},
+               "questions": {1: (2000, 0, 0, 0.0)}, "dwell": {(1, 2): 5}}
+
+    async def check(*_):
+        repo = database.SQLiteRepository(db_path, writer_socket=str(tmp_path / "w.sock"))
+        row = result_row()
+        await repo.save_result(row)
+        conn = sqlite3.connect(db_path)
+        try:
+            result_id = conn.execute("SELECT id FROM results WHERE session_id = ?", (row["session_id"],)).fetchone()[0]
+        finally:
+            conn.close()
+        await repo.store_items([(result_id, 2, "A", 3, 1)])
+        # Well past asyncio's default 64KB line limit
+        await repo.save_funnel(changes)
+        return result_id, await repo.funnel_checkpoint(), await repo.funnel_rollup()
+
+    result_id, checkpoint, rollup = run_with_writer(db_path, tmp_path / "w.sock", check)
+    assert checkpoint == {"2025-01": 42}
+    assert rollup["stages"] == {"started": 2000} and rollup["open_sessions"] == 2000
+    assert rollup["dwell"] == [(1, 2, 5)]
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT * FROM response_items").fetchall() == [(result_id, 2, "A", 3, 1)]
+    finally:
+        conn.close()
@@ -0,0 +1,275 @@
+"""
+Single-writer process for multi-worker deployments
+Owns the SQLite writes of the web workers: results, analytics events,
+response items, funnel rollups and encoding backfills arrive over a local
+Unix socket, the writer batch-commits them and acknowledges each durable
+write. Readers keep querying the database directly (WAL mode).
+
+Exceptions that still write directly, all leader-only or run by hand:
+shard sealing and retention (shards.py, retention.py) rewrite finished
+monthly shard files the writer never touches, plus small chunked
+transactions on the quiz.db rollup tables that wait out the writer's lock
+(busy timeout); codec.py's VACUUM cannot run inside the writer's
+transactions, so run `codec.py backfill --no-vacuum` while a writer is up.
+
+    python writer.py --db data/quiz.db --socket data/writer.sock
+    WRITER_SOCKET=data/writer.sock uvicorn main:app --workers 4
+
+Protocol: newline-delimited JSON. {"id": n, "op": ..., "row": {...},
+"deadline": t} is acknowledged with {"id": n, "ok": true} once committed;
+messages without an id are fire-and-forget. A message still uncommitted at
+its deadline (Unix time, set a margin inside the client's ack timeout) is
+answered with {"ok": false, "error": "expired"} and never written, so a
+caller that got a 503 for it can retry without a duplicate insert.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import database
+import metrics
+import shards
+
+BATCH_MAX = int(os.getenv("WRITER_BATCH_MAX", "256"))
+BATCH_WINDOW = float(os.getenv("WRITER_BATCH_WINDOW_MS", "5")) / 1000
+ACK_TIMEOUT = float(os.getenv("WRITER_ACK_TIMEOUT", "5"))
+MAX_PENDING = int(os.getenv("WRITER_MAX_PENDING", "10000"))
+
+# Share of the ack timeout kept back from a message's deadline, so the writer
+# stops committing it before the client gives up waiting
+DEADLINE_MARGIN = 0.2
+
+# Longest message line accepted; funnel and backfill chunks exceed asyncio's 64KB default
+MESSAGE_LIMIT = 16 * 1024 * 1024
+
+
+class WriterUnavailable(database.StorageUnavailable):
+    """The writer process could not be reached or did not acknowledge in time"""
+
+
+class WriterClient:
+    """Web-worker side: one persistent connection to the writer, reconnecting as needed"""
+
+    def __init__(self, socket_path: str, timeout: float = ACK_TIMEOUT, max_pending: int = MAX_PENDING):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.connected = False
+        self._outbox: Optional[asyncio.Queue] = None
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = metrics.counter("quiz_writer_dropped_total",
+                                       "Fire-and-forget writes dropped because the writer queue was full")
+
+    @property
+    def pending(self) -> int:
+        """Messages queued locally plus writes awaiting acknowledgement"""
+        return (self._outbox.qsize() if self._outbox else 0) + len(self._waiters)
+
+    def _ensure_started(self):
+        if self._outbox is None:
+            self._outbox = asyncio.Queue(maxsize=self.max_pending)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, op: str, row: Dict):
+        """Queue a write without waiting for it to be committed"""
+        self._ensure_started()
+        try:
+            self._outbox.put_nowait({"op": op, "row": row})
+        except asyncio.QueueFull:
+            self.dropped.inc()
+            print(f"Writer queue full, dropping {op}")
+
+    async def write(self, op: str, row: Dict):
+        """Send a write and wait until the writer has committed it"""
+        self._ensure_started()
+        message_id = next(self._ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[message_id] = waiter
+        message = {"id": message_id, "op": op, "row": row,
+                   "deadline": time.time() + self.timeout * (1 - DEADLINE_MARGIN)}
+        try:
+            await asyncio.wait_for(self._outbox.put(message), self.timeout)
+            reply = await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            # Withdrawn if still queued here; past its deadline the writer drops it too
+            message["cancelled"] = True
+            raise WriterUnavailable(f"no acknowledgement for {op} within {self.timeout}s")
+        finally:
+            self._waiters.pop(message_id, None)
+
+        if not reply.get("ok"):
+            if reply.get("error") == "integrity":
+                raise sqlite3.IntegrityError(reply.get("detail", ""))
+            raise WriterUnavailable(reply.get("detail") or reply.get("error", "write failed"))
+
+    async def _run(self):
+        backoff = 0.1
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError as e:
+                print(f"Writer connection error: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+
+            backoff = 0.1
+            self.connected = True
+            pump = asyncio.ensure_future(self._pump(writer))
+            acks = asyncio.ensure_future(self._read_acks(reader))
+            try:
+                await asyncio.wait({pump, acks}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.connected = False
+                pump.cancel()
+                acks.cancel()
+                writer.close()
+                # Unacknowledged writes may or may not have landed; callers retry
+                # with the same Idempotency-Key, so failing them is safe
+                for waiter in self._waiters.values():
+                    if not waiter.done():
+                        waiter.set_exception(WriterUnavailable("writer connection lost"))
+
+    async def _pump(self, writer: asyncio.StreamWriter):
+        while True:
+            message = await self._outbox.get()
+            if message.pop("cancelled", False):
+                continue
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+
+    async def _read_acks(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            reply = json.loads(line)
+            waiter = self._waiters.get(reply.get("id"))
+            if waiter is not None and not waiter.done():
+                waiter.set_result(reply)
+
+
+class WriterServer:
+    """Writer side: accepts messages from every worker and batch-commits them"""
+
+    def __init__(self, db_path: str, socket_path: str, batch_max: int = BATCH_MAX,
+                 batch_window: float = BATCH_WINDOW):
+        self.db_path = db_path
+        self.socket_path = socket_path
+        self.batch_max = batch_max
+        self.batch_window = batch_window
+        # One thread owns the connection so commits never block socket I/O
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self.expired = metrics.counter("quiz_writer_expired_total",
+                                       "Acknowledged writes dropped because they reached the writer past their deadline")
+
+    async def serve(self):
+        self._queue = asyncio.Queue()
+        conn = database.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+
+        socket_path = Path(self.socket_path)
+        socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=str(socket_path), limit=MESSAGE_LIMIT)
+        os.chmod(socket_path, 0o660)
+        print(f"Writer listening on {socket_path} (batch {self.batch_max}, window {self.batch_window * 1000:.1f}ms)")
+
+        try:
+            async with server:
+                await self._commit_loop(conn)
+        finally:
+            conn.close()
+            socket_path.unlink(missing_ok=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                await self._queue.put((writer, message))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _commit_loop(self, conn: sqlite3.Connection):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_max and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            outcomes = await loop.run_in_executor(self._executor, self._commit, conn,
+                                                  [message for _, message in batch])
+
+            for (writer, message), outcome in zip(batch, outcomes):
+                if outcome.get("error") == "expired":
+                    self.expired.inc()
+                if "id" in message and not writer.is_closing():
+                    outcome["id"] = message["id"]
+                    writer.write(json.dumps(outcome).encode() + b"\n")
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, messages: List[Dict]) -> List[Dict]:
+        outcomes = []
+        try:
+            # ATTACH is not allowed mid-transaction, so pick this month's shard up front
+            shards.attach_current(conn)
+            now = time.time()
+            for message in messages:
+                operation = database.WRITES.get(message.get("op"))
+                if message.get("deadline") is not None and now > message["deadline"]:
+                    # The client has given up on it (or is about to): committing now would duplicate a retry
+                    outcomes.append({"ok": False, "error": "expired"})
+                elif operation is None:
+                    outcomes.append({"ok": False, "error": "unknown_op"})
+                else:
+                    try:
+                        operation(conn, message.get("row") or {})
+                        outcomes.append({"ok": True})
+                    except sqlite3.IntegrityError as e:
+                        # Only this statement is rolled back; the batch carries on
+                        outcomes.append({"ok": False, "error": "integrity", "detail": str(e)})
+                    except (sqlite3.ProgrammingError, TypeError) as e:
+                        outcomes.append({"ok": False, "error": "invalid", "detail": str(e)})
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Writer commit error: {e}")
+            conn.rollback()
+            return [{"ok": False, "error": "commit_failed", "detail": str(e)} for _ in messages]
+        return outcomes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the single SQLite writer process")
+    parser.add_argument("--db", default="data/quiz.db")
+    parser.add_argument("--socket", default=os.getenv("WRITER_SOCKET", "data/writer.sock"))
+    parser.add_argument("--batch-max", type=int, default=BATCH_MAX)
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW * 1000)
+    args = parser.parse_args()
+
+    server = WriterServer(args.db, args.socket, args.batch_max, args.batch_window_ms / 1000)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass